@@ -0,0 +1,260 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+aggregates.py
+----------
+Materializes ready to serve rankings, topscorer lists, player
+lookups and team analytics per league and season at load time,
+the app memory maps only the tables of the selected season
+
+"""
+
+import json
+import os
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+import storage
+from analytics import team_analytics
+from transform import (
+    aggregate_player_stats,
+    compact_goals,
+    goal_columns,
+    transform_ranking,
+)
+
+aggregates_root = os.path.join(storage.data_files, "aggregates")
+
+# tables of a league and season, with the columns restoring their index
+tables = {
+    "ranking": "Rang",
+    "topscorers": "SpielerId",
+    "players": "SpielerId",
+    "home_away": ["Team", "Ort"],
+    "form": "Team",
+}
+
+# tables of a league over all seasons
+league_tables = {"head_to_head": ["Team", "Gegner"]}
+
+# columns of the stored games needed for the team analytics
+game_columns = ["Liga", "Gruppe", "Saison", "Spiel", "Heimteam", "Gastteam", "Resultat"]
+
+
+def league_directory(league, root=aggregates_root):
+    """Directory of the tables of a league"""
+
+    return os.path.join(root, quote(league, safe=""))
+
+
+def season_directory(league, season, root=aggregates_root):
+    """Directory of the tables of a league and season"""
+
+    return os.path.join(league_directory(league, root), str(season))
+
+
+def read_team_analytics(leagues):
+    """Team analytics of all seasons of leagues, computed at once"""
+
+    games = pd.concat(
+        [
+            storage.read("games", columns=game_columns, where={"Liga": league})
+            for league in leagues
+        ],
+        ignore_index=True,
+    )
+
+    return team_analytics(games)
+
+
+def select(frame, **levels):
+    """Rows of index levels with given values, without these levels"""
+
+    mask = np.ones(len(frame), dtype=bool)
+    for level, value in levels.items():
+        mask &= frame.index.get_level_values(level) == value
+
+    return frame[mask].droplevel(list(levels))
+
+
+def write_table(frame, path):
+    # uncompressed files can be memory mapped
+    feather.write_feather(frame.reset_index(), path, compression="uncompressed")
+
+
+def materialize(league, season, root=aggregates_root, analytics=None):
+    """
+    Computes and writes the tables of a league and season from the store
+
+    Parameters
+    ----------
+    league : str
+        league, e.g. "5. Liga"
+    season : str or int
+        season, e.g. 2021
+    root : str
+        directory of the aggregates
+    analytics : dict
+        team analytics of the league, see read_team_analytics,
+        computed from the stored games by default
+
+    """
+
+    where = {"Liga": league, "Saison": int(season)}
+
+    if analytics is None:
+        analytics = read_team_analytics([league])
+
+    ranking = storage.read("ranking", where=where).drop(columns=["Liga", "Saison"])
+    goals = compact_goals(storage.read("goals", columns=goal_columns, where=where))
+    player_stats = aggregate_player_stats(goals)
+
+    frames = {
+        "ranking": transform_ranking(ranking),
+        # sorted by goals, a threshold selects a head of the table
+        "topscorers": player_stats,
+        # sorted by id for binary search
+        "players": player_stats.sort_index(),
+        "home_away": select(analytics["home_away"], Liga=league, Saison=int(season)),
+        "form": select(analytics["form"], Liga=league, Saison=int(season)),
+    }
+
+    directory = season_directory(league, season, root)
+    os.makedirs(directory, exist_ok=True)
+
+    for name, frame in frames.items():
+        write_table(frame, os.path.join(directory, f"{name}.arrow"))
+
+
+def write_index(root=aggregates_root):
+    """Writes the leagues and seasons of the materialized tables and a version"""
+
+    os.makedirs(root, exist_ok=True)
+    leagues = {}
+
+    for league in sorted(os.listdir(root)):
+        league_directory = os.path.join(root, league)
+        if os.path.isdir(league_directory):
+            # league tables lie next to the season directories
+            leagues[league] = sorted(
+                (
+                    season
+                    for season in os.listdir(league_directory)
+                    if os.path.isdir(os.path.join(league_directory, season))
+                ),
+                reverse=True,
+            )
+
+    index = {
+        # changes whenever aggregates are written, readers can compare it
+        "version": datetime.now().isoformat(timespec="milliseconds"),
+        "leagues": {
+            unquote(league): seasons for league, seasons in leagues.items()
+        },
+    }
+
+    with open(os.path.join(root, "index.json.tmp"), "w", encoding="utf-8") as file:
+        json.dump(index, file, ensure_ascii=False, indent=1)
+
+    os.replace(os.path.join(root, "index.json.tmp"), os.path.join(root, "index.json"))
+
+
+def materialize_seasons(partitions, root=aggregates_root):
+    """Materializes the tables of (league, season) pairs and updates the index"""
+
+    partitions = sorted(set(partitions))
+    leagues = sorted({league for league, _ in partitions})
+
+    # one vectorized pass over the games of all seasons of the leagues
+    analytics = read_team_analytics(leagues) if leagues else None
+
+    for league, season in partitions:
+        materialize(league, season, root, analytics)
+
+    for league in leagues:
+        for name in league_tables:
+            write_table(
+                select(analytics[name], Liga=league),
+                os.path.join(league_directory(league, root), f"{name}.arrow"),
+            )
+
+    write_index(root)
+
+
+def read_index(root=aggregates_root):
+    """Leagues with their seasons, newest first, and the version of the aggregates"""
+
+    with open(os.path.join(root, "index.json"), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def index_modified(root=aggregates_root):
+    """Modification time of the index, changes with every materialization"""
+
+    return os.stat(os.path.join(root, "index.json")).st_mtime_ns
+
+
+def read(name, league, season, root=aggregates_root):
+    """
+    Reads a table of a league and season
+
+    Parameters
+    ----------
+    name : str
+        "ranking", "topscorers", "players", "home_away" or "form"
+    league : str
+        league, e.g. "5. Liga"
+    season : str or int
+        season, e.g. 2021
+    root : str
+        directory of the aggregates
+
+    Returns
+    -------
+    frame : DataFrame
+        table indexed by Rang, SpielerId or Team
+
+    """
+
+    path = os.path.join(season_directory(league, season, root), f"{name}.arrow")
+    table = feather.read_table(path, memory_map=True)
+
+    return table.to_pandas().set_index(tables[name])
+
+
+def head_to_head(league, team, root=aggregates_root):
+    """Games of a team against every opponent of a league over all seasons"""
+
+    path = os.path.join(league_directory(league, root), "head_to_head.arrow")
+    table = feather.read_table(path, memory_map=True).to_pandas()
+
+    return table[table["Team"] == team].set_index(league_tables["head_to_head"])
+
+
+def topscorers(league, season, threshold=1, root=aggregates_root):
+    """Players with at least threshold goals, sorted by goals"""
+
+    table = read("topscorers", league, season, root)
+    goals = table["AnzahlTore"].to_numpy()
+
+    # goals are sorted descending, so the selection is a head of the table
+    return table.iloc[: np.searchsorted(-goals, -threshold, side="right")]
+
+
+def player(league, season, player_id, root=aggregates_root):
+    """Stats of one player, an empty frame for unknown players"""
+
+    table = read("players", league, season, root)
+    position = table.index.searchsorted(player_id)
+    found = position < len(table) and table.index[position] == player_id
+
+    return table.iloc[position : position + found]
+
+
+if __name__ == "__main__":
+    materialize_seasons(storage.partitions("ranking"))
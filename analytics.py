@@ -0,0 +1,201 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+analytics.py
+----------
+Derives team analytics from rankings and games, win rates,
+Pythagorean expectation, home/away splits, form and head to
+head tables, for all leagues and seasons at once
+
+"""
+
+import numpy as np
+import pandas as pd
+
+# exponent of the Pythagorean expectation
+pythagorean_exponent = 2
+
+# number of last games of the form table
+form_games = 5
+
+# columns of the team tables, named like the transformed ranking
+team_columns = ["Sp", "S", "U", "N", "T", "GT", "Diff.", "Pkt.", "S%", "SW"]
+
+
+def win_rate(wins, games):
+    """Share of games won, 0 for teams without games"""
+
+    wins = np.asarray(wins, dtype=float)
+    games = np.asarray(games, dtype=float)
+
+    return np.divide(wins, games, out=np.zeros_like(wins), where=games > 0)
+
+
+def pythagorean(goals, goals_against, exponent=pythagorean_exponent):
+    """
+    Pythagorean expectation, the share of games a team is expected to win
+
+    T^k / (T^k + GT^k), 0.5 for teams without goals and goals against
+
+    """
+
+    scored = np.asarray(goals, dtype=float) ** exponent
+    conceded = np.asarray(goals_against, dtype=float) ** exponent
+    total = scored + conceded
+
+    return np.divide(scored, total, out=np.full_like(total, 0.5), where=total > 0)
+
+
+def team_games(games):
+    """
+    Games from the view of both teams
+
+    Parameters
+    ----------
+    games : DataFrame
+        games with Liga, Gruppe, Saison, Spiel, Heimteam, Gastteam and
+        Resultat, games without a final result are left out
+
+    Returns
+    -------
+    team_games : DataFrame
+        two rows per game with Team, Gegner, Ort ("Heim" or "Auswärts"),
+        goals T and GT, result S, U or N as 0/1 and points Pkt.
+
+    """
+
+    goals = games["Resultat"].str.extract(r"^\s*(\d+)\s*:\s*(\d+)\s*$")
+    finished = goals[0].notna().to_numpy()
+    games = games[finished]
+
+    home_goals = goals.loc[finished, 0].astype(int).to_numpy()
+    away_goals = goals.loc[finished, 1].astype(int).to_numpy()
+    home_team = games["Heimteam"].str.strip().to_numpy()
+    away_team = games["Gastteam"].str.strip().to_numpy()
+
+    frame = pd.DataFrame(
+        {
+            column: np.tile(games[column].to_numpy(), 2)
+            for column in ["Liga", "Gruppe", "Saison", "Spiel"]
+        }
+    )
+    frame["Team"] = np.concatenate([home_team, away_team])
+    frame["Gegner"] = np.concatenate([away_team, home_team])
+    frame["Ort"] = np.repeat(["Heim", "Auswärts"], len(games))
+    frame["T"] = np.concatenate([home_goals, away_goals])
+    frame["GT"] = np.concatenate([away_goals, home_goals])
+
+    difference = frame["T"].to_numpy() - frame["GT"].to_numpy()
+    frame["S"] = (difference > 0).astype(np.int32)
+    frame["U"] = (difference == 0).astype(np.int32)
+    frame["N"] = (difference < 0).astype(np.int32)
+    frame["Pkt."] = 3 * frame["S"] + frame["U"]
+
+    return frame
+
+
+def team_table(team_games, by):
+    """
+    Sums the games of teams like a ranking
+
+    Parameters
+    ----------
+    team_games : DataFrame
+        games from the view of both teams, see team_games
+    by : list
+        columns to group by, e.g. ["Liga", "Saison", "Team"]
+
+    Returns
+    -------
+    table : DataFrame
+        team_columns indexed by the group columns
+
+    """
+
+    table = team_games.groupby(by, sort=True).agg(
+        Sp=("S", "size"),
+        S=("S", "sum"),
+        U=("U", "sum"),
+        N=("N", "sum"),
+        T=("T", "sum"),
+        GT=("GT", "sum"),
+        Pkt=("Pkt.", "sum"),
+    )
+    table = table.rename(columns={"Pkt": "Pkt."})
+
+    table["Diff."] = table["T"] - table["GT"]
+    table["S%"] = win_rate(table["S"], table["Sp"]).round(3)
+    table["SW"] = pythagorean(table["T"], table["GT"]).round(3)
+
+    return table[team_columns]
+
+
+def home_away(team_games):
+    """Team tables of home and away games per league and season"""
+
+    return team_table(team_games, ["Liga", "Saison", "Team", "Ort"])
+
+
+def form(team_games, games=form_games):
+    """
+    Results of the last games per team, league and season
+
+    Games are ordered by their id, which follows the schedule.
+
+    Returns
+    -------
+    form : DataFrame
+        Form like "SUNSS" with the latest game last, points and
+        goals of the last games, indexed by Liga, Saison and Team
+
+    """
+
+    keys = ["Liga", "Saison", "Team"]
+    ordered = team_games.sort_values([*keys, "Spiel"], kind="stable")
+    last = ordered[ordered.groupby(keys).cumcount(ascending=False) < games]
+
+    letters = np.select(
+        [last["S"].to_numpy() == 1, last["U"].to_numpy() == 1], ["S", "U"], "N"
+    )
+
+    table = last.assign(Form=letters).groupby(keys, sort=True).agg(
+        Form=("Form", "sum"),
+        Sp=("S", "size"),
+        Pkt=("Pkt.", "sum"),
+        T=("T", "sum"),
+        GT=("GT", "sum"),
+    )
+
+    return table.rename(columns={"Pkt": "Pkt."})
+
+
+def head_to_head(team_games):
+    """Team tables of the games against every opponent per league, over all seasons"""
+
+    return team_table(team_games, ["Liga", "Team", "Gegner"])
+
+
+def team_analytics(games):
+    """
+    Computes the team analytics of games of any leagues and seasons
+
+    Parameters
+    ----------
+    games : DataFrame
+        games as stored, with Liga and Saison
+
+    Returns
+    -------
+    tables : dict
+        "home_away", "form" and "head_to_head" tables
+
+    """
+
+    games_of_teams = team_games(games)
+
+    return {
+        "home_away": home_away(games_of_teams),
+        "form": form(games_of_teams),
+        "head_to_head": head_to_head(games_of_teams),
+    }
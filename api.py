@@ -0,0 +1,288 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+api.py
+----------
+Read-only JSON API of rankings, topscorers and players served
+from the precomputed aggregates and of ranking trajectories from
+the database, with response caching and ETags
+
+usage: python api.py [--port 8080]
+
+GET /leagues
+GET /rankings/{league}/{season}
+GET /topscorers/{league}/{season}?threshold=1
+GET /players/{league}/{season}/{player_id}
+GET /trajectories/{season}/{team}?league=5.%20Liga
+
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from aiohttp import web
+
+import aggregates
+import database
+
+
+class ResponseCache:
+    """
+    Least recently used cache of response bodies and their ETags
+
+    Parameters
+    ----------
+    max_entries : int
+        maximum number of cached responses
+
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+
+        return entry
+
+    def put(self, key, body):
+        """Caches a body and returns it with its ETag"""
+
+        entry = (body, '"' + hashlib.sha1(body).hexdigest()[:20] + '"')
+        self.entries[key] = entry
+
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+        return entry
+
+
+class Connections:
+    """
+    Database connection per thread
+
+    Responses are built in the threads of the default executor, a
+    sqlite connection must not be used by two of them at once. The
+    API only reads, connections are opened read-only.
+
+    Parameters
+    ----------
+    path : str
+        sqlite file of the database
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.opened = []
+
+    def get(self):
+        """Connection of the calling thread, opened on first use"""
+
+        connection = getattr(self.local, "connection", None)
+
+        if connection is None:
+            connection = database.connect(self.path, readonly=True)
+            self.local.connection = connection
+            with self.lock:
+                self.opened.append(connection)
+
+        return connection
+
+    def close(self):
+        with self.lock:
+            for connection in self.opened:
+                connection.close()
+            self.opened.clear()
+
+
+root_key = web.AppKey("root", str)
+cache_key = web.AppKey("cache", ResponseCache)
+connections_key = web.AppKey("connections", Connections)
+
+
+def frame_json(frame):
+    """Frame with its index as list of records"""
+
+    return frame.reset_index().to_json(orient="records", force_ascii=False)
+
+
+async def respond(request, build):
+    """
+    Responds with the cached body of a request, built on the first request
+
+    Keys contain the modification time of the aggregates index, a new
+    crawl invalidates all cached responses. Clients sending the ETag
+    of the current body get a 304 without body.
+
+    """
+
+    app = request.app
+    key = (request.path_qs, aggregates.index_modified(app[root_key]))
+    entry = app[cache_key].get(key)
+
+    if entry is None:
+        loop = asyncio.get_running_loop()
+        try:
+            # files are read in a thread, cached responses never wait for them
+            body = await loop.run_in_executor(None, build)
+        except FileNotFoundError:
+            raise web.HTTPNotFound(text="unknown league or season") from None
+
+        entry = app[cache_key].put(key, body.encode("utf-8"))
+
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+
+    if etag in request.headers.get("If-None-Match", ""):
+        return web.Response(status=304, headers=headers)
+
+    return web.Response(body=body, content_type="application/json", headers=headers)
+
+
+async def leagues(request):
+    return await respond(
+        request,
+        lambda: json.dumps(
+            aggregates.read_index(request.app[root_key]), ensure_ascii=False
+        ),
+    )
+
+
+async def rankings(request):
+    league, season = request.match_info["league"], request.match_info["season"]
+
+    return await respond(
+        request,
+        lambda: frame_json(
+            aggregates.read("ranking", league, season, request.app[root_key])
+        ),
+    )
+
+
+async def topscorers(request):
+    league, season = request.match_info["league"], request.match_info["season"]
+
+    try:
+        threshold = int(request.query.get("threshold", "1"))
+    except ValueError:
+        raise web.HTTPBadRequest(text="threshold must be an integer") from None
+
+    return await respond(
+        request,
+        lambda: frame_json(
+            aggregates.topscorers(league, season, threshold, request.app[root_key])
+        ),
+    )
+
+
+async def player(request):
+    league, season = request.match_info["league"], request.match_info["season"]
+
+    try:
+        player_id = int(request.match_info["player_id"])
+    except ValueError:
+        raise web.HTTPBadRequest(text="player id must be an integer") from None
+
+    def build():
+        stats = aggregates.player(league, season, player_id, request.app[root_key])
+        if stats.empty:
+            raise web.HTTPNotFound(text="unknown player")
+
+        connection = request.app[connections_key].get()
+        seasons = database.player_seasons(player_id, connection)
+        seasons = seasons.to_json(orient="records", force_ascii=False)
+
+        return json.dumps(
+            {**json.loads(frame_json(stats))[0], "Saisons": json.loads(seasons)},
+            ensure_ascii=False,
+        )
+
+    return await respond(request, build)
+
+
+async def trajectory(request):
+    team = request.match_info["team"]
+    league = request.query.get("league")
+
+    try:
+        season = int(request.match_info["season"])
+    except ValueError:
+        raise web.HTTPBadRequest(text="season must be an integer") from None
+
+    def build():
+        changes = database.ranking_trajectory(
+            team, season, league, request.app[connections_key].get()
+        )
+        if changes.empty:
+            raise web.HTTPNotFound(text="no ranking of the team in the season")
+
+        return changes.to_json(orient="records", force_ascii=False)
+
+    return await respond(request, build)
+
+
+def create_app(
+    root=aggregates.aggregates_root,
+    database_path=database.database_path,
+    max_entries=1024,
+):
+    """
+    Creates the API application
+
+    Parameters
+    ----------
+    root : str
+        directory of the aggregates
+    database_path : str
+        sqlite file of the database
+    max_entries : int
+        maximum number of cached responses
+
+    Returns
+    -------
+    app : aiohttp.web.Application
+        API application
+
+    """
+
+    app = web.Application()
+    app[root_key] = root
+    app[cache_key] = ResponseCache(max_entries)
+    app[connections_key] = Connections(database_path)
+
+    async def close_connections(app):
+        app[connections_key].close()
+
+    app.on_cleanup.append(close_connections)
+
+    app.add_routes(
+        [
+            web.get("/leagues", leagues),
+            web.get("/rankings/{league}/{season}", rankings),
+            web.get("/topscorers/{league}/{season}", topscorers),
+            web.get("/players/{league}/{season}/{player_id}", player),
+            web.get("/trajectories/{season}/{team}", trajectory),
+        ]
+    )
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves the JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    web.run_app(create_app(), host=args.host, port=args.port)
@@ -9,15 +9,29 @@ with options to filter for players or goals treshold
 
 """
 
-import pandas as pd
-import plotly.express as px
 import streamlit as st
 
-from transform import player_stats, rankings_transformed
+import aggregates
+import database
+from charts import goals_bar_chart
+from images import header_path
 
 st.set_page_config(layout="wide")
 
-st.image(r"jannes-glas-cuhQcfp3By4-unsplash_cut_2.jpg")
+# caches are shared by all sessions and bounded, every entry is keyed on the
+# aggregates version, so entries of a former crawl are not hit anymore
+cache_options = {"ttl": 3600, "max_entries": 64}
+
+
+@st.cache_resource
+def load_header(width=1400):
+    """Load the header variant once, see images.py"""
+
+    with open(header_path(width), "rb") as file:
+        return file.read()
+
+
+st.image(load_header())
 
 st.title(
     """
@@ -37,140 +51,192 @@ Select Season and set goals treshhold or filter for players
 """
 )
 
-st.header(
-    """
-5. Liga
-"""
-)
 
-seasons = ["2021", "2020", "2019"]
+@st.cache_data(max_entries=2)
+def load_index(modified):
+    """Load leagues, seasons and version of the precomputed aggregates"""
+
+    return aggregates.read_index()
+
+
+@st.cache_resource
+def load_connection():
+    """Open one database connection for all sessions"""
+
+    return database.connect(readonly=True)
+
+
+# a stat of the index per rerun notices a new crawl
+index = load_index(aggregates.index_modified())
+version = index["version"]
+leagues = index["leagues"]
+selected_league = st.sidebar.selectbox("Select League", list(leagues))
+
+st.header(selected_league)
+
+seasons = leagues[selected_league]
 selected_season = st.sidebar.selectbox("Select Season", (seasons))
 
 
-@st.cache
-def load_season_data(selected_season):
-    """Load data from selected season"""
+@st.cache_data(**cache_options)
+def load_season_data(selected_league, selected_season, version):
+    """Load ranking of selected league and season"""
 
-    selected_season_data = rankings_transformed[f"ranking_{selected_season}"]
+    selected_season_data = aggregates.read("ranking", selected_league, selected_season)
     return selected_season_data
 
 
-selected_season_data = load_season_data(selected_season)
+selected_season_data = load_season_data(selected_league, selected_season, version)
 st.subheader(f"Saison {selected_season}")
 st.write("Rangliste")
 st.dataframe(selected_season_data)
 
+
+@st.cache_data(**cache_options)
+def load_topscorer_data(goals_treshold, selected_league, selected_season, version):
+
+    """Load topscorer data from selected goals treshold"""
+
+    return aggregates.topscorers(selected_league, selected_season, goals_treshold)
+
+
+season_topscorers = load_topscorer_data(1, selected_league, selected_season, version)
+
 goals_slider = st.sidebar.slider(
     "Goals Treshhold",
     1,
-    int(player_stats[f"games_{selected_season}"]["AnzahlTore"].max()),
+    int(season_topscorers["AnzahlTore"].max()),
     key="goals_slider",
 )
 
+topscorer_data = load_topscorer_data(
+    goals_slider, selected_league, selected_season, version
+)
 
-@st.cache
-def load_topscorer_data(goals_treshold, selected_season):
-
-    """Load topscorer data from selected goals treshold"""
+# players with the fewest goals first, selected by id and displayed by name
+players_selection = season_topscorers.sort_values(
+    by=["AnzahlTore"], ascending=True, kind="stable"
+)
+player_names = players_selection["Spieler"].to_dict()
 
-    topscorer_data = player_stats[f"games_{selected_season}"][
-        player_stats[f"games_{selected_season}"]["AnzahlTore"] >= goals_treshold
-    ]
-    topscorer_data = topscorer_data.sort_values(by=["AnzahlTore"], ascending=False)
 
-    return topscorer_data
+def player_name(player_id):
+    """Name of a player id in the selectbox"""
 
+    return "<select>" if player_id is None else player_names[player_id]
 
-topscorer_data = load_topscorer_data(goals_slider, selected_season)
 
-players_selection = player_stats[f"games_{selected_season}"].reset_index()
-players_selection = players_selection[players_selection["AnzahlTore"] > 0]
-default = pd.DataFrame(
-    {
-        "Spieler": "<select>",
-        "AnzahlTore": 0,
-        "Heim": 0,
-        "Auswärts": 0,
-        "Penalty": 0,
-        "Eigentor": 0,
-    },
-    index=["Spieler"],
+selected_player = st.sidebar.selectbox(
+    "Players",
+    [None, *map(int, players_selection.index)],
+    format_func=player_name,
+    key="default_player",
 )
 
-players_selection = pd.concat([players_selection, default])
-players_selection = players_selection.set_index(["Spieler"])
-players_selection = players_selection.sort_values(by=["AnzahlTore"], ascending=True)
 
-selected_player = st.sidebar.selectbox(
-    "Players", (players_selection.index), key="default_player"
-)
+@st.cache_data(**cache_options)
+def load_player_data(selected_player, selected_league, selected_season, version):
+
+    """Load player stats of selected player id"""
 
+    return aggregates.player(selected_league, selected_season, selected_player)
 
-@st.cache
-def load_player_data(selected_player):
 
-    """Load player stats from selected player"""
+player_stat = load_player_data(
+    selected_player, selected_league, selected_season, version
+)
 
-    player_stat = player_stats[f"games_{selected_season}"].reset_index()
-    player_stat = player_stat[player_stat["Spieler"] == selected_player]
-    player_stat = player_stat.set_index(["Spieler"])
 
-    return player_stat
+@st.cache_data(**cache_options)
+def load_player_seasons(selected_player, version):
 
+    """Load goals of selected player id in every season from the database"""
 
-player_stat = load_player_data(selected_player)
+    return database.player_seasons(selected_player, load_connection()).set_index(
+        ["Saison"]
+    )
 
 
 def reset_selections():
     """Reset selections of goalstreshold and player"""
 
-    st.session_state.default_player = "<select>"
+    st.session_state.default_player = None
     st.session_state.goals_slider = 1
 
 
 reset = st.sidebar.button("reset", on_click=reset_selections)
 
 
-def load_bar_charts(topscorer_data, selected_player, player_stat):
-    """Load bar charts"""
-
-    if reset or selected_player == "<select>":
-        fig = px.bar(
-            topscorer_data,
-            x=topscorer_data.index,
-            y=["Heim", "Auswärts"],
-            hover_data=["Penalty"],
-            labels={"value": "Tore"},
-            title="Torschützen",
-        )
-        fig.update_traces(width=0.5)
-
-    else:
+@st.cache_resource(**cache_options)
+def load_bar_charts(
+    goals_treshold, selected_league, selected_season, selected_player, version
+):
+    """Build the bar chart once per data subset, figures are not copied"""
 
-        fig = px.bar(
-            player_stat,
-            x=player_stat.index,
-            y=["Heim", "Auswärts"],
-            hover_data=["Penalty"],
-            labels={"value": "Tore", "Index": selected_player},
-            title="Topscorer",
+    if selected_player is None:
+        topscorer_data = load_topscorer_data(
+            goals_treshold, selected_league, selected_season, version
         )
+        return goals_bar_chart(topscorer_data, "Torschützen", 0.5)
 
-        fig.update_traces(width=0.2)
-
-    return fig
+    player_stat = load_player_data(
+        selected_player, selected_league, selected_season, version
+    )
+    return goals_bar_chart(player_stat, "Topscorer", 0.2)
 
 
 st.plotly_chart(
-    load_bar_charts(topscorer_data, selected_player, player_stat),
+    load_bar_charts(
+        goals_slider,
+        selected_league,
+        selected_season,
+        None if reset else selected_player,
+        version,
+    ),
     use_container_width=True,
 )
 
 st.write("Torschützen-Liste")
-topscorer_list = topscorer_data.reset_index()
+topscorer_list = topscorer_data.reset_index(drop=True)
 topscorer_list.index = topscorer_list.index + 1
 
-if selected_player == '<select>':
+if selected_player is None:
     st.dataframe(topscorer_list[topscorer_list['AnzahlTore'] >= goals_slider])
 else:
-    st.dataframe(player_stat)
+    st.dataframe(player_stat.set_index(["Spieler"]))
+    st.write("Saisons")
+    st.dataframe(load_player_seasons(selected_player, version))
+
+
+@st.cache_data(**cache_options)
+def load_team_data(selected_league, selected_season, version):
+
+    """Load home/away splits and form of all teams of selected league and season"""
+
+    return (
+        aggregates.read("home_away", selected_league, selected_season),
+        aggregates.read("form", selected_league, selected_season),
+    )
+
+
+@st.cache_data(**cache_options)
+def load_head_to_head(selected_team, selected_league, version):
+
+    """Load games of selected team against every opponent over all seasons"""
+
+    return aggregates.head_to_head(selected_league, selected_team)
+
+
+home_away_data, form_data = load_team_data(selected_league, selected_season, version)
+
+st.subheader("Teams")
+st.write("Form")
+st.dataframe(form_data)
+
+selected_team = st.selectbox("Team", list(form_data.index))
+
+if selected_team is not None:
+    st.write("Heim / Auswärts")
+    st.dataframe(home_away_data.loc[selected_team])
+    st.write("Direktvergleich")
+    st.dataframe(load_head_to_head(selected_team, selected_league, version))
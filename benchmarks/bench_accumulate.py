@@ -0,0 +1,170 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_accumulate.py
+----------
+Times the batches of the pipeline and transform_games against
+the former implementations growing the frames with pd.concat
+per row, on rendered match reports of synthetic leagues of
+growing size
+
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract import goal_columns, iter_games  # noqa: E402
+from pages import chrome, link, match_report_pages  # noqa: E402
+from pipeline import batches  # noqa: E402
+from run import StaticFetcher, crawl_items  # noqa: E402
+from synthetic import synthetic_league  # noqa: E402
+from transform import transform_games  # noqa: E402
+
+# the former pd.concat per row is quadratic, 10k games already take minutes
+max_concat_games = 2_000
+
+base_url = "http://stub/"
+
+
+def games_concat(games_links_cleaned, fetcher):
+    """Former extract_games, one frame per game concatenated to the season"""
+
+    games = {}
+    goals = {}
+
+    for season in games_links_cleaned:
+        season_games = pd.DataFrame()
+        season_goals = pd.DataFrame(columns=goal_columns)
+
+        for _, game, game_goals in iter_games(
+            {season: games_links_cleaned[season]}, fetcher, workers=1
+        ):
+            season_games = pd.concat([season_games, pd.DataFrame([game])])
+            season_goals = pd.concat(
+                [season_goals, pd.DataFrame(game_goals, columns=goal_columns)]
+            )
+
+        year = season.split("_")[1]
+        games[f"games_{year}"] = season_games
+        goals[f"goals_{year}"] = season_goals
+
+    return games, goals
+
+
+def transform_games_concat(games, goals):
+    """Former transform_games, one frame per player concatenated to the season"""
+
+    player_stats = {}
+
+    for season in games.keys():
+        games[season] = games[season].drop_duplicates()
+        season_goals = goals[season.replace("games", "goals")]
+        player_stats[season] = pd.DataFrame()
+
+        for player in set(season_goals["Spieler"]):
+            player_goals = season_goals[season_goals["Spieler"] == player]
+            scored = player_goals[~player_goals["Eigentor"]]
+
+            goal_home = (scored["Seite"] == "Heim").sum()
+            goal_away = (scored["Seite"] == "Gast").sum()
+
+            record = {
+                "Spieler": player,
+                "AnzahlTore": goal_home + goal_away,
+                "Heim": goal_home,
+                "Auswärts": goal_away,
+                "Penalty": scored["Penalty"].sum(),
+                "Eigentor": player_goals["Eigentor"].sum(),
+            }
+            player_stats[season] = pd.concat(
+                [player_stats[season], pd.DataFrame([record])]
+            )
+
+        player_stats[season] = player_stats[season].set_index("Spieler")
+
+    return games, player_stats
+
+
+def games_batches(games_links_cleaned, fetcher):
+    """Games and goal events of the crawl, batch by batch like the pipeline"""
+
+    return list(batches(iter_games(games_links_cleaned, fetcher, workers=1)))
+
+
+def match_reports(n_games):
+    """Game links of a synthetic league and a fetcher serving their match reports"""
+
+    games, goals = synthetic_league(n_games)
+    item = crawl_items(base_url)[0]
+
+    pages = {
+        base_url + link(game, item.league_id): page
+        for game, page in match_report_pages(games, goals, chrome()).items()
+    }
+
+    return {"season_2021": dict.fromkeys(pages, item)}, StaticFetcher(pages)
+
+
+def measure(func, *args):
+    """Wall time in seconds and peak memory in MB, measured in separate runs"""
+
+    start = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+
+    return seconds, peak
+
+
+def main(sizes=(72, 1_000, 2_000, 10_000, 100_000)):
+    print(
+        f"{'games':>8} {'stage':>15} {'former s':>9} {'current s':>9} "
+        f"{'current MB':>10}"
+    )
+
+    for n_games in sizes:
+        games_links_cleaned, fetcher = match_reports(n_games)
+        # the pipeline stores batches of 500 games, the season is transformed at once
+        _, games, goals = zip(*games_batches(games_links_cleaned, fetcher))
+        games = {"games_2021": pd.concat(games, ignore_index=True)}
+        goals = pd.concat(goals, ignore_index=True)
+        # player ids are linked when the goals are loaded, see with_player_ids
+        goals["SpielerId"] = pd.factorize(goals["Spieler"])[0]
+        goals = {"goals_2021": goals}
+
+        for stage, former, current, args in [
+            ("batches", games_concat, games_batches, (games_links_cleaned, fetcher)),
+            # frames are copied, transform_games replaces the games of the dict
+            (
+                "transform_games",
+                lambda games, goals: transform_games_concat(dict(games), goals),
+                lambda games, goals: transform_games(dict(games), goals),
+                (games, goals),
+            ),
+        ]:
+            if n_games <= max_concat_games:
+                start = time.perf_counter()
+                former(*args)
+                former_seconds = f"{time.perf_counter() - start:9.3f}"
+            else:
+                former_seconds = f"{'-':>9}"
+
+            seconds, peak = measure(current, *args)
+            print(
+                f"{n_games:>8} {stage:>15} {former_seconds} {seconds:9.3f} {peak:10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_api.py
+----------
+Measures the requests per second of the JSON API on a local
+port, for full responses and for revalidations with ETag
+
+"""
+
+import asyncio
+import os
+import sys
+import time
+from urllib.parse import quote
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aggregates  # noqa: E402
+from api import create_app  # noqa: E402
+
+
+async def load(url, requests, concurrency, revalidate):
+    """Sends requests with concurrent clients, returns requests per second"""
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            assert response.status == 200, response.status
+            headers = {"If-None-Match": response.headers["ETag"]} if revalidate else {}
+
+        async def client(count):
+            for _ in range(count):
+                async with session.get(url, headers=headers) as response:
+                    await response.read()
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(client(requests // concurrency) for _ in range(concurrency))
+        )
+
+        return requests / (time.perf_counter() - start)
+
+
+async def main(port=8781, requests=20_000, concurrency=32):
+    runner = web.AppRunner(create_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    league, seasons = next(iter(aggregates.read_index()["leagues"].items()))
+    base = f"http://127.0.0.1:{port}"
+    paths = {
+        "rankings": f"/rankings/{quote(league)}/{seasons[0]}",
+        "topscorers": f"/topscorers/{quote(league)}/{seasons[0]}?threshold=2",
+    }
+
+    print(f"{'endpoint':>12} {'200 req/s':>10} {'304 req/s':>10}")
+
+    for name, path in paths.items():
+        full = await load(base + path, requests, concurrency, revalidate=False)
+        revalidated = await load(base + path, requests, concurrency, revalidate=True)
+        print(f"{name:>12} {full:10.0f} {revalidated:10.0f}")
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
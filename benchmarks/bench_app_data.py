@@ -0,0 +1,105 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_app_data.py
+----------
+Compares the data loading of an app start and of a season
+switch from the precomputed aggregates with transforming
+all stored seasons on start
+
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aggregates  # noqa: E402
+import storage  # noqa: E402
+from transform import goal_columns, transform_games, transform_rankings  # noqa: E402
+
+
+def read_seasons(kind, prefix, columns=None):
+    """Stored frames keyed like "games_2021", one per season"""
+
+    return {
+        f"{prefix}_{season}": storage.read(
+            kind, columns=columns, where={"Saison": season}
+        ).drop(columns="Saison", errors="ignore")
+        for season in storage.seasons(kind)
+    }
+
+
+def transform_start():
+    """Former app start, every season is read and transformed"""
+
+    rankings = transform_rankings(read_seasons("ranking", "ranking"))
+    _, player_stats = transform_games(
+        read_seasons("games", "games"), read_seasons("goals", "goals", goal_columns)
+    )
+
+    return rankings, player_stats
+
+
+def transform_season(data, league, season):
+    """Former season switch, selection and sort of the transformed frames"""
+
+    rankings, player_stats = data
+    stats = player_stats[f"games_{season}"]
+
+    return (
+        rankings[f"ranking_{season}"],
+        stats[stats["AnzahlTore"] >= 1].sort_values(by=["AnzahlTore"], ascending=False),
+    )
+
+
+def aggregates_start():
+    """App start from the aggregates, only the index is read"""
+
+    return aggregates.read_index()
+
+
+def aggregates_season(index, league, season):
+    """Season switch, the tables of one season are memory mapped"""
+
+    return (
+        aggregates.read("ranking", league, season),
+        aggregates.topscorers(league, season, 1),
+    )
+
+
+def timed(func, *args, repeat=5):
+    """Best of repeat run times in ms and the last result"""
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return result, best * 1000
+
+
+def main():
+    index = aggregates.read_index()
+
+    print(f"{'':>12} {'start ms':>9} {'switch ms':>10}")
+
+    for name, start, switch in [
+        ("transform", transform_start, transform_season),
+        ("aggregates", aggregates_start, aggregates_season),
+    ]:
+        data, start_ms = timed(start)
+        switch_ms = max(
+            timed(switch, data, league, season)[1]
+            for league, seasons in index["leagues"].items()
+            for season in seasons
+        )
+
+        print(f"{name:>12} {start_ms:9.2f} {switch_ms:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_app_page.py
+----------
+Measures the page weight of header image and chart and the
+rerun time of the app with the original image and a chart
+built on every rerun against the header variant and a chart
+cached per data subset
+
+"""
+
+import os
+import sys
+import time
+from functools import lru_cache
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import aggregates  # noqa: E402
+from charts import goals_bar_chart  # noqa: E402
+from images import header_path, source_image  # noqa: E402
+
+
+def read_bytes(path):
+    with open(os.path.join(root, path), "rb") as file:
+        return file.read()
+
+
+def chart(league, season, threshold):
+    return goals_bar_chart(
+        aggregates.topscorers(league, season, threshold), "Torschützen", 0.5
+    )
+
+
+cached_chart = lru_cache(maxsize=64)(chart)
+cached_header = lru_cache(maxsize=1)(read_bytes)
+
+
+def rerun(image, path, build_chart, league, season, threshold):
+    """Work of a rerun, the chart is serialized for the browser every time"""
+
+    return len(image(path)), len(build_chart(league, season, threshold).to_json())
+
+
+def timed(func, *args, repeat=20):
+    """Mean run time in ms and the last result"""
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    league, seasons = next(iter(aggregates.read_index()["leagues"].items()))
+    season = seasons[0]
+
+    print("header image")
+    for path in [source_image] + [header_path(width) for width in (800, 1400, 2000)]:
+        print(f"{path:>40} {len(read_bytes(path)) / 1024:9.0f} kB")
+
+    print(f"\nrerun {league} {season}")
+    print(f"{'':>12} {'image kB':>9} {'chart kB':>9} {'rerun ms':>9}")
+
+    for name, image, path, build_chart in [
+        ("original", read_bytes, source_image, chart),
+        ("optimized", cached_header, header_path(1400), cached_chart),
+    ]:
+        # warm the caches with the first rerun
+        rerun(image, path, build_chart, league, season, 1)
+        (image_bytes, chart_bytes), ms = timed(
+            rerun, image, path, build_chart, league, season, 1
+        )
+
+        print(
+            f"{name:>12} {image_bytes / 1024:9.0f} {chart_bytes / 1024:9.1f} {ms:9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_goal_memory.py
+----------
+Measures the memory per goal event of the record lists, of
+frames with object and string columns and of the compact
+representation, at the scale of all FVBJ leagues over ten
+seasons
+
+"""
+
+import os
+import sys
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract import goal_columns  # noqa: E402
+from synthetic import synthetic_league  # noqa: E402
+from transform import aggregate_player_stats, compact_goals  # noqa: E402
+
+# about 60 groups of 10 teams in all leagues of the region per season
+groups = 60
+seasons = 10
+games_per_group = 90
+
+string_columns = ["Liga", "Gruppe", "Seite", "Spieler"]
+
+
+def goal_records():
+    """Goal event tuples of all seasons as iter_games yields them"""
+
+    _, goals = synthetic_league(groups * games_per_group * seasons)
+
+    group = goals["Spiel"].to_numpy() // games_per_group
+    goals.insert(0, "Liga", [f"{2 + g % 4}. Liga" for g in group])
+    goals.insert(1, "Gruppe", [f"Gruppe {g % 15 + 1}" for g in group])
+
+    # parsed pages hold a string object per event like the parser returns them
+    return [
+        tuple(str(value) if isinstance(value, str) else value for value in row)
+        for row in goals.drop(columns="SpielerId").itertuples(index=False)
+    ]
+
+
+def traced(func):
+    """Result of func and the memory it holds on to in bytes"""
+
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return result, size
+
+
+def main():
+    records, records_size = traced(goal_records)
+    n_goals = len(records)
+
+    goals = pd.DataFrame(records, columns=goal_columns)
+    # player ids of the store, linked by name in the pipeline
+    goals["SpielerId"] = pd.factorize(goals["Spieler"])[0]
+
+    sizes = {
+        "record tuples": records_size,
+        "object columns": goals.astype({column: object for column in string_columns})
+        .memory_usage(deep=True)
+        .sum(),
+        "string columns": goals.memory_usage(deep=True).sum(),
+        "compact": compact_goals(goals).memory_usage(deep=True).sum(),
+    }
+
+    print(f"{n_goals} goal events, {goals['SpielerId'].nunique()} players")
+    for name, size in sizes.items():
+        print(
+            f"{name:>15}: {size / 2**20:8.1f} MB, {size / n_goals:6.1f} bytes per event, "
+            f"{sizes['record tuples'] / size:5.1f}x smaller than the records"
+        )
+
+    pd.testing.assert_frame_equal(
+        aggregate_player_stats(goals),
+        aggregate_player_stats(compact_goals(goals)),
+        check_index_type=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
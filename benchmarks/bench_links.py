@@ -0,0 +1,74 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_links.py
+----------
+Compares the game link extraction over the schedule table
+anchors with the former regex over every anchor of the page
+on saved schedule pages of all seasons
+
+"""
+
+import glob
+import os
+import re
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parse import parse_game_links  # noqa: E402
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+base_url = "https://www.fvbj-afbj.ch/"
+game_link_pattern = (
+    "fussballverband-bern-jura/spielbetrieb-fvbj/meisterschaft-fvbj.aspx/ln-13040/v-0"
+)
+
+
+def games_links_find_all(page_source):
+    """Former implementation of get_games_links, a regex over every anchor"""
+
+    soup = BeautifulSoup(page_source, "lxml")
+    links = soup.find_all(href=True)
+
+    return [
+        base_url + link["href"]
+        for link in links
+        if re.search(game_link_pattern, str(link))
+    ]
+
+
+def main(number=20):
+    pages = [
+        open(path, encoding="utf-8").read()
+        for path in sorted(glob.glob(os.path.join(fixtures, "schedule_*.html")))
+    ]
+
+    # same links, the former list may repeat games linked twice
+    for page in pages:
+        assert list(dict.fromkeys(games_links_find_all(page))) == list(
+            parse_game_links(page, base_url, game_link_pattern)
+        )
+
+    for name, extract in [
+        ("find_all", games_links_find_all),
+        (
+            "parse_game_links",
+            lambda page: parse_game_links(page, base_url, game_link_pattern),
+        ),
+    ]:
+        seconds = timeit.timeit(lambda: [extract(page) for page in pages], number=number)
+        links = sum(len(extract(page)) for page in pages)
+        print(
+            f"{name:>17}: {seconds / (number * len(pages)) * 1000:.2f} ms per page, "
+            f"{links} links"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_player_stats.py
+----------
+Checks the vectorized player stats against the player stats
+of the stored seasons saved from the former implementation,
+and compares the run times of both on synthetic leagues
+
+usage: python benchmarks/bench_player_stats.py
+
+The fixtures player_stats_{season}.csv hold the stats of the
+former per player loop of transform_games, keyed by name.
+
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+from synthetic import synthetic_league  # noqa: E402
+from transform import aggregate_player_stats, goal_columns  # noqa: E402
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# the former implementation scans all goal events per player
+max_former_games = 2_000
+
+
+def player_stats_former(goals):
+    """Former implementation, one scan of the goal events per player"""
+
+    records = []
+
+    for player in sorted(set(goals["SpielerId"])):
+        player_goals = goals[goals["SpielerId"] == player]
+        scored = player_goals[~player_goals["Eigentor"]]
+
+        goal_home = (scored["Seite"] == "Heim").sum()
+        goal_away = (scored["Seite"] == "Gast").sum()
+
+        records.append(
+            {
+                "SpielerId": player,
+                "Spieler": player_goals["Spieler"].value_counts().idxmax(),
+                "AnzahlTore": goal_home + goal_away,
+                "Heim": goal_home,
+                "Auswärts": goal_away,
+                "Penalty": scored["Penalty"].sum(),
+                "Eigentor": player_goals["Eigentor"].sum(),
+            }
+        )
+
+    return pd.DataFrame(records)
+
+
+def expected_player_stats(season):
+    """Player stats of a stored season by name, saved from the former implementation"""
+
+    return pd.read_csv(
+        os.path.join(fixtures, f"player_stats_{season}.csv"), index_col="Spieler"
+    )
+
+
+def player_stats_by_name(goals):
+    """Vectorized player stats with one id per spelling, like the former stats"""
+
+    goals = goals.assign(SpielerId=pd.factorize(goals["Spieler"])[0])
+    return aggregate_player_stats(goals).set_index("Spieler").sort_index()
+
+
+def check_stored_seasons():
+    """Compares the stats of the stored seasons with the saved fixtures"""
+
+    for season in sorted(storage.seasons("goals")):
+        goals = storage.read("goals", columns=goal_columns, where={"Saison": season})
+        pd.testing.assert_frame_equal(
+            player_stats_by_name(goals),
+            expected_player_stats(season),
+            check_dtype=False,
+        )
+        print(f"season {season}: {len(goals)} goal events match the former stats")
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(sizes=(1_000, 2_000, 10_000, 100_000)):
+    check_stored_seasons()
+
+    print(f"{'data':>16} {'events':>7} {'former s':>11} {'vectorized s':>12}")
+
+    for n_games in sizes:
+        data = synthetic_league(n_games)[1]
+        _, seconds = timed(aggregate_player_stats, data)
+
+        if n_games <= max_former_games:
+            _, former_seconds = timed(player_stats_former, data)
+            former_seconds = f"{former_seconds:11.3f}"
+        else:
+            former_seconds = f"{'-':>11}"
+
+        name = f"synthetic {n_games}"
+        print(f"{name:>16} {len(data):>7} {former_seconds} {seconds:12.4f}")
+
+
+if __name__ == "__main__":
+    main()
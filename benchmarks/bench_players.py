@@ -0,0 +1,77 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_players.py
+----------
+Measures linking scorer names to player ids for tens of
+thousands of names with misspelled and reformatted variants
+
+"""
+
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from players import player_ids  # noqa: E402
+
+first_names = ["Kilian", "Cédric", "Florian", "Fabian", "Adrian", "Andreas", "Joel"]
+
+
+def synthetic_names(n_players, variants=0.2, seed=0):
+    """
+    Distinct player names, spellings of them and their teams
+
+    Every player has a common first name, a random last name and one
+    of a team per 20 players, a share of the spellings changes case,
+    spaces, the order of the names or doubles a letter.
+
+    """
+
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n_players:
+        last = "".join(rng.choices(string.ascii_lowercase, k=8)).capitalize()
+        names.add(f"{rng.choice(first_names)} {last}")
+    names = sorted(names)
+    teams = {name: f"FC Team {rng.randrange(n_players // 20)}" for name in names}
+
+    spellings = list(names)
+    for name in rng.sample(names, int(n_players * variants)):
+        first, last = name.split()
+        position = rng.randrange(1, len(last) - 1)
+        spelling = rng.choice(
+            [
+                f"  {first.upper()}   {last}",
+                f"{last} {first}",
+                f"{first} {last[:position]}{last[position]}{last[position:]}",
+            ]
+        )
+        spellings.append(spelling)
+        teams[spelling] = teams[name]
+
+    return names, spellings, [teams[spelling] for spelling in spellings]
+
+
+def main(sizes=(1_000, 10_000, 50_000)):
+    print(f"{'players':>8} {'spellings':>9} {'ids':>7} {'seconds':>8}")
+
+    for n_players in sizes:
+        names, spellings, teams = synthetic_names(n_players)
+        connection = database.connect(":memory:")
+
+        start = time.perf_counter()
+        ids = player_ids(connection, spellings, teams)
+        seconds = time.perf_counter() - start
+
+        print(f"{n_players:>8} {len(spellings):>9} {len(set(ids.values())):>7} {seconds:8.2f}")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_ranking_history.py
+----------
+Simulates daily crawls of the rankings of all FVBJ leagues over
+a season and compares the size of the delta encoded snapshots
+with full snapshots, and times trajectory queries
+
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+groups = 60
+teams_per_group = 10
+days = 270
+# every group plays a round per week, 18 rounds in autumn and spring
+rounds = 18
+
+
+def rankings(seed=0):
+    """Yields the crawl time and the ranking of all groups of every day"""
+
+    rng = np.random.default_rng(seed)
+    stats = np.zeros((groups, teams_per_group, 5), dtype=int)  # Sp, S, U, T, GT
+    teams = np.arange(groups * teams_per_group).reshape(groups, teams_per_group)
+    played = np.zeros(groups, dtype=int)
+
+    for day in range(days):
+        for group in range(groups):
+            # groups play on different weekdays, with a winter break
+            if (day + group) % 7 or played[group] >= rounds or 120 <= day < 180:
+                continue
+
+            played[group] += 1
+            order = rng.permutation(teams_per_group)
+            for home, away in order.reshape(-1, 2):
+                goals = rng.poisson([2.1, 1.7])
+                for team, scored, against in ((home, *goals), (away, *goals[::-1])):
+                    stats[group, team] += [
+                        1, scored > against, scored == against, scored, against
+                    ]
+
+        frames = []
+        for group in range(groups):
+            games, wins, draws, goals, against = stats[group].T
+            points = 3 * wins + draws
+            frame = pd.DataFrame(
+                {
+                    "Liga": f"{2 + group % 4}. Liga",
+                    "Gruppe": f"Gruppe {group}",
+                    "Team": [f"FC Team {team}" for team in teams[group]],
+                    "Spiele": games,
+                    "Siege": wins,
+                    "Unentschieden": draws,
+                    "Niederlagen": games - wins - draws,
+                    "Strafpunkte": 0,
+                    "Tore": goals,
+                    "Gegentore": against,
+                    "Tordifferenz": goals - against,
+                    "Punkte": points,
+                }
+            )
+            frame = frame.sort_values(
+                ["Punkte", "Tordifferenz"], ascending=False, kind="stable"
+            )
+            frame.insert(2, "Rang", np.arange(1, teams_per_group + 1))
+            frames.append(frame)
+
+        crawled_at = datetime(2021, 8, 1, 6) + timedelta(days=day)
+        yield crawled_at.isoformat(), pd.concat(frames, ignore_index=True)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        connection = database.connect(os.path.join(directory, "delta.sqlite"))
+
+        # every crawled row stored, the alternative to delta encoding
+        full = sqlite3.connect(os.path.join(directory, "full.sqlite"))
+        full.execute(
+            "CREATE TABLE snapshots (crawled_at TEXT, league TEXT, grp TEXT, "
+            "team INTEGER, rank INTEGER, games INTEGER, wins INTEGER, draws INTEGER, "
+            "losses INTEGER, penalty_points INTEGER, goals INTEGER, "
+            "goals_against INTEGER, goal_difference INTEGER, points INTEGER)"
+        )
+
+        crawled = 0
+        seconds = 0
+        for crawled_at, ranking in rankings():
+            start = time.perf_counter()
+            database.upsert_rankings(connection, ranking, 2021, crawled_at)
+            seconds += time.perf_counter() - start
+            crawled += len(ranking)
+
+            with full:
+                full.executemany(
+                    f"INSERT INTO snapshots VALUES ({', '.join(['?'] * 14)})",
+                    [
+                        (crawled_at, row[0], row[1], int(row[3].split()[-1]))
+                        + tuple(int(value) for value in row[[2, *range(4, 13)]])
+                        for row in ranking.to_numpy()
+                    ],
+                )
+
+        (changes,) = connection.execute(
+            "SELECT COUNT(*) FROM ranking_changes"
+        ).fetchone()
+        connection.execute("VACUUM")
+        full.execute("VACUUM")
+
+        print(f"{days} crawls of {groups} groups stored in {seconds:.1f} s")
+        print(f"{crawled} crawled rows, {changes} stored changes")
+        for name in ("delta", "full"):
+            size = os.path.getsize(os.path.join(directory, f"{name}.sqlite"))
+            print(f"{name:>6}: {size / 2**20:6.2f} MB")
+
+        start = time.perf_counter()
+        for team in range(100):
+            trajectory = database.ranking_trajectory(
+                f"FC Team {team}", 2021, connection=connection
+            )
+        seconds = (time.perf_counter() - start) / 100
+        print(f"trajectory of {len(trajectory)} changes in {seconds * 1000:.2f} ms")
+
+        connection.close()
+        full.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/bench_rankings.py
+----------
+Compares the single pass ranking parser with the former
+eleven find_all scans on saved ranking pages
+
+"""
+
+import glob
+import os
+import sys
+import timeit
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parse import parse_ranking, ranking_classes  # noqa: E402
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def parse_ranking_find_all(page_source):
+    """Former implementation of extract_rankings, one find_all per column"""
+
+    soup = BeautifulSoup(page_source, "lxml")
+    columns = {
+        column: [cell.text for cell in soup.find_all(attrs={"class": class_})]
+        for class_, column in ranking_classes.items()
+    }
+
+    return pd.DataFrame(columns)
+
+
+def main(number=20):
+    pages = [
+        open(path, encoding="utf-8").read()
+        for path in sorted(glob.glob(os.path.join(fixtures, "ranking_*.html")))
+    ]
+
+    for name, parser in [
+        ("find_all", parse_ranking_find_all),
+        ("parse_ranking", lambda page: pd.DataFrame(parse_ranking(page))),
+    ]:
+        seconds = timeit.timeit(lambda: [parser(page) for page in pages], number=number)
+        print(f"{name:>15}: {seconds / (number * len(pages)) * 1000:.2f} ms per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/pages.py
+----------
+Renders schedule and match report pages like the ones of the
+site, with the page chrome of the recorded ranking fixtures,
+for stored seasons and for synthetic leagues
+
+usage: python benchmarks/pages.py  (writes the fixtures of the stored seasons)
+
+"""
+
+import html
+import os
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# match report links of a league, game ids follow "sp-" like on the site
+game_link = "fussballverband-bern-jura/spielbetrieb-fvbj/meisterschaft-fvbj.aspx/ln-{league_id}/v-0/sp-{game}/"
+
+
+def chrome(season=2021):
+    """Page before and after the content of a recorded ranking page"""
+
+    with open(os.path.join(fixtures, f"ranking_{season}.html"), encoding="utf-8") as file:
+        page = file.read()
+
+    start = page.index('<div id="content">') + len('<div id="content">')
+    end = page.index('<div id="footer">')
+
+    return page[:start], page[end:]
+
+
+def link(game, league_id=13040):
+    return game_link.format(league_id=league_id, game=game)
+
+
+def schedule_page(games, page_chrome, league_id=13040):
+    """
+    Schedule page of games, with team and navigation links around the game links
+
+    Parameters
+    ----------
+    games : DataFrame
+        games with Spiel, Heimteam, Gastteam and Resultat
+    page_chrome : tuple
+        page before and after the content, see chrome
+    league_id : int
+        league of the game links
+
+    Returns
+    -------
+    page : str
+        html of the schedule
+
+    """
+
+    rows = []
+
+    for game in games.itertuples():
+        rows.append(
+            '<tr class="spRow">'
+            f'<td class="spDatum">Sa 01.05. 16:00</td>'
+            f'<td class="spTeam"><a href="fussballverband-bern-jura/spielbetrieb-fvbj/'
+            f'meisterschaft-fvbj.aspx/v-1/t-{zlib.crc32(game.Heimteam.encode()) % 100000}/a-tr/">'
+            f"{html.escape(game.Heimteam)}</a></td>"
+            f'<td class="spTeam">{html.escape(game.Gastteam)}</td>'
+            f'<td class="spResultat"><a href="{link(game.Spiel, league_id)}">'
+            f"{html.escape(game.Resultat)}</a></td>"
+            "</tr>"
+        )
+
+    table = (
+        '<div class="nisListe"><h2>Spielplan</h2><table class="table schedule">\n'
+        + "\n".join(rows)
+        + "\n</table></div>\n"
+    )
+
+    return page_chrome[0] + "\n" + table + page_chrome[1]
+
+
+def goal_text(goal):
+    """Scorer entry of a goal event, e.g. "23' Pascal Halter (Penalty)" """
+
+    player = f"Eigentor ({goal.Spieler})" if goal.Eigentor else goal.Spieler
+    minute = "" if goal.Minute != goal.Minute else f"{int(goal.Minute)}' "
+    penalty = " (Penalty)" if goal.Penalty else ""
+
+    return html.escape(f"{minute}{player}{penalty}")
+
+
+def match_report_page(game, goals, page_chrome):
+    """
+    Match report page of a game
+
+    Parameters
+    ----------
+    game : namedtuple
+        game with Heimteam, Gastteam and Resultat
+    goals : DataFrame
+        goal events of the game in order
+    page_chrome : tuple
+        page before and after the content, see chrome
+
+    Returns
+    -------
+    page : str
+        html of the match report
+
+    """
+
+    scorers = "\n".join(
+        f'<div class="{"shortSpielerHome" if goal.Seite == "Heim" else "shortSpielerGast"}">'
+        f"{goal_text(goal)}</div>"
+        for goal in goals.itertuples()
+    )
+
+    content = (
+        '<div class="shortReport">\n'
+        f'<div class="shortTeamHeim">{html.escape(game.Heimteam)}</div>\n'
+        f'<div class="shortResults">{html.escape(game.Resultat)}</div>\n'
+        f'<div class="shortTeamGast">{html.escape(game.Gastteam)}</div>\n'
+        f"{scorers}\n"
+        "</div>\n"
+    )
+
+    return page_chrome[0] + "\n" + content + page_chrome[1]
+
+
+def match_report_pages(games, goals, page_chrome):
+    """Match report page per game id"""
+
+    goals_per_game = dict(tuple(goals.groupby("Spiel", sort=False)))
+    empty = goals.iloc[:0]
+
+    return {
+        game.Spiel: match_report_page(
+            game, goals_per_game.get(game.Spiel, empty), page_chrome
+        )
+        for game in games.itertuples()
+    }
+
+
+def fixture_games(season):
+    """Stored games and goal events of a season with ids like on the site"""
+
+    where = {"Saison": int(season)}
+    games = storage.read("games", where=where)
+    goals = storage.read("goals", where=where)
+
+    # games stored before links were recorded are numbered per season
+    offset = int(season) * 10_000
+    return (
+        games.assign(Spiel=games["Spiel"] + offset),
+        goals.assign(Spiel=goals["Spiel"] + offset),
+    )
+
+
+def write_fixtures(seasons=(2019, 2020, 2021)):
+    """Writes a schedule and the first match report per stored season"""
+
+    for season in seasons:
+        page_chrome = chrome(season)
+        games, goals = fixture_games(season)
+
+        with open(
+            os.path.join(fixtures, f"schedule_{season}.html"), "w", encoding="utf-8"
+        ) as file:
+            file.write(schedule_page(games, page_chrome))
+
+        game = next(games.itertuples())
+        with open(
+            os.path.join(fixtures, f"match_report_{season}.html"), "w", encoding="utf-8"
+        ) as file:
+            file.write(
+                match_report_page(game, goals[goals["Spiel"] == game.Spiel], page_chrome)
+            )
+
+
+if __name__ == "__main__":
+    write_fixtures()
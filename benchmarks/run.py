@@ -0,0 +1,362 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/run.py
+----------
+Measures throughput and peak memory of every pipeline stage,
+fetch against the stub server, parse, transform and load, on
+the recorded fixtures and synthetic leagues of growing size
+
+usage: python benchmarks/run.py [--games 500 5000] [--output results.json]
+                                [--baseline previous.json]
+
+Results are printed as JSON, with --baseline the ratio of the
+throughput to a previous run is reported per stage and case.
+
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+benchmarks = os.path.dirname(os.path.abspath(__file__))
+root = os.path.dirname(benchmarks)
+sys.path.insert(0, root)
+
+import database  # noqa: E402
+from crawl_spec import expand_spec, load_spec  # noqa: E402
+from extract import get_games_links  # noqa: E402
+from fetcher import HttpFetcher  # noqa: E402
+from load import StoreSink  # noqa: E402
+from pages import chrome, fixtures, match_report_pages, schedule_page  # noqa: E402
+from parse import parse_match_report, parse_ranking  # noqa: E402
+from synthetic import synthetic_league  # noqa: E402
+from transform import transform_games, transform_rankings  # noqa: E402
+
+
+def read_fixtures(kind):
+    """Recorded pages of a kind per season"""
+
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(fixtures, f"{kind}_*.html"))):
+        with open(path, encoding="utf-8") as file:
+            pages[int(path.rsplit("_", 1)[1].split(".")[0])] = file.read()
+
+    return pages
+
+
+def league(n_games):
+    """Synthetic league with the league columns of extracted frames"""
+
+    games, goals = synthetic_league(n_games)
+    games.insert(0, "Liga", "5. Liga")
+    games.insert(1, "Gruppe", "Gruppe 1")
+    goals.insert(0, "Liga", "5. Liga")
+    goals.insert(1, "Gruppe", "Gruppe 1")
+
+    return games, goals
+
+
+class StaticFetcher:
+    """Fetcher of pages held in memory"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def fetch_all(self, urls, failed=None):
+        return {url: self.pages[url] for url in dict.fromkeys(urls)}
+
+
+@contextlib.contextmanager
+def stub_server(n_games):
+    """Runs the stub server in a process of its own, yields its base url"""
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(benchmarks, "stub_server.py"),
+            "--port",
+            str(port),
+            "--games",
+            str(n_games),
+        ]
+    )
+
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError("stub server did not start") from None
+                time.sleep(0.1)
+
+        yield f"http://127.0.0.1:{port}/"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def crawl_items(base_url):
+    spec = load_spec(os.path.join(root, "crawl_spec.json"))
+    spec["base_url"] = base_url
+
+    return expand_spec(spec)
+
+
+# every case returns the number of processed items and a function doing the work
+
+
+def fetch_cases(n_games):
+    """Rankings, schedules and match reports of all seasons from the stub server"""
+
+    with stub_server(n_games) as base_url:
+        items = crawl_items(base_url)
+        fetcher = HttpFetcher(concurrency=16, rate_limit=0)
+
+        # the stub server builds the synthetic seasons on the first schedule request
+        schedules = fetcher.fetch_all([item.schedule_link for item in items])
+        links = list(get_games_links(base_url, items, StaticFetcher(schedules)).values())
+        urls = [
+            *(item.ranking_link for item in items),
+            *(item.schedule_link for item in items),
+            *(link for season_links in links for link in season_links),
+        ]
+
+        yield f"stub_{n_games}", len(urls), lambda: fetcher.fetch_all(urls)
+
+
+def parse_cases(n_games):
+    rankings = read_fixtures("ranking")
+    yield "ranking_fixtures", len(rankings), lambda: [
+        parse_ranking(page) for page in rankings.values()
+    ]
+
+    base_url = "http://stub/"
+    items = crawl_items(base_url)
+    schedules = read_fixtures("schedule")
+    fetcher = StaticFetcher(
+        {item.schedule_link: schedules[int(item.season)] for item in items}
+    )
+    yield "schedule_fixtures", len(items), lambda: get_games_links(
+        base_url, items, fetcher
+    )
+
+    games, goals = league(n_games)
+    synthetic_items = [items[0]]
+    synthetic = StaticFetcher(
+        {items[0].schedule_link: schedule_page(games, chrome(), items[0].league_id)}
+    )
+    yield f"schedule_{n_games}", n_games, lambda: get_games_links(
+        base_url, synthetic_items, synthetic
+    )
+
+    reports = read_fixtures("match_report")
+    yield "match_report_fixtures", len(reports), lambda: [
+        parse_match_report(page, game) for game, page in enumerate(reports.values())
+    ]
+
+    reports = match_report_pages(games, goals, chrome())
+    yield f"match_report_{n_games}", n_games, lambda: [
+        parse_match_report(page, game) for game, page in reports.items()
+    ]
+
+
+def transform_cases(n_games):
+    rankings = {}
+    for season, page in read_fixtures("ranking").items():
+        ranking = pd.DataFrame(parse_ranking(page))
+        # one group per 90 games like the stored leagues
+        groups = [
+            ranking.assign(Gruppe=f"Gruppe {group}")
+            for group in range(max(1, n_games // 90))
+        ]
+        rankings[f"ranking_{season}"] = pd.concat(groups, ignore_index=True).assign(
+            Liga="5. Liga"
+        )
+
+    rows = sum(len(ranking) for ranking in rankings.values())
+    yield f"rankings_{n_games}", rows, lambda: transform_rankings(dict(rankings))
+
+    games, goals = league(n_games)
+    games = {"games_2021": games.drop(columns="Link")}
+    goals = {"goals_2021": goals}
+    yield f"games_{n_games}", n_games, lambda: transform_games(dict(games), goals)
+
+
+def load_cases(n_games):
+    """Batches of a crawl into an empty parquet store and database"""
+
+    games, goals = league(n_games)
+    goals = goals.drop(columns="SpielerId")
+
+    def load():
+        with tempfile.TemporaryDirectory() as directory:
+            connection = database.connect(os.path.join(directory, "fvbj.sqlite"))
+            sink = StoreSink(connection, root=os.path.join(directory, "parquet"))
+
+            for start in range(0, n_games, 500):
+                batch = games.iloc[start : start + 500]
+                sink.write_games(
+                    "2021", batch, goals[goals["Spiel"].isin(batch["Spiel"])]
+                )
+
+            connection.close()
+
+    yield f"games_{n_games}", n_games, load
+
+
+stages = {
+    "fetch": fetch_cases,
+    "parse": parse_cases,
+    "transform": transform_cases,
+    "load": load_cases,
+}
+
+
+def measure(func, repeat):
+    """Best of repeat run times in seconds and the peak of traced memory in MB"""
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    # an extra run, tracing slows the work down
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak / 2**20
+
+
+def run(sizes, selected=stages, repeat=3):
+    """
+    Runs the benchmarks
+
+    Parameters
+    ----------
+    sizes : list
+        numbers of games of the synthetic leagues
+    selected : list
+        names of the stages to run
+    repeat : int
+        runs per case, the fastest counts
+
+    Returns
+    -------
+    results : list
+        dict per stage and case with items, seconds, items_per_s and peak_mb
+
+    """
+
+    results = []
+
+    for stage in selected:
+        for n_games in sizes:
+            for case, items, func in stages[stage](n_games):
+                # fixture cases do not depend on the size
+                if any(
+                    (result["stage"], result["case"]) == (stage, case)
+                    for result in results
+                ):
+                    continue
+
+                # progress output of the stages must not end up in the json
+                with contextlib.redirect_stdout(sys.stderr):
+                    seconds, peak_mb = measure(func, repeat)
+
+                results.append(
+                    {
+                        "stage": stage,
+                        "case": case,
+                        "items": items,
+                        "seconds": round(seconds, 6),
+                        "items_per_s": round(items / seconds, 1),
+                        "peak_mb": round(peak_mb, 2),
+                    }
+                )
+
+    return results
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Prints the throughput of the results relative to a previous run"""
+
+    previous = {(result["stage"], result["case"]): result for result in baseline["results"]}
+
+    print(f"compared to {baseline.get('commit')}", file=sys.stderr)
+    for result in results:
+        before = previous.get((result["stage"], result["case"]))
+        if before:
+            print(
+                f"{result['stage']:>10} {result['case']:>24} "
+                f"{result['items_per_s'] / before['items_per_s']:6.2f}x throughput "
+                f"{result['peak_mb'] - before['peak_mb']:+8.2f} MB peak",
+                file=sys.stderr,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the pipeline stages")
+    parser.add_argument("--games", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--stages", nargs="+", choices=list(stages), default=list(stages))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="json file, defaults to stdout")
+    parser.add_argument("--baseline", help="json file of a previous run")
+    args = parser.parse_args()
+
+    report = {
+        "commit": commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": run(args.games, args.stages, args.repeat),
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            compare(report["results"], json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/stub_server.py
+----------
+Serves the ranking, schedule and match report pages of the
+crawl spec links from recorded fixtures and synthetic leagues,
+so fetching and whole crawls run without the live site
+
+usage: python benchmarks/stub_server.py [--port 8799] [--games 200]
+       FVBJ_BASE_URL=http://localhost:8799/ python pipeline.py
+
+"""
+
+import argparse
+import os
+import re
+import sys
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pages import chrome, fixtures, match_report_pages, schedule_page  # noqa: E402
+from synthetic import synthetic_league  # noqa: E402
+
+season_pattern = re.compile(r"/s-(\d+)/ln-(\d+)/")
+game_pattern = re.compile(r"/ln-(\d+)/v-0/sp-(\d+)/")
+
+
+class SyntheticSite:
+    """
+    Pages of a synthetic league per season, built on first request
+
+    Game ids are the season followed by the game number, e.g. sp-2021000017.
+
+    Parameters
+    ----------
+    games : int
+        number of games per league and season
+    seed : int
+        random seed of the first season
+
+    """
+
+    def __init__(self, games=200, seed=0):
+        self.games = games
+        self.seed = seed
+        self.seasons = {}
+
+    def season(self, season, league_id):
+        key = (season, league_id)
+
+        if key not in self.seasons:
+            games, goals = synthetic_league(self.games, seed=self.seed + season)
+            offset = season * 1_000_000
+            games = games.assign(Spiel=games["Spiel"] + offset)
+            goals = goals.assign(Spiel=goals["Spiel"] + offset)
+
+            page_chrome = chrome(season if os.path.exists(ranking_path(season)) else 2021)
+            self.seasons[key] = (
+                schedule_page(games, page_chrome, league_id),
+                match_report_pages(games, goals, page_chrome),
+            )
+
+        return self.seasons[key]
+
+    def match_report(self, game, league_id):
+        return self.season(game // 1_000_000, league_id)[1].get(game)
+
+
+def ranking_path(season):
+    return os.path.join(fixtures, f"ranking_{season}.html")
+
+
+async def handle(request):
+    site = request.app["site"]
+    path = request.path
+
+    game = game_pattern.search(path)
+    if game:
+        page = site.match_report(int(game.group(2)), int(game.group(1)))
+        if page is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=page, content_type="text/html")
+
+    season = season_pattern.search(path)
+    if season is None:
+        raise web.HTTPNotFound()
+
+    season, league_id = int(season.group(1)), int(season.group(2))
+
+    if path.rstrip("/").endswith("a-mrr"):
+        path = ranking_path(season) if os.path.exists(ranking_path(season)) else ranking_path(2021)
+        with open(path, encoding="utf-8") as file:
+            return web.Response(text=file.read(), content_type="text/html")
+
+    if path.rstrip("/").endswith("a-msp"):
+        return web.Response(text=site.season(season, league_id)[0], content_type="text/html")
+
+    raise web.HTTPNotFound()
+
+
+def create_app(games=200, seed=0):
+    """
+    Creates the stub server
+
+    Parameters
+    ----------
+    games : int
+        number of games per league and season
+    seed : int
+        random seed of the synthetic leagues
+
+    Returns
+    -------
+    app : aiohttp.web.Application
+        stub server application
+
+    """
+
+    app = web.Application()
+    app["site"] = SyntheticSite(games, seed)
+    app.router.add_get("/{tail:.*}", handle)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves stub pages of the site")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--games", type=int, default=200)
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.games), host=args.host, port=args.port, print=None)
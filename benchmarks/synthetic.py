@@ -0,0 +1,101 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+benchmarks/synthetic.py
+----------
+Generates synthetic leagues of any size with the
+layout of extracted games and goal events
+
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parse import Game, GoalEvent  # noqa: E402
+
+
+def synthetic_league(n_games, teams_per_group=10, players_per_team=18, seed=0):
+    """
+    Generates games and goal events
+
+    Teams play in groups of `teams_per_group`, every team has its own
+    players, on average 3.8 goals are scored per game like in the
+    stored seasons.
+
+    Parameters
+    ----------
+    n_games : int
+        number of games
+    teams_per_group : int
+        teams playing each other
+    players_per_team : int
+        scorers per team
+    seed : int
+        random seed
+
+    Returns
+    -------
+    games : DataFrame
+        games like the batches of the pipeline hold them
+    goals : DataFrame
+        goal events like the store holds them, with player ids
+
+    """
+
+    rng = np.random.default_rng(seed)
+    games_per_group = teams_per_group * (teams_per_group - 1)
+
+    group = np.arange(n_games) // games_per_group
+    home = group * teams_per_group + rng.integers(0, teams_per_group, n_games)
+    away = group * teams_per_group + (
+        (home % teams_per_group + rng.integers(1, teams_per_group, n_games))
+        % teams_per_group
+    )
+    home_goals = rng.poisson(2.1, n_games)
+    away_goals = rng.poisson(1.7, n_games)
+
+    games = pd.DataFrame(
+        {
+            "Link": [f"synthetic/sp-{game}/" for game in range(n_games)],
+            "Spiel": np.arange(n_games),
+            "Heimteam": [f"FC Team {team}" for team in home],
+            "Gastteam": [f"FC Team {team}" for team in away],
+            "Resultat": [f"{h}:{a}" for h, a in zip(home_goals, away_goals)],
+        },
+        columns=["Link", *Game._fields],
+    )
+
+    game = np.concatenate(
+        [np.repeat(np.arange(n_games), home_goals), np.repeat(np.arange(n_games), away_goals)]
+    )
+    is_home = np.concatenate(
+        [np.ones(home_goals.sum(), bool), np.zeros(away_goals.sum(), bool)]
+    )
+    team = np.where(is_home, home[game], away[game])
+    n_goals = len(game)
+
+    own_goal = rng.random(n_goals) < 0.02
+    # own goals are scored by a player of the other team
+    scorer_team = np.where(own_goal, np.where(is_home, away[game], home[game]), team)
+    player = scorer_team * players_per_team + rng.zipf(1.6, n_goals) % players_per_team
+
+    goals = pd.DataFrame(
+        {
+            "Spiel": game,
+            "Seite": np.where(is_home, "Heim", "Gast"),
+            "Spieler": [f"Spieler {p}" for p in player],
+            "SpielerId": player,
+            "Minute": rng.integers(1, 91, n_goals),
+            "Penalty": ~own_goal & (rng.random(n_goals) < 0.05),
+            "Eigentor": own_goal,
+        },
+        columns=[*GoalEvent._fields[:3], "SpielerId", *GoalEvent._fields[3:]],
+    )
+
+    return games, goals.sort_values("Spiel", kind="stable").reset_index(drop=True)
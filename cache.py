@@ -0,0 +1,259 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+cache.py
+----------
+On-disk page cache with conditional revalidation, ttl per
+season and size bounded lru eviction
+
+"""
+
+import datetime
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+CacheEntry = namedtuple(
+    "CacheEntry", ["url", "body", "etag", "last_modified", "fetched_at", "fresh"]
+)
+
+
+def current_season(today=None):
+    """Season running at `today`, seasons start in july"""
+
+    today = today or datetime.date.today()
+    return today.year if today.month >= 7 else today.year - 1
+
+
+def season_ttl(url, page_season=None, season=None, current_ttl=600):
+    """
+    Default ttl policy, pages of finished seasons never change
+
+    Parameters
+    ----------
+    url : str
+        cached link
+    page_season : int
+        season of the page, read from /s-YYYY/ in the url by default,
+        match report urls do not name their season
+    season : int
+        season still being played, defaults to current_season()
+    current_ttl : float
+        ttl in seconds for pages of the running season and
+        for pages of unknown season
+
+    Returns
+    -------
+    ttl : float or None
+        seconds a page stays fresh, None for forever
+
+    """
+
+    if page_season is None:
+        match = re.search(r"/s-(\d{4})/", url)
+        page_season = int(match.group(1)) if match else None
+
+    if page_season is not None and int(page_season) < (season or current_season()):
+        return None
+
+    return current_ttl
+
+
+class PageCache:
+    """
+    Page cache keyed by url
+
+    Bodies are gzip compressed and stored once per content hash, the
+    index with validators and access times lives in a sqlite file.
+
+    Parameters
+    ----------
+    directory : str
+        cache directory
+    ttl : callable
+        ttl(url, page_season) returns the seconds a page stays fresh,
+        None for forever, page_season is None unless set by add_seasons
+    max_bytes : int
+        maximum size of the compressed bodies
+
+    """
+
+    def __init__(self, directory="page_cache", ttl=season_ttl, max_bytes=500_000_000):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # season per url of pages whose url does not name it
+        self.seasons = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)"
+        )
+        self.connection.commit()
+
+        # running total of the compressed bodies, resynced before evicting
+        self.bytes = self.size()
+
+    def add_seasons(self, seasons):
+        """Sets the seasons of urls, e.g. of match reports linked from a schedule"""
+
+        self.seasons.update(seasons)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + ".gz")
+
+    def get(self, url):
+        """
+        Looks a page up
+
+        Parameters
+        ----------
+        url : str
+            link of the page
+
+        Returns
+        -------
+        entry : CacheEntry or None
+            cached page, fresh is False if it has to be revalidated
+
+        """
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT digest, etag, last_modified, fetched_at FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            digest, etag, last_modified, fetched_at = row
+
+            try:
+                with gzip.open(self._path(digest), "rt", encoding="utf-8") as file:
+                    body = file.read()
+            except FileNotFoundError:
+                self.connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self.connection.commit()
+                return None
+
+            self.connection.execute(
+                "UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url)
+            )
+            self.connection.commit()
+
+        ttl = self.ttl(url, self.seasons.get(url))
+        fresh = ttl is None or time.time() - fetched_at < ttl
+
+        return CacheEntry(url, body, etag, last_modified, fetched_at, fresh)
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """Stores a page and evicts least recently used pages if the cache is full"""
+
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        compressed = gzip.compress(data)
+
+        now = time.time()
+
+        # eviction removes unreferenced bodies under the lock, so the body
+        # is checked and written under it as well
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + ".tmp", "wb") as file:
+                    file.write(compressed)
+                os.replace(path + ".tmp", path)
+
+            size = os.path.getsize(path)
+            referenced = self.connection.execute(
+                "SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)
+            ).fetchone()
+            old = self.connection.execute(
+                "SELECT digest, size FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, size, etag, last_modified, now, now),
+            )
+            if referenced is None:
+                self.bytes += size
+            if old is not None and old[0] != digest:
+                self._remove_unreferenced(*old)
+            self._evict()
+            self.connection.commit()
+
+    def touch(self, url):
+        """Marks a page as revalidated, e.g. after a 304 response"""
+
+        with self.lock:
+            now = time.time()
+            self.connection.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, url),
+            )
+            self.connection.commit()
+
+    def size(self):
+        """Bytes used by the compressed bodies"""
+
+        (size,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM pages)"
+        ).fetchone()
+        return size
+
+    def _evict(self):
+        if self.bytes <= self.max_bytes:
+            return
+
+        # other processes may share the cache directory
+        self.bytes = self.size()
+
+        while self.bytes > self.max_bytes:
+            url, digest, size = self.connection.execute(
+                "SELECT url, digest, size FROM pages ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            self.connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self._remove_unreferenced(digest, size)
+
+    def _remove_unreferenced(self, digest, size):
+        referenced = self.connection.execute(
+            "SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone()
+
+        if referenced is None:
+            self.bytes -= size
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Closes the index"""
+
+        self.connection.close()
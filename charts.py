@@ -0,0 +1,46 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+charts.py
+----------
+Builds the plotly charts of the streamlit app
+
+"""
+
+import plotly.express as px
+
+
+def goals_bar_chart(player_stats, title, bar_width, labels=None):
+    """
+    Bar chart of home and away goals per player
+
+    Parameters
+    ----------
+    player_stats : DataFrame
+        goals per player with their names
+    title : str
+        chart title
+    bar_width : float
+        width of the bars
+    labels : dict
+        additional axis labels
+
+    Returns
+    -------
+    fig : Figure
+        plotly figure
+
+    """
+
+    fig = px.bar(
+        player_stats,
+        x="Spieler",
+        y=["Heim", "Auswärts"],
+        hover_data=["Penalty"],
+        labels={"value": "Tore", **(labels or {})},
+        title=title,
+    )
+    fig.update_traces(width=bar_width)
+
+    return fig
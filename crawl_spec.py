@@ -0,0 +1,95 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+crawl_spec.py
+----------
+Expands the declarative crawl spec of leagues, groups
+and seasons into crawl items
+
+"""
+
+import json
+import os
+from collections import namedtuple
+
+CrawlItem = namedtuple(
+    "CrawlItem",
+    [
+        "league",
+        "league_id",
+        "group",
+        "group_id",
+        "season",
+        "ranking_link",
+        "schedule_link",
+        "game_link_pattern",
+    ],
+)
+
+
+def load_spec(path="crawl_spec.json"):
+    """Reads a crawl spec, FVBJ_BASE_URL overrides its base url"""
+
+    with open(path, encoding="utf-8") as file:
+        spec = json.load(file)
+
+    spec["base_url"] = os.environ.get("FVBJ_BASE_URL", spec["base_url"])
+    return spec
+
+
+def expand_spec(spec, leagues=None, seasons=None):
+    """
+    Expands a crawl spec into one crawl item per league, season and group
+
+    Parameters
+    ----------
+    spec : dict
+        crawl spec, see crawl_spec.json
+    leagues : list
+        names of the leagues to crawl, defaults to all
+    seasons : list
+        seasons to crawl, e.g. ["2021"], defaults to all
+
+    Returns
+    -------
+    items : list
+        CrawlItem per league, season and group
+
+    """
+
+    templates = spec["templates"]
+    items = []
+
+    for league in spec["leagues"]:
+        if leagues and league["name"] not in leagues:
+            continue
+
+        for season, league_season in league["seasons"].items():
+            if seasons and season not in seasons:
+                continue
+
+            for group, group_id in league_season["groups"].items():
+                values = {
+                    "base_url": spec["base_url"],
+                    "oid": spec["oid"],
+                    "season": season,
+                    "league_id": league["league_id"],
+                    "league_season_id": league_season["league_season_id"],
+                    "group_id": group_id,
+                }
+
+                items.append(
+                    CrawlItem(
+                        league["name"],
+                        league["league_id"],
+                        group,
+                        group_id,
+                        season,
+                        templates["ranking"].format(**values),
+                        templates["schedule"].format(**values),
+                        templates["game_link"].format(**values),
+                    )
+                )
+
+    return items
@@ -0,0 +1,621 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+database.py
+----------
+Embedded sqlite database of teams, games, goal events,
+rankings and their history with indexes for lookups across
+seasons and leagues
+
+"""
+
+import os
+import pathlib
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+database_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data_files", "fvbj.sqlite"
+)
+
+schema = """
+CREATE TABLE IF NOT EXISTS teams (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS player_aliases (
+    alias TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    player INTEGER NOT NULL REFERENCES players (id)
+);
+
+-- teams a player scored for, the context of matching misspelled names
+CREATE TABLE IF NOT EXISTS player_teams (
+    player INTEGER NOT NULL REFERENCES players (id),
+    team INTEGER NOT NULL REFERENCES teams (id),
+    PRIMARY KEY (player, team)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS games (
+    season INTEGER NOT NULL,
+    game INTEGER NOT NULL,
+    league TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    link TEXT,
+    home_team INTEGER NOT NULL REFERENCES teams (id),
+    away_team INTEGER NOT NULL REFERENCES teams (id),
+    result TEXT NOT NULL,
+    PRIMARY KEY (season, game)
+);
+
+CREATE TABLE IF NOT EXISTS goals (
+    season INTEGER NOT NULL,
+    game INTEGER NOT NULL,
+    nr INTEGER NOT NULL,
+    side TEXT NOT NULL,
+    player TEXT NOT NULL,
+    player_id INTEGER REFERENCES players (id),
+    minute INTEGER,
+    penalty INTEGER NOT NULL,
+    own_goal INTEGER NOT NULL,
+    PRIMARY KEY (season, game, nr),
+    FOREIGN KEY (season, game) REFERENCES games (season, game)
+);
+
+CREATE TABLE IF NOT EXISTS rankings (
+    season INTEGER NOT NULL,
+    league TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    team INTEGER NOT NULL REFERENCES teams (id),
+    rank INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    penalty_points INTEGER NOT NULL,
+    goals INTEGER NOT NULL,
+    goals_against INTEGER NOT NULL,
+    goal_difference INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (season, league, grp, team)
+);
+
+-- a snapshot per crawl of a group whose ranking changed
+CREATE TABLE IF NOT EXISTS ranking_snapshots (
+    id INTEGER PRIMARY KEY,
+    season INTEGER NOT NULL,
+    league TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    crawled_at TEXT NOT NULL
+);
+
+-- rows of a snapshot which differ from the previous snapshot of the group
+CREATE TABLE IF NOT EXISTS ranking_changes (
+    team INTEGER NOT NULL REFERENCES teams (id),
+    snapshot INTEGER NOT NULL REFERENCES ranking_snapshots (id),
+    rank INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    penalty_points INTEGER NOT NULL,
+    goals INTEGER NOT NULL,
+    goals_against INTEGER NOT NULL,
+    goal_difference INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (team, snapshot)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS games_league ON games (league, season);
+CREATE INDEX IF NOT EXISTS games_home_team ON games (home_team, season);
+CREATE INDEX IF NOT EXISTS games_away_team ON games (away_team, season);
+CREATE INDEX IF NOT EXISTS rankings_team ON rankings (team, season);
+CREATE INDEX IF NOT EXISTS ranking_snapshots_group
+    ON ranking_snapshots (season, league, grp);
+"""
+
+# indexes on columns added after the first release of a table
+migrated_indexes = """
+DROP INDEX IF EXISTS goals_player;
+CREATE INDEX IF NOT EXISTS goals_player_id ON goals (player_id, season);
+"""
+
+# the team of a scorer, own goals are listed on the side of the opponent
+scorer_team = (
+    "CASE WHEN (g.side = 'Heim') != g.own_goal THEN m.home_team ELSE m.away_team END"
+)
+
+# ranking frame columns to table columns
+ranking_columns = {
+    "Rang": "rank",
+    "Spiele": "games",
+    "Siege": "wins",
+    "Unentschieden": "draws",
+    "Niederlagen": "losses",
+    "Strafpunkte": "penalty_points",
+    "Tore": "goals",
+    "Gegentore": "goals_against",
+    "Tordifferenz": "goal_difference",
+    "Punkte": "points",
+}
+
+
+def connect(path=database_path, readonly=False):
+    """
+    Opens the database and creates missing tables and indexes
+
+    Parameters
+    ----------
+    path : str
+        sqlite file of the database
+    readonly : bool
+        open the database read-only for readers like the API and the
+        app, tables are neither created nor migrated
+
+    """
+
+    if readonly:
+        uri = pathlib.Path(path).absolute().as_uri() + "?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    # crawl shards write from several processes and wait for each other
+    connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+    connection.execute("PRAGMA foreign_keys = ON")
+    tables = {
+        row[0]
+        for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+    connection.executescript(schema)
+
+    # databases created before goal events had player ids
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(goals)")}
+    if "player_id" not in columns:
+        connection.execute(
+            "ALTER TABLE goals ADD COLUMN player_id INTEGER REFERENCES players (id)"
+        )
+    connection.executescript(migrated_indexes)
+
+    # databases created before players were linked by team
+    if "player_teams" not in tables:
+        with connection:
+            connection.execute(
+                f"""
+                INSERT OR IGNORE INTO player_teams (player, team)
+                SELECT DISTINCT g.player_id, {scorer_team}
+                FROM goals g JOIN games m ON m.season = g.season AND m.game = g.game
+                WHERE g.player_id IS NOT NULL
+                """
+            )
+
+    seed_snapshots(connection)
+
+    return connection
+
+
+def seed_snapshots(connection):
+    """
+    Stores the ranking of every group without snapshot as its first snapshot
+
+    Rankings stored before snapshots were kept have no crawl time,
+    their snapshot is timestamped with the time of the migration.
+
+    """
+
+    groups = connection.execute(
+        """
+        SELECT DISTINCT season, league, grp FROM rankings r
+        WHERE NOT EXISTS (
+            SELECT 1 FROM ranking_snapshots s
+            WHERE s.season = r.season AND s.league = r.league AND s.grp = r.grp
+        )
+        ORDER BY season, league, grp
+        """
+    ).fetchall()
+    if not groups:
+        return
+
+    crawled_at = datetime.now().isoformat(timespec="seconds")
+    columns = ", ".join(ranking_columns.values())
+
+    with connection:
+        for season, league, group in groups:
+            snapshot = connection.execute(
+                "INSERT INTO ranking_snapshots (season, league, grp, crawled_at) "
+                "VALUES (?, ?, ?, ?)",
+                (season, league, group, crawled_at),
+            ).lastrowid
+            connection.execute(
+                f"""
+                INSERT INTO ranking_changes (team, snapshot, {columns})
+                SELECT team, ?, {columns} FROM rankings
+                WHERE season = ? AND league = ? AND grp = ?
+                """,
+                (snapshot, season, league, group),
+            )
+
+
+def team_ids(connection, names):
+    """Ids of team names, unknown teams are inserted"""
+
+    names = sorted({name.strip() for name in names})
+    connection.executemany(
+        "INSERT OR IGNORE INTO teams (name) VALUES (?)", [(name,) for name in names]
+    )
+
+    return dict(connection.execute("SELECT name, id FROM teams").fetchall())
+
+
+def snapshot_rankings(connection, ranking, season, teams, crawled_at):
+    """
+    Stores the rows of a ranking which changed since the previous snapshot
+
+    The stored ranking of the season is the state of the previous
+    snapshot, a group without snapshot stores all its rows. Groups
+    without changes get no snapshot.
+
+    """
+
+    previous = {
+        (league, group, team): values
+        for league, group, team, *values in connection.execute(
+            f"""
+            SELECT league, grp, team, {", ".join(ranking_columns.values())}
+            FROM rankings WHERE season = ?
+            """,
+            (int(season),),
+        )
+    }
+    snapshotted = {
+        tuple(row)
+        for row in connection.execute(
+            "SELECT DISTINCT league, grp FROM ranking_snapshots WHERE season = ?",
+            (int(season),),
+        )
+    }
+
+    changes = {}
+    for row in ranking.to_dict("records"):
+        group = (row["Liga"], row["Gruppe"])
+        team = teams[row["Team"].strip()]
+        values = [int(row[column]) for column in ranking_columns]
+
+        if group not in snapshotted or previous.get((*group, team)) != values:
+            changes.setdefault(group, []).append((team, *values))
+
+    for (league, group), rows in changes.items():
+        snapshot = connection.execute(
+            "INSERT INTO ranking_snapshots (season, league, grp, crawled_at) "
+            "VALUES (?, ?, ?, ?)",
+            (int(season), league, group, crawled_at),
+        ).lastrowid
+
+        connection.executemany(
+            f"""
+            INSERT INTO ranking_changes
+                (team, snapshot, {", ".join(ranking_columns.values())})
+            VALUES (?, ?, {", ".join(["?"] * len(ranking_columns))})
+            """,
+            [(team, snapshot, *values) for team, *values in rows],
+        )
+
+
+def upsert_rankings(connection, ranking, season, crawled_at=None):
+    """
+    Inserts or updates the ranking rows of a season in one transaction
+
+    The changed rows are kept as timestamped snapshot, see
+    snapshot_rankings and ranking_trajectory.
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+        database connection
+    ranking : DataFrame
+        ranking of all leagues of the season, as extracted
+    season : str or int
+        season of the ranking
+    crawled_at : str
+        time of the crawl, ISO format, defaults to now
+
+    """
+
+    crawled_at = crawled_at or datetime.now().isoformat(timespec="seconds")
+
+    with connection:
+        teams = team_ids(connection, ranking["Team"])
+        snapshot_rankings(connection, ranking, season, teams, crawled_at)
+
+        columns = ", ".join(ranking_columns.values())
+        updates = ", ".join(
+            f"{column} = excluded.{column}" for column in ranking_columns.values()
+        )
+
+        connection.executemany(
+            f"""
+            INSERT INTO rankings (season, league, grp, team, {columns})
+            VALUES (?, ?, ?, ?, {", ".join(["?"] * len(ranking_columns))})
+            ON CONFLICT (season, league, grp, team) DO UPDATE SET {updates}
+            """,
+            [
+                (int(season), row["Liga"], row["Gruppe"], teams[row["Team"].strip()])
+                + tuple(int(row[column]) for column in ranking_columns)
+                for row in ranking.to_dict("records")
+            ],
+        )
+
+
+def delete_games(connection, league, season):
+    """Deletes the games and goal events of a league and season"""
+
+    connection.execute(
+        "DELETE FROM goals WHERE season = ? AND game IN "
+        "(SELECT game FROM games WHERE season = ? AND league = ?)",
+        (int(season), int(season), league),
+    )
+    connection.execute(
+        "DELETE FROM games WHERE season = ? AND league = ?", (int(season), league)
+    )
+
+
+def has_unlinked_games(connection, league, season):
+    """True if games of a league and season were stored without link"""
+
+    return connection.execute(
+        "SELECT EXISTS (SELECT 1 FROM games WHERE season = ? AND league = ? "
+        "AND link IS NULL)",
+        (int(season), league),
+    ).fetchone()[0] == 1
+
+
+def upsert_games(connection, games, goals, season, replace=False):
+    """
+    Inserts or updates games and replaces their goal events in one transaction
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+        database connection
+    games : DataFrame
+        games of the season, as extracted
+    goals : DataFrame
+        goal events of the games
+    season : str or int
+        season of the games
+    replace : bool
+        delete the stored games of the season's leagues first
+
+    """
+
+    season = int(season)
+
+    with connection:
+        if replace:
+            for league in games["Liga"].unique():
+                delete_games(connection, league, season)
+
+        teams = team_ids(connection, pd.concat([games["Heimteam"], games["Gastteam"]]))
+
+        connection.executemany(
+            """
+            INSERT INTO games
+                (season, game, league, grp, link, home_team, away_team, result)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (season, game) DO UPDATE SET
+                league = excluded.league,
+                grp = excluded.grp,
+                link = excluded.link,
+                home_team = excluded.home_team,
+                away_team = excluded.away_team,
+                result = excluded.result
+            """,
+            [
+                (
+                    season,
+                    int(row["Spiel"]),
+                    row["Liga"],
+                    row["Gruppe"],
+                    row["Link"] if isinstance(row["Link"], str) else None,
+                    teams[row["Heimteam"].strip()],
+                    teams[row["Gastteam"].strip()],
+                    row["Resultat"],
+                )
+                for row in games.to_dict("records")
+            ],
+        )
+
+        connection.executemany(
+            "DELETE FROM goals WHERE season = ? AND game = ?",
+            [(season, int(game)) for game in games["Spiel"]],
+        )
+
+        goals = goals.assign(nr=goals.groupby("Spiel").cumcount())
+        connection.executemany(
+            """
+            INSERT INTO goals
+                (season, game, nr, side, player, player_id, minute, penalty, own_goal)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    season,
+                    int(row["Spiel"]),
+                    int(row["nr"]),
+                    row["Seite"],
+                    row["Spieler"],
+                    None if pd.isna(row.get("SpielerId")) else int(row["SpielerId"]),
+                    None if pd.isna(row["Minute"]) else int(row["Minute"]),
+                    bool(row["Penalty"]),
+                    bool(row["Eigentor"]),
+                )
+                for row in goals.to_dict("records")
+            ],
+        )
+
+
+def query(sql, params=(), connection=None):
+    """Runs a query and returns the rows as a frame"""
+
+    if connection is not None:
+        return pd.read_sql_query(sql, connection, params=params)
+
+    connection = connect(readonly=True)
+    try:
+        return pd.read_sql_query(sql, connection, params=params)
+    finally:
+        connection.close()
+
+
+def season_ranking(season, league=None, connection=None):
+    """Ranking of a season, optionally of one league"""
+
+    return query(
+        """
+        SELECT r.league AS Liga, r.grp AS Gruppe, r.rank AS Rang, t.name AS Team,
+            r.games AS Spiele, r.wins AS Siege, r.draws AS Unentschieden,
+            r.losses AS Niederlagen, r.penalty_points AS Strafpunkte,
+            r.goals AS Tore, r.goals_against AS Gegentore,
+            r.goal_difference AS Tordifferenz, r.points AS Punkte
+        FROM rankings r JOIN teams t ON t.id = r.team
+        WHERE r.season = ? AND (? IS NULL OR r.league = ?)
+        ORDER BY r.league, r.grp, r.rank
+        """,
+        (int(season), league, league),
+        connection,
+    )
+
+
+def season_games(season, league, connection=None):
+    """Games of a league and season, as extracted"""
+
+    return query(
+        """
+        SELECT m.league AS Liga, m.grp AS Gruppe, m.link AS Link, m.game AS Spiel,
+            home.name AS Heimteam, away.name AS Gastteam, m.result AS Resultat
+        FROM games m
+        JOIN teams home ON home.id = m.home_team
+        JOIN teams away ON away.id = m.away_team
+        WHERE m.season = ? AND m.league = ?
+        ORDER BY m.game
+        """,
+        (int(season), league),
+        connection,
+    )
+
+
+def season_goals(season, league, connection=None):
+    """Goal events of a league and season, as extracted"""
+
+    goals = query(
+        """
+        SELECT m.league AS Liga, m.grp AS Gruppe, g.game AS Spiel, g.side AS Seite,
+            g.player AS Spieler, g.player_id AS SpielerId, g.minute AS Minute,
+            g.penalty AS Penalty, g.own_goal AS Eigentor
+        FROM goals g JOIN games m ON m.season = g.season AND m.game = g.game
+        WHERE g.season = ? AND m.league = ?
+        ORDER BY g.game, g.nr
+        """,
+        (int(season), league),
+        connection,
+    )
+
+    return goals.astype({"Penalty": bool, "Eigentor": bool})
+
+
+def player_goals(player_id, since=None, connection=None):
+    """All goal events of a player, optionally since a season"""
+
+    return query(
+        """
+        SELECT g.season AS Saison, m.league AS Liga, m.grp AS Gruppe, g.game AS Spiel,
+            home.name AS Heimteam, away.name AS Gastteam, m.result AS Resultat,
+            g.side AS Seite, g.minute AS Minute,
+            g.penalty AS Penalty, g.own_goal AS Eigentor
+        FROM goals g
+        JOIN games m ON m.season = g.season AND m.game = g.game
+        JOIN teams home ON home.id = m.home_team
+        JOIN teams away ON away.id = m.away_team
+        WHERE g.player_id = ? AND g.season >= ?
+        ORDER BY g.season DESC, g.game
+        """,
+        (int(player_id), int(since or 0)),
+        connection,
+    )
+
+
+def player_seasons(player_id, connection=None):
+    """Goals of a player per season and league"""
+
+    return query(
+        """
+        SELECT g.season AS Saison, m.league AS Liga,
+            SUM(NOT g.own_goal) AS AnzahlTore,
+            SUM(NOT g.own_goal AND g.side = 'Heim') AS Heim,
+            SUM(NOT g.own_goal AND g.side = 'Gast') AS "Auswärts",
+            SUM(NOT g.own_goal AND g.penalty) AS Penalty,
+            SUM(g.own_goal) AS Eigentor
+        FROM goals g JOIN games m ON m.season = g.season AND m.game = g.game
+        WHERE g.player_id = ?
+        GROUP BY g.season, m.league
+        ORDER BY g.season DESC
+        """,
+        (int(player_id),),
+        connection,
+    )
+
+
+def team_games(team, season=None, connection=None):
+    """Home and away games of a team, optionally of one season"""
+
+    return query(
+        """
+        SELECT m.season AS Saison, m.league AS Liga, m.game AS Spiel,
+            home.name AS Heimteam, away.name AS Gastteam, m.result AS Resultat
+        FROM games m
+        JOIN teams home ON home.id = m.home_team
+        JOIN teams away ON away.id = m.away_team
+        WHERE (
+            m.home_team = (SELECT id FROM teams WHERE name = :team)
+            OR m.away_team = (SELECT id FROM teams WHERE name = :team)
+        ) AND (:season IS NULL OR m.season = :season)
+        ORDER BY m.season DESC, m.game
+        """,
+        {"team": team, "season": season},
+        connection,
+    )
+
+
+def ranking_trajectory(team, season, league=None, connection=None):
+    """
+    Rank and points of a team after every change of its ranking row in a season
+
+    Only the changes of the team are read through the primary key of
+    ranking_changes, a row holds until the next change.
+
+    """
+
+    return query(
+        """
+        SELECT s.crawled_at AS Zeitpunkt, s.league AS Liga, s.grp AS Gruppe,
+            c.rank AS Rang, c.games AS Spiele, c.wins AS Siege,
+            c.draws AS Unentschieden, c.losses AS Niederlagen,
+            c.goals AS Tore, c.goals_against AS Gegentore, c.points AS Punkte
+        FROM ranking_changes c JOIN ranking_snapshots s ON s.id = c.snapshot
+        WHERE c.team = (SELECT id FROM teams WHERE name = :team)
+            AND s.season = :season AND (:league IS NULL OR s.league = :league)
+        ORDER BY s.crawled_at, s.id
+        """,
+        {"team": team.strip(), "season": int(season), "league": league},
+        connection,
+    )
@@ -4,296 +4,225 @@ Webscraping Project for Swiss Amateur Soccer
 
 extract.py
 ----------
-Extracts data from season 2019 - 2021 of 5th league, 
-group 1 teams in region Bern/Jura
+Extracts rankings and games of the leagues, groups and seasons
+of crawl_spec.json in region Bern/Jura
 
 """
 
 from tqdm import tqdm
 import pandas as pd
-from bs4 import BeautifulSoup
-import re
-from web_driver import driver
-
-# base link for better readability of rankings/games links
-base_link = "https://www.fvbj-afbj.ch/fussballverband-bern-jura/spielbetrieb-fvbj/"
-
-season_ranking_links = [
-    base_link
-    + "meisterschaft-fvbj.aspx/oid-6/s-2021/ln-13040/ls-19023/sg-55340/a-mrr/",
-    base_link
-    + "meisterschaft-fvbj.aspx/oid-6/s-2020/ln-13040/ls-18117/sg-52982/a-mrr/",
-    base_link
-    + "meisterschaft-fvbj.aspx/oid-6/s-2019/ln-13040/ls-17083/sg-50320/a-mrr/",
-]
-
-season_games_links = [
-    base_link
-    + "meisterschaft-fvbj.aspx/oid-6/s-2020/ln-13040/ls-18117/sg-52982/a-msp/",
-    base_link
-    + "meisterschaft-fvbj.aspx/oid-6/s-2021/ln-13040/ls-19023/sg-55340/a-msp/",
-    base_link
-    + "meisterschaft-fvbj.aspx/oid-6/s-2019/ln-13040/ls-17083/sg-50320/a-msp/",
-]
-
-# base url for creation of different games links
-base_url = "https://www.fvbj-afbj.ch/"
-
-
-def extract_rankings(season_ranking_links):
+import time
+import metrics
+from fetcher import iter_pages
+from parse import Game, GoalEvent, parse_game_links, parse_pages, parse_ranking
+
+league_columns = ["Liga", "Gruppe"]
+
+game_columns = [*league_columns, "Link", *Game._fields]
+goal_columns = [*league_columns, *GoalEvent._fields]
+
+
+def record_parse(url, page, start, records):
+    """Records the parse time and the number of records of a page"""
+
+    seconds = time.perf_counter() - start
+    kind = "links" if page == "schedule" else page
+
+    metrics.observe("parse_seconds", seconds, page=page)
+    metrics.inc("records_total", records, kind=kind)
+    metrics.event(
+        "parse", url=url, page=page, seconds=round(seconds, 6), records=records
+    )
+
+
+def extract_rankings(crawl_items, fetcher):
     """
     Extrats ratings
 
     Parameters
     ----------
-    season_ranking-links : list
-        links to the seasons rankings
+    crawl_items : list
+        CrawlItem per league, season and group
+    fetcher : HttpFetcher or SeleniumFetcher
+        fetcher for the ranking pages
 
     Returns
     -------
     rankings: dict
-        rankings of the different seasons
+        rankings of the different seasons, all leagues and groups
+        of a season in one frame
 
     """
 
-    rankings = {
-        "ranking_2021": pd.DataFrame(),
-        "ranking_2020": pd.DataFrame(),
-        "ranking_2019": pd.DataFrame(),
-    }
+    with metrics.timer("fetch_rankings"):
+        pages = fetcher.fetch_all([item.ranking_link for item in crawl_items])
 
-    print("Get Ratings Data")
+    season_rankings = {}
 
     # extract elements of rankings table and assign values to dataframe
-    for link in tqdm(season_ranking_links):
-        driver.get(link)
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, "lxml")
-
-        seed = [
-            seed.text.replace(".", "")
-            for seed in soup.find_all(attrs={"class": "ranCrang"})
-            if hasattr(seed, "text")
-        ]
-        team = [
-            team.text
-            for team in soup.find_all(attrs={"class": "ranCteam"})
-            if hasattr(team, "text")
-        ]
-        games = [
-            games.text
-            for games in soup.find_all(attrs={"class": "ranCsp"})
-            if hasattr(games, "text")
-        ]
-        wins = [
-            wins.text
-            for wins in soup.find_all(attrs={"class": "ranCs"})
-            if hasattr(wins, "text")
-        ]
-        losses = [
-            losses.text
-            for losses in soup.find_all(attrs={"class": "ranCu"})
-            if hasattr(losses, "text")
-        ]
-        draws = [
-            draws.text
-            for draws in soup.find_all(attrs={"class": "ranCn"})
-            if hasattr(draws, "text")
-        ]
-        violation_points = [
-            violation_points.text.replace("(", "").replace(")", "")
-            for violation_points in soup.find_all(attrs={"class": "ranCstrp"})
-            if hasattr(violation_points, "text")
-        ]
-        golas_made = [
-            golas_made.text
-            for golas_made in soup.find_all(attrs={"class": "ranCtg"})
-            if hasattr(golas_made, "text")
-        ]
-        goals_against = [
-            goals_against.text
-            for goals_against in soup.find_all(attrs={"class": "ranCte"})
-            if hasattr(goals_against, "text")
-        ]
-        goal_difference = [
-            goal_difference.text
-            for goal_difference in soup.find_all(attrs={"class": "ranCtdf"})
-            if hasattr(goal_difference, "text")
-        ]
-        points = [
-            points.text
-            for points in soup.find_all(attrs={"class": "ranCpt"})
-            if hasattr(points, "text")
-        ]
-
-        ranking = pd.DataFrame(
-            {
-                "Rang": seed,
-                "Team": team,
-                "Spiele": games,
-                "Siege": wins,
-                "Niederlagen": losses,
-                "Unentschieden": draws,
-                "Strafpunkte": violation_points,
-                "Tore": golas_made,
-                "Gegentore": goals_against,
-                "Tordifferenz": goal_difference,
-                "Punkte": points,
-            }
-        )
+    for item in tqdm(crawl_items, desc="Rankings"):
+        start = time.perf_counter()
+        ranking = pd.DataFrame(parse_ranking(pages[item.ranking_link]))
+        record_parse(item.ranking_link, "ranking", start, len(ranking))
 
-        if "2021" in link:
-            rankings["ranking_2021"] = ranking
+        ranking.insert(0, "Liga", item.league)
+        ranking.insert(1, "Gruppe", item.group)
 
-        if "2020" in link:
-            rankings["ranking_2020"] = ranking
+        season_rankings.setdefault(f"ranking_{item.season}", []).append(ranking)
 
-        if "2019" in link:
-            rankings["ranking_2019"] = ranking
-
-    return rankings
+    return {
+        season: pd.concat(frames, ignore_index=True)
+        for season, frames in season_rankings.items()
+    }
 
 
-def get_games_links(base_url):
+def iter_games_links(base_url, crawl_items, fetcher):
     """
-    Extracts links for every game per season
+    Extracts the game links of the crawl items schedule by schedule
+
+    Schedules are fetched in the background while the fetched ones
+    are parsed, see parse_game_links.
 
     Parameters
     ----------
     base_url : str
         base url to create games links
-
-    Returns
-    -------
-    games_links_cleaned : dict
-        games links
+    crawl_items : list
+        CrawlItem per league, season and group
+    fetcher : HttpFetcher or SeleniumFetcher
+        fetcher for the schedule pages
+
+    Yields
+    ------
+    item : CrawlItem
+        crawl item of the schedule
+    links : dict
+        match id per games link, games of another schedule
+        of the season are left out
 
     """
 
-    games_links_cleaned = {
-        "season_2021": [],
-        "season_2020": [],
-        "season_2019": [],
-    }
-
-    for game_link in tqdm(season_games_links):
-        driver.get(game_link)
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, "lxml")
-        links = soup.find_all(href=True)
+    items = {item.schedule_link: item for item in crawl_items}
+    # match ids per season, a game is crawled once
+    season_games = {}
 
-        print("Clean Games Links")
-        pattern = "fussballverband-bern-jura/spielbetrieb-fvbj/meisterschaft-fvbj.aspx/ln-13040/v-0"
-        games_links = [link["href"] for link in links if re.search(pattern, str(link))]
+    pages = iter_pages(fetcher, list(items))
 
-        if "2021" in game_link:
-            games_links_cleaned["season_2021"] = [
-                base_url + link for link in games_links
-            ]
+    for schedule_link, page in tqdm(pages, total=len(items), desc="Schedules"):
+        item = items[schedule_link]
 
-        if "2020" in game_link:
-            games_links_cleaned["season_2020"] = [
-                base_url + link for link in games_links
-            ]
+        start = time.perf_counter()
+        links = parse_game_links(page, base_url, item.game_link_pattern)
+        record_parse(schedule_link, "schedule", start, len(links))
 
-        if "2019" in game_link:
-            games_links_cleaned["season_2019"] = [
-                base_url + link for link in games_links
-            ]
+        games = season_games.setdefault(item.season, set())
+        links = {link: game for link, game in links.items() if game not in games}
+        games.update(links.values())
 
-    return games_links_cleaned
+        yield item, links
 
 
-def extract_games(games_links_cleaned):
+def get_games_links(base_url, crawl_items, fetcher):
     """
-    Extracts games data
+    Extracts links for every game per season
 
     Parameters
     ----------
-    games_links_cleaned : dict
-        games links for different seasons
+    base_url : str
+        base url to create games links
+    crawl_items : list
+        CrawlItem per league, season and group
+    fetcher : HttpFetcher or SeleniumFetcher
+        fetcher for the schedule pages
 
     Returns
     -------
-    games : dict
-        games data for different seasons
+    games_links_cleaned : dict
+        CrawlItem per games link for different seasons
 
     """
 
-    games = {
-        "games_2021": pd.DataFrame(),
-        "games_2020": pd.DataFrame(),
-        "games_2019": pd.DataFrame(),
-    }
+    games_links_cleaned = {}
 
-    for season in games_links_cleaned.keys():
+    for item, links in iter_games_links(base_url, crawl_items, fetcher):
+        season_links = games_links_cleaned.setdefault(f"season_{item.season}", {})
+        season_links.update(dict.fromkeys(links, item))
 
-        print("Get Games Data")
-
-        for link in tqdm(games_links_cleaned[season]):
-            driver.get(link)
-            page_source = driver.page_source
-            soup = BeautifulSoup(page_source, "lxml")
-
-            result = soup.find(attrs={"class": "shortResults"})
-
-            if hasattr(result, "text"):
-                result = result.text
-            else:
-                result = "-"
-
-            home_team = soup.find(attrs={"class": "shortTeamHeim"})
-            if hasattr(home_team, "text"):
-                home_team = home_team.text
-            else:
-                home_team = "-"
-
-            away_team = soup.find(attrs={"class": "shortTeamGast"})
-            if hasattr(away_team, "text"):
-                away_team = away_team.text
-            else:
-                away_team = "-"
-
-            home_scorers = [
-                home_scorer.text
-                for home_scorer in soup.find_all(attrs={"class": "shortSpielerHome"})
-                if hasattr(home_scorer, "text")
-            ]
-
-            home_scorers = ",".join(home_scorers)
-
-            away_scorers = [
-                away_scorer.text
-                for away_scorer in soup.find_all(attrs={"class": "shortSpielerGast"})
-                if hasattr(away_scorers, "text")
-            ]
-            away_scorers = ",".join(away_scorers)
-
-            df = pd.DataFrame(
-                [
-                    {
-                        "Heimteam": home_team,
-                        "Gastteam": away_team,
-                        "Resultat": result,
-                        "TorschützenHeim": home_scorers,
-                        "TorschützenGast": away_scorers,
-                    }
-                ]
-            )
+    return games_links_cleaned
 
-            if season == "season_2021":
-                games["games_2021"] = pd.concat([games["games_2021"], df])
 
-            if season == "season_2020":
-                games["games_2020"] = pd.concat([games["games_2020"], df])
+def iter_games(games_links_cleaned, fetcher, manifest=None, workers=None, queue=None):
+    """
+    Extracts games one after another while the next pages are fetched
+
+    Parameters
+    ----------
+    games_links_cleaned : dict
+        CrawlItem per games link for different seasons
+    fetcher : HttpFetcher or SeleniumFetcher
+        fetcher for the games pages
+    manifest : Manifest
+        incremental mode, only games which are new or not finished
+        are fetched and only new or changed games are yielded
+    workers : int
+        number of parser processes, defaults to the number of cpus
+    queue : WorkQueue
+        queue of the run, pages which cannot be fetched are marked
+        as failed and skipped instead of raising, pages without
+        records to store are marked as done
+
+    Yields
+    ------
+    season : str
+        season key, e.g. "season_2021"
+    game : dict
+        game record
+    goals : list
+        goal event records of the game
 
-            if season == "season_2019":
-                games["games_2019"] = pd.concat([games["games_2019"], df])
+    """
+
+    for season in games_links_cleaned.keys():
 
-            print(f"{season} Games")
+        links = list(games_links_cleaned[season])
+
+        # match report urls do not name their season, the cache keeps
+        # reports of finished seasons forever once it knows it
+        cache = getattr(fetcher, "cache", None)
+        if cache is not None:
+            cache.add_seasons(
+                {
+                    link: int(item.season)
+                    for link, item in games_links_cleaned[season].items()
+                }
+            )
+        if manifest is not None:
+            pending = manifest.pending(season, links)
+            if queue is not None:
+                queue.done(set(links).difference(pending))
+            links = pending
+
+        failed = {} if queue is not None else None
+
+        # pages are parsed in worker processes while the next ones are fetched
+        parsed = parse_pages(iter_pages(fetcher, links, failed=failed), workers=workers)
+
+        for link, game, game_goals in tqdm(parsed, total=len(links), desc=season):
+            item = games_links_cleaned[season][link]
+            game = {
+                "Liga": item.league,
+                "Gruppe": item.group,
+                "Link": link,
+                **game._asdict(),
+            }
 
-    return games
+            record = {**game, "Tore": [list(goal) for goal in game_goals]}
+            if manifest is not None and not manifest.update(season, link, record):
+                if queue is not None:
+                    queue.done([link])
+                continue
 
+            yield season, game, [(item.league, item.group, *goal) for goal in game_goals]
 
-rankings = extract_rankings(season_ranking_links)
-games = extract_games(get_games_links(base_url))
+        if failed:
+            queue.fail(failed)
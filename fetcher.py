@@ -0,0 +1,550 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+fetcher.py
+----------
+Fetches pages over pooled, asynchronous http connections.
+Selenium is kept as opt-in fallback for pages that need javascript
+
+"""
+
+import asyncio
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from tqdm import tqdm
+
+import metrics
+
+
+def record_fetch(url, cache, source, start=None, status=None, backend="http"):
+    """
+    Records a fetched page
+
+    Parameters
+    ----------
+    url : str
+        fetched link
+    cache : str
+        "hit" for fresh cached pages, "revalidated" for cached pages
+        confirmed by the server and "miss" for downloaded pages
+    source : str
+        page source
+    start : float
+        perf_counter at the start of the request, None without request
+    status : int
+        http status of the response
+    backend : str
+        fetcher backend, "http" or "selenium", labels the metrics
+
+    """
+
+    seconds = time.perf_counter() - start if start is not None else 0.0
+    size = len(source.encode("utf-8"))
+
+    metrics.inc("fetch_pages_total", backend=backend, cache=cache)
+    metrics.inc("fetch_bytes_total", size, backend=backend, cache=cache)
+    if start is not None:
+        metrics.observe("fetch_seconds", seconds, backend=backend, cache=cache)
+
+    metrics.event(
+        "fetch",
+        url=url,
+        backend=backend,
+        cache=cache,
+        status=status,
+        seconds=round(seconds, 6),
+        bytes=size,
+    )
+
+
+class CircuitBreaker:
+    """
+    Pauses requests to a host after consecutive failures
+
+    After `threshold` failed requests in a row, requests to the host
+    wait until `cooldown` seconds have passed. They are let through
+    again afterwards, a further failure opens the breaker again. A
+    host which stays down fails the requests once their retries are
+    used up instead of being hammered by all of them.
+
+    """
+
+    def __init__(self, threshold=10, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = {}
+        self.opened_at = {}
+        self.lock = threading.Lock()
+
+    def delay(self, host):
+        """Seconds until requests to the host are let through"""
+
+        with self.lock:
+            opened_at = self.opened_at.get(host)
+
+        if opened_at is None:
+            return 0
+
+        return max(0, opened_at + self.cooldown - time.monotonic())
+
+    async def wait(self, host):
+        while (delay := self.delay(host)) > 0:
+            await asyncio.sleep(delay)
+
+    def success(self, host):
+        with self.lock:
+            self.failures.pop(host, None)
+            self.opened_at.pop(host, None)
+
+    def failure(self, host):
+        with self.lock:
+            self.failures[host] = self.failures.get(host, 0) + 1
+
+            if self.failures[host] >= self.threshold:
+                if host not in self.opened_at:
+                    metrics.event("circuit_open", host=host, failures=self.failures[host])
+                self.opened_at[host] = time.monotonic()
+
+
+def backoff_delay(attempt, backoff=0.5, max_backoff=30, retry_after=None):
+    """
+    Seconds to wait before a retry, exponential backoff with full jitter
+
+    Parameters
+    ----------
+    attempt : int
+        number of the failed attempt, starting at 0
+    backoff : float
+        maximum delay after the first attempt, doubled per attempt
+    max_backoff : float
+        upper bound of the delay
+    retry_after : float
+        delay requested by the server, waited at least
+
+    """
+
+    delay = random.uniform(0, min(max_backoff, backoff * 2**attempt))
+
+    return max(delay, min(retry_after or 0, max_backoff))
+
+
+def retryable(error):
+    """True for errors worth a retry, client errors like 404 are final"""
+
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status in (408, 429)
+
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+def retry_after(error):
+    """Seconds of the Retry-After header of a response error, None if missing"""
+
+    value = (getattr(error, "headers", None) or {}).get("Retry-After")
+
+    return float(value) if value and value.isdigit() else None
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host to at most `rate` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = {}
+        self.lock = asyncio.Lock()
+
+    async def wait(self, host):
+        """Waits until the next request slot of the host is free"""
+
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class HttpFetcher:
+    """
+    Fetches server rendered pages with aiohttp
+
+    Parameters
+    ----------
+    concurrency : int
+        maximum number of requests in flight
+    rate_limit : float
+        maximum number of requests per second and host, 0 disables the limit
+    timeout : float
+        total timeout per request in seconds
+    headers : dict
+        additional request headers
+    cache : cache.PageCache
+        page cache, stale pages are revalidated with their etag/last-modified
+    retries : int
+        retries of a failed request, with exponential backoff
+    backoff : float
+        maximum delay in seconds before the first retry, see backoff_delay
+    breaker : CircuitBreaker
+        breaker of the hosts, shared by all fetch_all calls
+
+    """
+
+    def __init__(
+        self,
+        concurrency=16,
+        rate_limit=20,
+        timeout=30,
+        headers=None,
+        cache=None,
+        retries=4,
+        backoff=0.5,
+        breaker=None,
+    ):
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+    def fetch_all(self, urls, failed=None):
+        """
+        Fetches pages concurrently
+
+        Parameters
+        ----------
+        urls : list
+            links to fetch, duplicates are fetched once
+        failed : dict
+            collects the error per link of pages which could not be
+            fetched, these pages are left out, by default the first
+            error is raised
+
+        Returns
+        -------
+        pages : dict
+            page source per link, in order of the links
+
+        """
+
+        return asyncio.run(self._fetch_all(list(dict.fromkeys(urls)), failed))
+
+    async def _fetch_all(self, urls, failed=None):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency, limit_per_host=self.concurrency, keepalive_timeout=30
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = HostRateLimiter(self.rate_limit)
+
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout, headers=self.headers
+        ) as session:
+            sources = await asyncio.gather(
+                *(self._fetch(session, semaphore, limiter, url) for url in urls),
+                return_exceptions=failed is not None,
+            )
+
+        pages = {}
+        for url, source in zip(urls, sources):
+            if isinstance(source, BaseException):
+                failed[url] = source
+            else:
+                pages[url] = source
+
+        return pages
+
+    async def _fetch(self, session, semaphore, limiter, url):
+        entry = self.cache.get(url) if self.cache else None
+        if entry and entry.fresh:
+            record_fetch(url, "hit", entry.body)
+            return entry.body
+
+        host = urlsplit(url).netloc
+
+        for attempt in range(self.retries + 1):
+            await self.breaker.wait(host)
+
+            try:
+                source = await self._request(session, semaphore, limiter, url, entry)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if not retryable(error):
+                    raise
+
+                self.breaker.failure(host)
+                if attempt == self.retries:
+                    raise
+
+                delay = backoff_delay(
+                    attempt, self.backoff, retry_after=retry_after(error)
+                )
+                metrics.inc("fetch_retries_total", backend="http")
+                metrics.event(
+                    "fetch_retry", url=url, attempt=attempt + 1, delay=round(delay, 3)
+                )
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.success(host)
+                return source
+
+    async def _request(self, session, semaphore, limiter, url, entry):
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        async with semaphore:
+            await limiter.wait(urlsplit(url).netloc)
+            # latency without the wait for a free connection and request slot
+            start = time.perf_counter()
+
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if entry and response.status == 304:
+                        self.cache.touch(url)
+                        record_fetch(
+                            url, "revalidated", entry.body, start, response.status
+                        )
+                        return entry.body
+
+                    response.raise_for_status()
+                    source = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                metrics.inc("fetch_errors_total", backend="http")
+                metrics.event(
+                    "fetch_error", url=url, error=type(error).__name__, backend="http"
+                )
+                raise
+
+            record_fetch(url, "miss", source, start, response.status)
+
+            if self.cache:
+                self.cache.put(
+                    url,
+                    source,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+
+            return source
+
+    def close(self):
+        """Closes the cache, connections only live for one fetch_all call"""
+
+        if self.cache:
+            self.cache.close()
+
+
+class SeleniumFetcher:
+    """
+    Fetches pages with a pool of headless chrome drivers
+
+    Parameters
+    ----------
+    pool : web_driver.BrowserPool
+        pool to use, defaults to a new pool of `size` drivers
+    size : int
+        number of chrome instances of the default pool
+    max_pages : int
+        number of pages after which a driver of the default pool is recycled
+    cache : cache.PageCache
+        page cache, stale pages are fetched again
+    retries : int
+        rounds of retries of the failed pages, with exponential backoff
+    backoff : float
+        maximum delay in seconds before the first round, see backoff_delay
+
+    """
+
+    def __init__(
+        self, pool=None, size=4, max_pages=100, cache=None, retries=2, backoff=2
+    ):
+        if pool is None:
+            from web_driver import BrowserPool
+
+            pool = BrowserPool(size=size, max_pages=max_pages)
+
+        self.pool = pool
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+
+    def fetch_all(self, urls, failed=None):
+        """
+        Fetches pages in parallel on the pool, see HttpFetcher.fetch_all
+
+        Failed pages are fetched again in rounds, broken drivers are
+        replaced by the pool in between.
+
+        """
+
+        pages = dict.fromkeys(urls)
+
+        if self.cache:
+            for url in pages:
+                entry = self.cache.get(url)
+                if entry and entry.fresh:
+                    pages[url] = entry.body
+                    record_fetch(url, "hit", entry.body, backend="selenium")
+
+        missing = [url for url, source in pages.items() if source is None]
+        errors = {}
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt - 1, self.backoff))
+                metrics.inc("fetch_retries_total", len(missing), backend="selenium")
+
+            sources = self.pool.map(self._fetch, tqdm(missing), return_exceptions=True)
+            errors = {}
+
+            for url, source in zip(missing, sources):
+                if isinstance(source, Exception):
+                    errors[url] = source
+                    metrics.inc("fetch_errors_total", backend="selenium")
+                    metrics.event(
+                        "fetch_error",
+                        url=url,
+                        error=type(source).__name__,
+                        backend="selenium",
+                    )
+                    continue
+
+                pages[url] = source
+                if self.cache:
+                    self.cache.put(url, source)
+
+            missing = list(errors)
+            if not missing:
+                break
+
+        if errors and failed is None:
+            raise next(iter(errors.values()))
+
+        for url, error in errors.items():
+            failed[url] = error
+            del pages[url]
+
+        return pages
+
+    @staticmethod
+    def _fetch(driver, url):
+        start = time.perf_counter()
+        driver.get(url)
+        source = driver.page_source
+        record_fetch(url, "miss", source, start, backend="selenium")
+
+        return source
+
+    def close(self):
+        """Shuts the browser pool down and closes the cache"""
+
+        self.pool.shutdown()
+        if self.cache:
+            self.cache.close()
+
+
+def iter_pages(fetcher, urls, batch_size=64, prefetch=2, failed=None):
+    """
+    Fetches pages batch by batch in a background thread
+
+    Parameters
+    ----------
+    fetcher : HttpFetcher or SeleniumFetcher
+        fetcher for the pages
+    urls : list
+        links to fetch
+    batch_size : int
+        number of links per fetch_all call
+    prefetch : int
+        number of fetched batches buffered ahead of the consumer,
+        fetching pauses while the buffer is full
+    failed : dict
+        collects the errors of pages which could not be fetched,
+        see HttpFetcher.fetch_all
+
+    Yields
+    ------
+    page : tuple
+        link and page source
+
+    """
+
+    urls = list(dict.fromkeys(urls))
+    batches = queue.Queue(maxsize=prefetch)
+    # set once the consumer stops, e.g. on an error while storing a batch
+    stopped = threading.Event()
+
+    def put(batch):
+        """Waits for room in the buffer, False if the consumer stopped meanwhile"""
+
+        while not stopped.is_set():
+            try:
+                batches.put(batch, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def produce():
+        try:
+            for start in range(0, len(urls), batch_size):
+                if stopped.is_set():
+                    return
+                if not put(
+                    fetcher.fetch_all(urls[start : start + batch_size], failed=failed)
+                ):
+                    return
+        except Exception as error:
+            put(error)
+        put(None)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    try:
+        while (batch := batches.get()) is not None:
+            if isinstance(batch, Exception):
+                raise batch
+
+            yield from batch.items()
+    finally:
+        stopped.set()
+
+
+fetchers = {
+    "http": HttpFetcher,
+    "selenium": SeleniumFetcher,
+}
+
+
+def get_fetcher(backend="http", **kwargs):
+    """
+    Creates a fetcher
+
+    Parameters
+    ----------
+    backend : str
+        "http" (default) or "selenium"
+
+    Returns
+    -------
+    fetcher : HttpFetcher or SeleniumFetcher
+        fetcher with a fetch_all(urls) method
+
+    """
+
+    if backend not in fetchers:
+        raise ValueError(f"Unknown fetcher backend: {backend}")
+
+    return fetchers[backend](**kwargs)
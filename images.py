@@ -0,0 +1,81 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+images.py
+----------
+Cuts the header image of the streamlit app to a banner and
+writes resized and compressed variants of it
+
+usage: python images.py
+
+"""
+
+import os
+
+from PIL import Image, ImageOps
+
+source_image = "jannes-glas-cuhQcfp3By4-unsplash.jpg"
+images_directory = "images"
+
+# widths of the header variants and width to height ratio of the banner
+header_widths = (800, 1400, 2000)
+header_ratio = 3
+
+
+def header_path(width, directory=images_directory):
+    """Path of the header variant of a width"""
+
+    return os.path.join(directory, f"header_{width}.jpg")
+
+
+def make_headers(
+    source=source_image, directory=images_directory, widths=header_widths, quality=80
+):
+    """
+    Writes header variants of the source image
+
+    The bottom of the image with goal and ball is cut to a banner, which is resized
+    to every width and saved as progressive jpeg.
+
+    Parameters
+    ----------
+    source : str
+        path of the source image
+    directory : str
+        directory of the variants
+    widths : tuple
+        widths of the variants in pixel
+    quality : int
+        jpeg quality of the variants
+
+    Returns
+    -------
+    sizes : dict
+        bytes per variant path
+
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    sizes = {}
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+        height = round(image.width / header_ratio)
+        header = image.crop((0, image.height - height, image.width, image.height))
+
+        for width in widths:
+            path = header_path(width, directory)
+            variant = header.resize(
+                (width, round(width / header_ratio)), Image.Resampling.LANCZOS
+            )
+            variant.save(path, "JPEG", quality=quality, optimize=True, progressive=True)
+            sizes[path] = os.path.getsize(path)
+
+    return sizes
+
+
+if __name__ == "__main__":
+    for path, size in make_headers().items():
+        print(f"{path}: {size / 1024:.0f} kB")
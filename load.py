@@ -4,60 +4,163 @@ Webscraping Project for Swiss Amateur Soccer
 
 load.py
 ----------
-Loads extracted data to excel files
+Loads extracted data to the parquet store, the database
+and optionally to csv files
 
 """
 
-import pandas as pd
-from extract import rankings, games
+import os
+import time
+import aggregates
+import database
+import players
+import storage
 
 
-def load_rankings(rankings):
-    """
-    Loads rankings to excel file
-
-    Parameters
-    ----------
-    rankings : dict
-        rankings for different seasons
-
-   """
-
-    for ranking in rankings.keys():
-
-        if ranking == "ranking_2021":
-            rankings[ranking].to_csv(r"WebScraper\data_files\ranking_2021.csv")
-
-        if ranking == "ranking_2020":
-            rankings[ranking].to_csv(r"WebScraper\data_files\ranking_2020.csv")
+def with_player_ids(connection, games, goals):
+    """Goal events with the stable id of every scorer, see players.py"""
 
-        if ranking == "ranking_2019":
-            rankings[ranking].to_csv(
-                r"WebScraper\data_files\ranking_2019.csv")
+    ids = players.player_ids(
+        connection, goals["Spieler"], players.scorer_teams(games, goals)
+    )
+    return goals.assign(SpielerId=goals["Spieler"].map(ids).astype("int32"))
 
 
-def load_games(games):
-
+class StoreSink:
     """
-    Loads games to excel file
+    Writes crawl results batch by batch as they arrive
+
+    Every batch is appended to the parquet store as files of its own
+    and upserted into the database, so results are stored while the
+    crawl runs. Incremental and resumed crawls may append games next
+    to their previous versions, the touched partitions are rewritten
+    from the database on close.
 
     Parameters
     ----------
-    games : gamesings for different seasons
+    connection : sqlite3.Connection
+        database connection
+    incremental : bool
+        merge games into the stored seasons instead of replacing them
+    csv : bool
+        also export the touched seasons to csv files on close
+    root : str
+        directory of the parquet store
 
     """
 
-    for season in games.keys():
-
-        if season == "games_2021":
-            games[season].to_csv(r"WebScraper\data_files\games_2021.csv")
-
-        if season == "games_2020":
-            games[season].to_csv(r"WebScraper\data_files\games_2020.csv")
-
-        if season == "games_2019":
-            games[season].to_csv(r"WebScraper\data_files\games_2019.csv")
-
-
-load_rankings(rankings)
-load_games(games)
+    def __init__(
+        self, connection, incremental=False, csv=False, root=storage.parquet_root
+    ):
+        self.connection = connection
+        self.incremental = incremental
+        self.csv = csv
+        self.root = root
+        self.resumed = False
+        # batch files of different runs and processes must not collide
+        self.run = f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        self.batches = 0
+        # (kind, league, season) of the written partitions
+        self.touched = set()
+
+    def clear(self, crawl_items):
+        """
+        Deletes the stored partitions the crawl items replace
+
+        Rankings are always crawled completely, games only in full
+        crawls. Has to be called once before the crawl, also when the
+        items are crawled by several sinks.
+
+        """
+
+        for league, season in sorted({(item.league, item.season) for item in crawl_items}):
+            storage.delete("ranking", league, season, self.root)
+
+            # games stored before links were recorded are replaced, the first
+            # incremental crawl fetches every game anyway
+            if not self.incremental or database.has_unlinked_games(
+                self.connection, league, season
+            ):
+                storage.delete("games", league, season, self.root)
+                storage.delete("goals", league, season, self.root)
+
+                with self.connection:
+                    database.delete_games(self.connection, league, season)
+
+    def resume(self, crawl_items):
+        """
+        Continues an interrupted crawl of the crawl items instead of clearing them
+
+        Batches stored right before the interruption may be appended
+        again, so all partitions of the items are rewritten from the
+        database on close.
+
+        """
+
+        self.resumed = True
+
+        for league, season in {(item.league, int(item.season)) for item in crawl_items}:
+            for kind in ("ranking", "games", "goals"):
+                self.touched.add((kind, league, season))
+
+    def append(self, kind, frame, season):
+        """Appends a batch to the parquet store"""
+
+        self.batches += 1
+        storage.append(kind, frame, season, f"{self.run}-{self.batches}", self.root)
+
+        for league in frame["Liga"].unique():
+            self.touched.add((kind, league, int(season)))
+
+    def write_rankings(self, rankings):
+        """Stores rankings keyed like "ranking_2021" """
+
+        for ranking in rankings.keys():
+
+            season = ranking.split("_")[1]
+            self.append("ranking", rankings[ranking], season)
+            database.upsert_rankings(self.connection, rankings[ranking], season)
+
+    def write_games(self, season, games, goals):
+        """Stores a batch of games and their goal events of a season"""
+
+        goals = with_player_ids(self.connection, games, goals)
+
+        self.append("games", games, season)
+        self.append("goals", goals, season)
+        database.upsert_games(self.connection, games, goals, season)
+
+    def close(self):
+        """
+        Rewrites incrementally updated partitions, materializes the
+        aggregates of the app and exports csv files
+
+        """
+
+        partitions = sorted(self.touched)
+
+        if self.incremental or self.resumed:
+            for kind, league, season in partitions:
+                if kind == "games":
+                    games = database.season_games(season, league, self.connection)
+                    goals = database.season_goals(season, league, self.connection)
+                    storage.write("games", games, season, self.root)
+                    storage.write("goals", goals, season, self.root)
+                elif kind == "ranking" and self.resumed:
+                    ranking = database.season_ranking(season, league, self.connection)
+                    storage.write("ranking", ranking, season, self.root)
+
+        aggregates.materialize_seasons(
+            {(league, season) for _, league, season in partitions}
+        )
+
+        # one season at a time, the store holds the complete seasons
+        if self.csv:
+            for kind, season in sorted({(kind, season) for kind, _, season in partitions}):
+                storage.export_csv(
+                    {
+                        f"{kind}_{season}": storage.read(
+                            kind, where={"Saison": season}, root=self.root
+                        ).drop(columns="Saison")
+                    }
+                )
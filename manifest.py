@@ -0,0 +1,105 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+manifest.py
+----------
+Keeps track of already scraped games for incremental crawls
+
+"""
+
+import hashlib
+import json
+import os
+import re
+
+
+def is_finished(result):
+    """True if the result of a game is final, e.g. "5:0" """
+
+    return re.fullmatch(r"\d+:\d+", str(result).strip()) is not None
+
+
+def content_hash(record):
+    """Hash of an extracted game record"""
+
+    data = json.dumps(record, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class Manifest:
+    """
+    Persistent manifest of scraped games
+
+    Stores result and content hash per game link and season, games
+    with a final result are not fetched again.
+
+    Parameters
+    ----------
+    path : str
+        json file of the manifest
+
+    """
+
+    def __init__(self, path="data_files/manifest.json"):
+        self.path = path
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self.games = json.load(file)
+        else:
+            self.games = {}
+
+    def pending(self, season, links):
+        """
+        Filters links to games which were not scraped or are not finished
+
+        Parameters
+        ----------
+        season : str
+            season key, e.g. "season_2021"
+        links : list
+            games links of the season
+
+        Returns
+        -------
+        links : list
+            links to fetch
+
+        """
+
+        scraped = self.games.get(season, {})
+
+        return [
+            link
+            for link in links
+            if link not in scraped or not is_finished(scraped[link]["result"])
+        ]
+
+    def update(self, season, link, record):
+        """
+        Records a scraped game
+
+        Returns
+        -------
+        changed : bool
+            True if the game is new or its content changed
+
+        """
+
+        digest = content_hash(record)
+        previous = self.games.setdefault(season, {}).get(link)
+
+        self.games[season][link] = {"result": record["Resultat"], "hash": digest}
+
+        return previous is None or previous["hash"] != digest
+
+    def save(self):
+        """Writes the manifest, should be called after the games are stored"""
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        with open(self.path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(self.games, file, ensure_ascii=False, indent=1)
+
+        os.replace(self.path + ".tmp", self.path)
@@ -0,0 +1,275 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+metrics.py
+----------
+Counters, timing histograms and events of crawl runs, written
+as json lines and as a file in the Prometheus text format
+
+usage: import metrics
+       metrics.inc("records_total", 24, kind="games")
+       with metrics.timer("links"):
+           ...
+
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# upper bounds of the histogram buckets in seconds
+buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+prefix = "fvbj_"
+
+descriptions = {
+    "fetch_pages_total": "fetched pages by cache outcome",
+    "fetch_bytes_total": "bytes of fetched pages by cache outcome",
+    "fetch_errors_total": "failed page fetches",
+    "fetch_retries_total": "retried page fetches",
+    "fetch_seconds": "latency of page requests",
+    "parse_seconds": "parse time per page",
+    "records_total": "extracted records",
+    "stage_seconds": "run time of crawl stages",
+}
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def escape_label(value):
+    """Label value escaped like the text exposition format requires"""
+
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+
+    return (
+        "{"
+        + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs)
+        + "}"
+    )
+
+
+def format_value(value):
+    """Sample value without loss of precision, whole numbers as integers"""
+
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+
+    return repr(value)
+
+
+class Metrics:
+    """
+    Thread safe registry of counters and histograms of a crawl
+
+    Counters and histograms are keyed by name and labels. Events,
+    e.g. one per fetched page, are appended to a json lines file.
+
+    Parameters
+    ----------
+    events_path : str
+        json lines file of the events, None to keep no events
+
+    """
+
+    def __init__(self, events_path=None):
+        self.lock = threading.Lock()
+        self.events = None
+        self.reset(events_path)
+
+    def reset(self, events_path=None):
+        """Clears all metrics and writes events to a new file"""
+
+        with self.lock:
+            self.counters = defaultdict(float)
+            # bucket counts with a last +Inf bucket, sum and count per histogram
+            self.histograms = {}
+
+            if self.events is not None:
+                self.events.close()
+
+            # crawl shards append to the same file line by line
+            self.events = (
+                open(events_path, "a", encoding="utf-8", buffering=1)
+                if events_path
+                else None
+            )
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, label_key(labels))] += value
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            counts, total, count = self.histograms.get(
+                (name, label_key(labels)), ([0] * (len(buckets) + 1), 0.0, 0)
+            )
+            counts[bisect.bisect_left(buckets, value)] += 1
+            self.histograms[(name, label_key(labels))] = (counts, total + value, count + 1)
+
+    def event(self, event, **fields):
+        """Appends an event to the json lines file"""
+
+        if self.events is None:
+            return
+
+        line = json.dumps(
+            {"time": round(time.time(), 3), "event": event, **fields}, ensure_ascii=False
+        )
+        with self.lock:
+            self.events.write(line + "\n")
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Observes the run time of a block as stage_seconds and as an event"""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe("stage_seconds", seconds, stage=stage, **labels)
+            self.event("stage", stage=stage, seconds=round(seconds, 6), **labels)
+
+    def snapshot(self):
+        """Counters and histograms as picklable dict, e.g. to return them from a shard"""
+
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {
+                    key: (list(counts), total, count)
+                    for key, (counts, total, count) in self.histograms.items()
+                },
+            }
+
+    def merge(self, snapshot):
+        """Adds the counters and histograms of a snapshot"""
+
+        with self.lock:
+            for key, value in snapshot["counters"].items():
+                self.counters[key] += value
+
+            for key, (counts, total, count) in snapshot["histograms"].items():
+                own_counts, own_total, own_count = self.histograms.get(
+                    key, ([0] * (len(buckets) + 1), 0.0, 0)
+                )
+                self.histograms[key] = (
+                    [a + b for a, b in zip(own_counts, counts)],
+                    own_total + total,
+                    own_count + count,
+                )
+
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+
+        snapshot = self.snapshot()
+        lines = []
+
+        def header(name, type_):
+            lines.append(f"# HELP {prefix}{name} {descriptions.get(name, name)}")
+            lines.append(f"# TYPE {prefix}{name} {type_}")
+
+        names = None
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            if name != names:
+                header(name, "counter")
+                names = name
+            lines.append(f"{prefix}{name}{format_labels(labels)} {format_value(value)}")
+
+        names = None
+        for (name, labels), (counts, total, count) in sorted(
+            snapshot["histograms"].items()
+        ):
+            if name != names:
+                header(name, "histogram")
+                names = name
+
+            cumulative = 0
+            for bound, bucket_count in zip([*buckets, "+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{prefix}{name}_bucket{format_labels(labels, le=bound)} {cumulative}"
+                )
+            lines.append(
+                f"{prefix}{name}_sum{format_labels(labels)} {format_value(total)}"
+            )
+            lines.append(f"{prefix}{name}_count{format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes the text format atomically, e.g. for the node exporter textfile collector"""
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.prometheus())
+
+        os.replace(temporary, path)
+
+    def report(self):
+        """Prints run time per stage and fetched pages per cache outcome"""
+
+        snapshot = self.snapshot()
+
+        stages = defaultdict(lambda: [0, 0.0])
+        for (name, labels), (_, total, count) in snapshot["histograms"].items():
+            if name == "stage_seconds":
+                stage = dict(labels)["stage"]
+                stages[stage][0] += count
+                stages[stage][1] += total
+
+        for stage, (count, total) in sorted(stages.items(), key=lambda item: -item[1][1]):
+            print(f"{stage:>14}: {total:8.1f} s in {count} runs")
+
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            if name in ("fetch_pages_total", "records_total"):
+                print(f"{name}{format_labels(labels)}: {value:g}")
+
+    def close(self):
+        if self.events is not None:
+            self.events.close()
+            self.events = None
+
+
+# registry of the process, crawl shards reset their copy
+registry = Metrics()
+
+inc = registry.inc
+observe = registry.observe
+event = registry.event
+timer = registry.timer
+
+
+def configure(directory=None):
+    """
+    Resets the registry, events are written to metrics.jsonl in directory
+
+    Returns
+    -------
+    events_path : str
+        json lines file of the events, None without directory
+
+    """
+
+    events_path = None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        events_path = os.path.join(directory, "metrics.jsonl")
+
+    registry.reset(events_path)
+
+    return events_path
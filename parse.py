@@ -0,0 +1,394 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+parse.py
+----------
+Parses ranking pages in a single pass over the ranking table,
+game links of the schedule tables and match reports into games
+and goal events with lxml, match reports in a pool of parser
+processes
+
+"""
+
+import functools
+import hashlib
+import os
+import re
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import lxml.etree
+import lxml.html
+
+import metrics
+
+# ranking table cell classes in order of the table columns
+ranking_classes = {
+    "ranCrang": "Rang",
+    "ranCteam": "Team",
+    "ranCsp": "Spiele",
+    "ranCs": "Siege",
+    "ranCu": "Unentschieden",
+    "ranCn": "Niederlagen",
+    "ranCstrp": "Strafpunkte",
+    "ranCtg": "Tore",
+    "ranCte": "Gegentore",
+    "ranCtdf": "Tordifferenz",
+    "ranCpt": "Punkte",
+}
+
+RankingRow = namedtuple("RankingRow", ranking_classes.values())
+
+
+class ParseError(ValueError):
+    """Raised if a page does not have the expected structure"""
+
+
+def to_int(text):
+    """Converts ranking cells like "1.", "(18)" or "+50" to int"""
+
+    return int(text.strip().strip(".()"))
+
+
+def parse_ranking(page_source):
+    """
+    Parses the ranking table of a ranking page
+
+    Parameters
+    ----------
+    page_source : str
+        html of the ranking page
+
+    Returns
+    -------
+    ranking : list
+        RankingRow per team, in order of the table
+
+    Raises
+    ------
+    ParseError
+        if the page is empty, a team row misses cells or has a non
+        numeric value
+
+    """
+
+    try:
+        tree = lxml.html.fromstring(page_source)
+    except lxml.etree.ParserError as error:
+        raise ParseError(f"Ranking page: {error}") from error
+
+    ranking = []
+
+    for row in tree.iter("tr"):
+        cells = {}
+
+        for cell in row:
+            for class_ in cell.get("class", "").split():
+                if class_ in ranking_classes:
+                    cells[ranking_classes[class_]] = cell.text_content().strip()
+
+        if not cells:
+            continue
+
+        missing = [column for column in RankingRow._fields if column not in cells]
+        if missing:
+            raise ParseError(
+                f"Ranking row {cells.get('Team', '?')!r} misses {', '.join(missing)}"
+            )
+
+        try:
+            ranking.append(
+                RankingRow(
+                    **{
+                        column: value if column == "Team" else to_int(value)
+                        for column, value in cells.items()
+                    }
+                )
+            )
+        except ValueError as error:
+            raise ParseError(f"Ranking row {cells['Team']!r}: {error}") from error
+
+    return ranking
+
+
+# match report nodes, all other nodes are skipped while parsing
+match_classes = {
+    "shortResults",
+    "shortTeamHeim",
+    "shortTeamGast",
+    "shortSpielerHome",
+    "shortSpielerGast",
+}
+
+Game = namedtuple("Game", ["Spiel", "Heimteam", "Gastteam", "Resultat"])
+
+GoalEvent = namedtuple(
+    "GoalEvent", ["Spiel", "Seite", "Spieler", "Minute", "Penalty", "Eigentor"]
+)
+
+
+class ShortNodes:
+    """lxml parser target collecting the text of match report nodes without building a tree"""
+
+    def __init__(self):
+        self.nodes = []
+        self.depth = 0
+
+    def start(self, tag, attrib):
+        if self.depth:
+            self.depth += 1
+            return
+
+        for class_ in attrib.get("class", "").split():
+            if class_ in match_classes:
+                self.current = class_
+                self.parts = []
+                self.depth = 1
+                break
+
+    def end(self, tag):
+        if self.depth:
+            self.depth -= 1
+            if not self.depth:
+                self.nodes.append((self.current, "".join(self.parts)))
+
+    def data(self, data):
+        if self.depth:
+            self.parts.append(data)
+
+    def close(self):
+        return self.nodes
+
+
+def match_id(link):
+    """Game id of a match report link, e.g. ".../sp-2165432/", else a hash of the link"""
+
+    match = re.search(r"/sp-(\d+)", link)
+    if match:
+        return int(match.group(1))
+
+    return int(hashlib.sha1(link.encode("utf-8")).hexdigest()[:15], 16)
+
+
+# anchors of the schedule tables, navigation and footer links are not scanned
+table_links = lxml.etree.XPath("//table//a/@href")
+
+
+@functools.lru_cache(maxsize=None)
+def game_link_regex(game_link_pattern):
+    """Compiled regex of the game links of a league, the match id is its group"""
+
+    return re.compile(re.escape(game_link_pattern) + r"/sp-(\d+)")
+
+
+def canonical_link(base_url, href):
+    """
+    Absolute link without query and fragment, with a single trailing slash
+
+    Relative links are resolved against the base url, so
+    ".../sp-2165432" and "https://WWW.fvbj-afbj.ch/.../sp-2165432/?x=1"
+    become the same link.
+
+    """
+
+    scheme, netloc, path, _, _ = urlsplit(urljoin(base_url, href.strip()))
+    path = re.sub(r"/{2,}", "/", path).rstrip("/") + "/"
+
+    return urlunsplit((scheme.lower(), netloc.lower(), path, "", ""))
+
+
+def parse_game_links(page_source, base_url, game_link_pattern):
+    """
+    Parses the game links of a schedule page
+
+    Parameters
+    ----------
+    page_source : str
+        html of the schedule
+    base_url : str
+        base url of relative links
+    game_link_pattern : str
+        start of the game links of the league, see CrawlItem
+
+    Returns
+    -------
+    links : dict
+        match id per canonical game link, in order of the page,
+        games linked several times are listed once
+
+    """
+
+    regex = game_link_regex(game_link_pattern)
+    tree = lxml.etree.fromstring(page_source, lxml.etree.HTMLParser())
+    links = {}
+    games = set()
+
+    for href in table_links(tree) if tree is not None else ():
+        match = regex.search(href)
+        if match is None:
+            continue
+
+        game = int(match.group(1))
+        if game not in games:
+            games.add(game)
+            links[canonical_link(base_url, href)] = game
+
+    return links
+
+
+def parse_goal(text, game, side):
+    """
+    Parses a scorer entry like "Remo Gerber (Penalty)", "Eigentor (Michael Moreno)"
+    or "23' Pascal Halter"
+
+    Returns
+    -------
+    goal : GoalEvent or None
+        None for empty entries
+
+    """
+
+    text = " ".join(text.split())
+
+    minute = re.search(r"(\d+)(?:\+\d+)?'", text)
+    if minute:
+        text = " ".join(text.replace(minute.group(0), "").split())
+        minute = int(minute.group(1))
+
+    penalty = "(Penalty)" in text
+    text = text.replace("(Penalty)", "").strip()
+
+    own_goal = text.startswith("Eigentor (")
+    if own_goal:
+        text = text[len("Eigentor (") :].rstrip(")").strip()
+
+    if not text:
+        return None
+
+    return GoalEvent(game, side, text, minute, penalty, own_goal)
+
+
+def parse_match_report(page_source, game):
+    """
+    Parses a match report
+
+    Parameters
+    ----------
+    page_source : str
+        html of the match report
+    game : int
+        game id, see match_id
+
+    Returns
+    -------
+    game : Game
+        teams and result, "-" if missing
+    goals : list
+        GoalEvent per goal in order of the report
+
+    """
+
+    nodes = lxml.etree.fromstring(page_source, lxml.etree.HTMLParser(target=ShortNodes()))
+
+    fields = {}
+    goals = []
+
+    for class_, text in nodes:
+        if class_ == "shortSpielerHome":
+            goals.append(parse_goal(text, game, "Heim"))
+        elif class_ == "shortSpielerGast":
+            goals.append(parse_goal(text, game, "Gast"))
+        else:
+            fields.setdefault(class_, text.strip())
+
+    return (
+        Game(
+            game,
+            fields.get("shortTeamHeim", "-"),
+            fields.get("shortTeamGast", "-"),
+            fields.get("shortResults", "-"),
+        ),
+        [goal for goal in goals if goal is not None],
+    )
+
+
+def parse_match_page(page):
+    """Parses a (link, page source) pair, returns link, Game and goal events"""
+
+    link, page_source = page
+    game, goals = parse_match_report(page_source, match_id(link))
+
+    return link, game, goals
+
+
+def timed_parse_match_page(page):
+    """parse_match_page and its run time in seconds, timed in the parser process"""
+
+    start = time.perf_counter()
+    parsed = parse_match_page(page)
+
+    return parsed, time.perf_counter() - start
+
+
+def recorded(timed_parsed):
+    """Records the parse time and the records of a parsed page"""
+
+    (link, game, goals), seconds = timed_parsed
+
+    metrics.observe("parse_seconds", seconds, page="match_report")
+    metrics.inc("records_total", kind="games")
+    metrics.inc("records_total", len(goals), kind="goals")
+    metrics.event(
+        "parse",
+        url=link,
+        page="match_report",
+        seconds=round(seconds, 6),
+        records=1 + len(goals),
+    )
+
+    return link, game, goals
+
+
+def parse_pages(pages, workers=None, max_pending=None):
+    """
+    Parses match reports in parallel processes while they are fetched
+
+    Parameters
+    ----------
+    pages : iterable
+        (link, page source) pairs, e.g. from fetcher.iter_pages
+    workers : int
+        number of parser processes, defaults to the number of cpus,
+        with one worker pages are parsed in the calling process
+    max_pending : int
+        maximum number of pages queued to the workers, reading from
+        `pages` pauses while the queue is full, defaults to 4 * workers
+
+    Yields
+    ------
+    game : tuple
+        link, Game and goal events, in order of the pages
+
+    """
+
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        for page in pages:
+            yield recorded(timed_parse_match_page(page))
+        return
+
+    max_pending = max_pending or 4 * workers
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for page in pages:
+            pending.append(executor.submit(timed_parse_match_page, page))
+
+            if len(pending) >= max_pending:
+                yield recorded(pending.popleft().result())
+
+        while pending:
+            yield recorded(pending.popleft().result())
@@ -0,0 +1,354 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+pipeline.py
+----------
+Runs the crawl from the command line, games stream from fetch
+to parse to the store in bounded batches
+
+usage: python pipeline.py [--incremental] [--seasons 2021 ...]
+
+"""
+
+import argparse
+import os
+
+import pandas as pd
+
+import database
+import metrics
+from cache import PageCache
+from crawl_spec import expand_spec, load_spec
+from extract import (
+    extract_rankings,
+    game_columns,
+    get_games_links,
+    goal_columns,
+    iter_games,
+    iter_games_links,
+)
+from fetcher import fetchers, get_fetcher
+from load import StoreSink
+from manifest import Manifest
+from scheduler import crawl_sharded
+from work_queue import WorkQueue, max_attempts
+
+
+def batches(games, batch_size=500):
+    """
+    Groups streamed games into batches of one season
+
+    Parameters
+    ----------
+    games : iterable
+        season, game record and goal event records, see iter_games
+    batch_size : int
+        maximum number of games per batch
+
+    Yields
+    ------
+    season : str
+        season of the batch, e.g. "2021"
+    games : DataFrame
+        games of the batch
+    goals : DataFrame
+        goal events of the games
+
+    """
+
+    batch_season = None
+    game_records = []
+    goal_records = []
+
+    def batch():
+        return (
+            batch_season.split("_")[1],
+            pd.DataFrame(game_records, columns=game_columns),
+            pd.DataFrame(goal_records, columns=goal_columns),
+        )
+
+    for season, game, goals in games:
+        if game_records and (season != batch_season or len(game_records) >= batch_size):
+            yield batch()
+            game_records = []
+            goal_records = []
+
+        batch_season = season
+        game_records.append(game)
+        goal_records.extend(goals)
+
+    if game_records:
+        yield batch()
+
+
+def crawl(
+    crawl_items,
+    fetcher,
+    sink,
+    base_url,
+    manifest=None,
+    workers=None,
+    batch_size=500,
+    checkpoint=True,
+    metrics_dir=None,
+    queue=None,
+):
+    """
+    Crawls rankings and games of crawl items into a sink
+
+    Only one batch of games is held in memory, every batch is
+    written before the next one is collected.
+
+    Parameters
+    ----------
+    crawl_items : list
+        CrawlItem per league, season and group
+    fetcher : HttpFetcher or SeleniumFetcher
+        fetcher for all pages
+    sink : StoreSink
+        destination of the rankings and the batches of games
+    base_url : str
+        base url to create games links
+    manifest : Manifest
+        incremental mode, see iter_games
+    workers : int
+        number of parser processes, see iter_games
+    batch_size : int
+        maximum number of games per batch
+    checkpoint : bool
+        save the manifest after every stored batch
+    metrics_dir : str
+        directory of metrics.prom, rewritten after every stored batch
+    queue : WorkQueue
+        queue of the run, rankings, schedules and games which are
+        done are skipped, games which cannot be fetched are marked as
+        failed instead of stopping the crawl, see WorkQueue.start
+
+    Returns
+    -------
+    count : int
+        number of stored games
+
+    """
+
+    ranking_items = crawl_items
+    schedule_items = crawl_items
+    if queue is not None:
+        ranking_items = queue.pending("ranking", crawl_items)
+        schedule_items = queue.pending("schedule", crawl_items)
+
+    if ranking_items:
+        with metrics.timer("rankings"):
+            rankings = extract_rankings(ranking_items, fetcher)
+        with metrics.timer("write_rankings"):
+            sink.write_rankings(rankings)
+
+        if queue is not None:
+            queue.done([item.ranking_link for item in ranking_items])
+
+    with metrics.timer("links"):
+        if queue is None:
+            games_links_cleaned = get_games_links(base_url, schedule_items, fetcher)
+        else:
+            # game links are queued schedule by schedule as they are parsed
+            for item, links in iter_games_links(base_url, schedule_items, fetcher):
+                queue.add_games({f"season_{item.season}": dict.fromkeys(links, item)})
+                queue.done([item.schedule_link])
+
+            # with the links of a resumed run which are not done yet
+            games_links_cleaned = queue.games(crawl_items)
+
+    count = 0
+    games_batches = batches(
+        iter_games(games_links_cleaned, fetcher, manifest, workers, queue), batch_size
+    )
+
+    while True:
+        # fetching and parsing a batch, the pages are fetched ahead in the background
+        with metrics.timer("games"):
+            batch = next(games_batches, None)
+        if batch is None:
+            break
+
+        season, games, goals = batch
+        with metrics.timer("write_games"):
+            sink.write_games(season, games, goals)
+        count += len(games)
+
+        metrics.event("batch", season=season, games=len(games), goals=len(goals))
+
+        # only mark games as scraped once they are stored
+        if manifest is not None and checkpoint:
+            manifest.save()
+        if queue is not None:
+            queue.done(games["Link"])
+
+        if metrics_dir:
+            metrics.registry.write_prometheus(os.path.join(metrics_dir, "metrics.prom"))
+
+    return count
+
+
+def env_list(name):
+    """Comma separated environment variable as list, None if not set"""
+
+    value = os.environ.get(name)
+    return value.split(",") if value else None
+
+
+def parse_args(argv=None):
+    """Command line options, defaults can be set by environment variables"""
+
+    parser = argparse.ArgumentParser(
+        description="Crawls rankings and games of the crawl spec into the "
+        "parquet store and the database"
+    )
+    parser.add_argument(
+        "--spec",
+        default=os.environ.get("FVBJ_CRAWL_SPEC", "crawl_spec.json"),
+        help="crawl spec of leagues, groups and seasons",
+    )
+    parser.add_argument(
+        "--leagues",
+        nargs="+",
+        default=env_list("FVBJ_LEAGUES"),
+        help="leagues to crawl, all of the spec by default",
+    )
+    parser.add_argument(
+        "--seasons",
+        nargs="+",
+        default=env_list("FVBJ_SEASONS"),
+        help="seasons to crawl, all of the spec by default",
+    )
+    parser.add_argument(
+        "--fetcher",
+        choices=sorted(fetchers),
+        default=os.environ.get("FVBJ_FETCHER", "http"),
+        help='"selenium" for pages that need javascript',
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("FVBJ_CACHE_DIR", "page_cache"),
+        help="page cache, finished seasons are not fetched again",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=os.environ.get("FVBJ_INCREMENTAL") == "1",
+        help="only fetch games which are new or not finished",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=int(os.environ.get("FVBJ_SHARDS", "1")),
+        help="number of crawler processes",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="number of parser processes"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="maximum number of games per batch"
+    )
+    parser.add_argument(
+        "--csv",
+        action="store_true",
+        default=os.environ.get("FVBJ_EXPORT_CSV") == "1",
+        help="also export the crawled seasons to csv files",
+    )
+    parser.add_argument(
+        "--queue",
+        default=os.environ.get("FVBJ_QUEUE", "data_files/crawl_queue.sqlite"),
+        help="work queue of the run, an unfinished run of the same items is resumed",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="start over instead of resuming an unfinished run",
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=os.environ.get("FVBJ_METRICS_DIR", "metrics"),
+        help="directory of the metrics, metrics.jsonl and metrics.prom",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # events of the run are appended to metrics.jsonl, metrics.prom holds the totals
+    metrics.configure(args.metrics_dir)
+
+    # FVBJ_BASE_URL can point the spec to a local stub server serving recorded pages
+    spec = load_spec(args.spec)
+    crawl_items = expand_spec(spec, leagues=args.leagues, seasons=args.seasons)
+
+    # incremental mode keeps a manifest of scraped games
+    manifest = Manifest() if args.incremental else None
+
+    connection = database.connect()
+    sink = StoreSink(connection, incremental=args.incremental, csv=args.csv)
+
+    # a crashed run or a run with failed pages continues with the pages not stored
+    queue = WorkQueue(args.queue)
+    if queue.start(crawl_items, restart=args.restart):
+        print(f"Resuming the unfinished run, pages: {queue.counts()}")
+        sink.resume(crawl_items)
+    else:
+        sink.clear(crawl_items)
+
+    # finished seasons are served from the page cache, the running season is revalidated
+    fetcher_options = {"backend": args.fetcher, "cache_dir": args.cache_dir}
+
+    if args.shards > 1:
+        sink.touched |= crawl_sharded(
+            crawl_items,
+            args.shards,
+            fetcher_options,
+            spec["base_url"],
+            manifest=manifest,
+            batch_size=args.batch_size,
+            metrics_dir=args.metrics_dir,
+            queue_path=args.queue,
+        )
+    else:
+        fetcher = get_fetcher(
+            fetcher_options["backend"], cache=PageCache(fetcher_options["cache_dir"])
+        )
+        crawl(
+            crawl_items,
+            fetcher,
+            sink,
+            spec["base_url"],
+            manifest,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            metrics_dir=args.metrics_dir,
+            queue=queue,
+        )
+        fetcher.close()
+
+    with metrics.timer("close"):
+        sink.close()
+    connection.close()
+
+    if manifest is not None:
+        manifest.save()
+
+    counts = queue.finish()
+    queue.close()
+    if counts["failed"]:
+        print(
+            f"{counts['failed']} pages failed, the next crawls retry them "
+            f"until they failed {max_attempts} times"
+        )
+
+    metrics.registry.write_prometheus(os.path.join(args.metrics_dir, "metrics.prom"))
+    metrics.registry.report()
+    metrics.registry.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+players.py
+----------
+Canonicalizes scorer names and links their spellings to
+stable player ids across seasons
+
+usage: python players.py  (assigns ids to the stored goal events)
+
+"""
+
+import unicodedata
+from collections import defaultdict
+
+import database
+import storage
+
+# spellings of a player may differ by one typo in a name part of at least
+# this length, shorter parts must be equal, "Marco" and "Mario" are two players
+min_part_length = 6
+
+
+def canonical_name(name):
+    """Display form of a name, unicode composed and with single spaces"""
+
+    return " ".join(unicodedata.normalize("NFKC", name).split())
+
+
+def name_key(name):
+    """
+    Matching key of a name
+
+    Accents, case, punctuation and the order of first and last
+    name are ignored, e.g. "Cédric  Weigel" and "WEIGEL Cedric"
+    have the key "cedric weigel".
+
+    """
+
+    decomposed = unicodedata.normalize("NFKD", name)
+    letters = "".join(
+        char if char.isalnum() else " "
+        for char in decomposed
+        if not unicodedata.combining(char)
+    )
+
+    return " ".join(sorted(letters.casefold().split()))
+
+
+def blocking_keys(key):
+    """
+    Blocks of a name key
+
+    A block is the key with one long part replaced by the part itself
+    or the part without one of its letters. Two keys one typo apart in
+    a long part share a block.
+
+    """
+
+    parts = key.split()
+    blocks = set()
+
+    for i, part in enumerate(parts):
+        if len(part) >= min_part_length:
+            rest = " ".join(parts[:i] + parts[i + 1 :])
+            blocks.add((rest, part))
+            blocks.update((rest, part[:j] + part[j + 1 :]) for j in range(len(part)))
+
+    return blocks
+
+
+def one_typo(a, b):
+    """True if a letter of a is inserted, deleted, replaced or swapped in b"""
+
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+
+    if len(a) < len(b):
+        return a[i:] == b[i + 1 :]
+
+    return a[i + 1 :] == b[i + 1 :] or (
+        a[i : i + 2] == b[i : i + 2][::-1] and a[i + 2 :] == b[i + 2 :]
+    )
+
+
+def same_player(key, other):
+    """True if two name keys differ by one typo in one long part"""
+
+    parts, other_parts = key.split(), other.split()
+    if len(parts) != len(other_parts):
+        return False
+
+    differing = [(a, b) for a, b in zip(parts, other_parts) if a != b]
+
+    return (
+        len(differing) == 1
+        and max(map(len, differing[0])) >= min_part_length
+        and one_typo(*differing[0])
+    )
+
+
+def scorer_teams(games, goals):
+    """
+    Team of the scorer of every goal event
+
+    Own goals are listed on the side of the team they count for, the
+    scorer plays for the opponent.
+
+    """
+
+    teams = games.drop_duplicates("Spiel").set_index("Spiel")
+    home = goals["Spiel"].map(teams["Heimteam"])
+    away = goals["Spiel"].map(teams["Gastteam"])
+    at_home = (goals["Seite"] == "Heim") != goals["Eigentor"].astype(bool)
+
+    return home.where(at_home, away)
+
+
+class PlayerIndex:
+    """
+    Name keys of known players with a blocking index for fuzzy matching
+
+    A key is compared only to the few keys sharing one of its blocks,
+    so matching stays fast across tens of thousands of names.
+
+    Every key of a linked spelling matches exactly, but only the key a
+    player was created with is a candidate for fuzzy matching, so
+    typos do not chain from one spelling to the next.
+
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.blocks = defaultdict(set)
+        self.teams = defaultdict(set)
+
+    def add(self, key, player_id, canonical=False):
+        self.keys[key] = player_id
+        if canonical:
+            for block in blocking_keys(key):
+                self.blocks[block].add(key)
+
+    def add_teams(self, player_id, teams):
+        self.teams[player_id].update(teams)
+
+    def match(self, key, teams=()):
+        """
+        Id of the player with the same key or one typo apart, None if unknown
+
+        A key one typo apart matches only if its player scored for one of
+        the teams and no other player of these teams is one typo apart.
+
+        """
+
+        if key in self.keys:
+            return self.keys[key]
+
+        candidates = set().union(
+            *(self.blocks.get(block, ()) for block in blocking_keys(key))
+        )
+        players = {
+            self.keys[candidate]
+            for candidate in candidates
+            if same_player(key, candidate)
+            and not self.teams[self.keys[candidate]].isdisjoint(teams)
+        }
+
+        return players.pop() if len(players) == 1 else None
+
+
+def load_index(connection):
+    """Player index of the name keys and teams stored in the database"""
+
+    index = PlayerIndex()
+    for key, player_id, canonical in connection.execute(
+        """
+        SELECT a.key, a.player, a.key = p.key
+        FROM player_aliases a JOIN players p ON p.id = a.player
+        """
+    ):
+        index.add(key, player_id, canonical)
+
+    for player_id, team in connection.execute("SELECT player, team FROM player_teams"):
+        index.add_teams(player_id, [team])
+
+    return index
+
+
+def player_ids(connection, names, teams=None):
+    """
+    Ids of scorer names, unknown players are inserted
+
+    A spelling is linked to the player with the same name key or,
+    failing that, to the player one typo apart who scored for the same
+    team. Linked spellings are stored as aliases, so ids stay stable.
+
+    Requiring the same team keeps namesakes like "Schmid" and
+    "Schmidt" of different teams apart, at the cost of a misspelled
+    name of a player in their first game for a new team, which gets a
+    new id. Spellings close to several players of a team get a new id
+    as well. Without teams only equal name keys are linked.
+
+    Parameters
+    ----------
+    connection : sqlite3.Connection
+        database connection
+    names : iterable
+        scorer names as extracted
+    teams : iterable
+        team of every scorer name, see scorer_teams
+
+    Returns
+    -------
+    ids : dict
+        player id per name
+
+    """
+
+    names = list(names)
+    name_teams = defaultdict(set)
+
+    with connection:
+        if teams is not None:
+            teams = list(teams)
+            team_ids = database.team_ids(connection, teams)
+            for name, team in zip(names, teams):
+                name_teams[name].add(team_ids[team.strip()])
+
+        aliases = dict(connection.execute("SELECT alias, player FROM player_aliases"))
+        index = None
+        ids = {}
+
+        for name in sorted(set(names)):
+            alias = canonical_name(name)
+
+            if alias not in aliases:
+                if index is None:
+                    index = load_index(connection)
+
+                key = name_key(alias)
+                player_id = index.match(key, name_teams[name])
+                created = player_id is None
+
+                if created:
+                    connection.execute(
+                        "INSERT OR IGNORE INTO players (name, key) VALUES (?, ?)",
+                        (alias, key),
+                    )
+                    player_id = connection.execute(
+                        "SELECT id FROM players WHERE key = ?", (key,)
+                    ).fetchone()[0]
+
+                # another crawl process may have linked the spelling meanwhile
+                connection.execute(
+                    "INSERT OR IGNORE INTO player_aliases (alias, key, player) "
+                    "VALUES (?, ?, ?)",
+                    (alias, key, player_id),
+                )
+                aliases[alias] = connection.execute(
+                    "SELECT player FROM player_aliases WHERE alias = ?", (alias,)
+                ).fetchone()[0]
+                index.add(key, aliases[alias], canonical=created)
+
+            ids[name] = aliases[alias]
+
+            connection.executemany(
+                "INSERT OR IGNORE INTO player_teams (player, team) VALUES (?, ?)",
+                [(ids[name], team) for team in sorted(name_teams[name])],
+            )
+            if index is not None:
+                index.add_teams(ids[name], name_teams[name])
+
+    return ids
+
+
+def assign_stored_ids():
+    """Assigns player ids to the goal events of the store and the database"""
+
+    connection = database.connect()
+
+    for league, season in sorted(storage.partitions("goals")):
+        where = {"Liga": league, "Saison": season}
+        games = storage.read("games", where=where).drop(columns="Saison")
+        goals = storage.read("goals", where=where).drop(columns="Saison")
+
+        ids = player_ids(connection, goals["Spieler"], scorer_teams(games, goals))
+        goals["SpielerId"] = goals["Spieler"].map(ids)
+
+        storage.write("goals", goals, season)
+        database.upsert_games(connection, games, goals, season, replace=True)
+
+    connection.close()
+
+
+if __name__ == "__main__":
+    assign_stored_ids()
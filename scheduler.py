@@ -0,0 +1,187 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+scheduler.py
+----------
+Shards crawl items across worker processes and reports
+the crawl throughput per league
+
+"""
+
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import database
+import metrics
+from cache import PageCache
+from fetcher import get_fetcher
+from load import StoreSink
+from manifest import Manifest
+from work_queue import WorkQueue
+
+
+def shard_items(crawl_items, shards):
+    """Distributes crawl items round robin, so every shard gets a mix of leagues"""
+
+    return [crawl_items[shard::shards] for shard in range(shards)]
+
+
+def crawl_shard(
+    crawl_items,
+    fetcher_options,
+    base_url,
+    manifest_path=None,
+    batch_size=500,
+    metrics_dir=None,
+    queue_path=None,
+):
+    """
+    Crawls the items of a shard one after another into the store
+
+    Events are appended to the metrics.jsonl of the parent process,
+    counters and histograms are returned to be merged.
+
+    Returns
+    -------
+    touched : set
+        partitions written by the shard, see StoreSink
+    throughput : list
+        league, pages and seconds per crawl item
+    manifest_games : dict
+        scraped games of the shard manifest, None without manifest
+    metrics : dict
+        snapshot of the shard metrics
+
+    """
+
+    from pipeline import crawl
+
+    # forked workers start with a copy of the parent metrics
+    metrics.configure(metrics_dir)
+
+    fetcher = get_fetcher(
+        fetcher_options["backend"], cache=PageCache(fetcher_options["cache_dir"])
+    )
+    manifest = Manifest(manifest_path) if manifest_path else None
+    # the run is started by the parent process, shards share its queue
+    queue = WorkQueue(queue_path) if queue_path else None
+
+    # partitions are cleared and rewritten once by the parent process
+    connection = database.connect()
+    sink = StoreSink(connection)
+
+    throughput = []
+
+    for item in crawl_items:
+        start = time.perf_counter()
+        # shards already run in parallel processes, pages are parsed inline
+        # the shard manifests are merged and saved by the parent process
+        count = crawl(
+            [item],
+            fetcher,
+            sink,
+            base_url,
+            manifest,
+            workers=1,
+            batch_size=batch_size,
+            checkpoint=False,
+            queue=queue,
+        )
+        seconds = time.perf_counter() - start
+
+        throughput.append((item.league, 2 + count, seconds))
+
+    fetcher.close()
+    connection.close()
+    if queue is not None:
+        queue.close()
+
+    snapshot = metrics.registry.snapshot()
+    metrics.registry.close()
+
+    return sink.touched, throughput, manifest.games if manifest else None, snapshot
+
+
+def report_throughput(throughput):
+    """Prints pages and pages per second per league"""
+
+    leagues = defaultdict(lambda: [0, 0.0])
+    for league, pages, seconds in throughput:
+        leagues[league][0] += pages
+        leagues[league][1] += seconds
+
+    for league, (pages, seconds) in sorted(leagues.items()):
+        print(f"{league}: {pages} pages in {seconds:.1f} s, {pages / seconds:.1f} pages/s")
+
+
+def crawl_sharded(
+    crawl_items,
+    shards,
+    fetcher_options,
+    base_url,
+    manifest=None,
+    batch_size=500,
+    metrics_dir=None,
+    queue_path=None,
+):
+    """
+    Crawls items in parallel worker processes, each storing its batches
+
+    Parameters
+    ----------
+    crawl_items : list
+        CrawlItem per league, season and group
+    shards : int
+        number of worker processes
+    fetcher_options : dict
+        fetcher backend and cache directory of the workers
+    base_url : str
+        base url to create games links
+    manifest : Manifest
+        incremental mode, updated with the games scraped by the workers
+    batch_size : int
+        maximum number of games per batch
+    metrics_dir : str
+        directory of the metrics, the worker metrics are merged into
+        the metrics of the calling process
+    queue_path : str
+        work queue of the started run, see WorkQueue
+
+    Returns
+    -------
+    touched : set
+        partitions written by the workers, see StoreSink
+
+    """
+
+    manifest_path = manifest.path if manifest is not None else None
+
+    with ProcessPoolExecutor(max_workers=shards) as executor:
+        shard_results = list(
+            executor.map(
+                crawl_shard,
+                shard_items(crawl_items, shards),
+                [fetcher_options] * shards,
+                [base_url] * shards,
+                [manifest_path] * shards,
+                [batch_size] * shards,
+                [metrics_dir] * shards,
+                [queue_path] * shards,
+            )
+        )
+
+    report_throughput(
+        [entry for shard_result in shard_results for entry in shard_result[1]]
+    )
+
+    for shard_result in shard_results:
+        metrics.registry.merge(shard_result[3])
+
+    if manifest is not None:
+        for _, _, manifest_games, _ in shard_results:
+            for season, season_games in manifest_games.items():
+                manifest.games.setdefault(season, {}).update(season_games)
+
+    return set().union(*(shard_result[0] for shard_result in shard_results))
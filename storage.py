@@ -0,0 +1,223 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+storage.py
+----------
+Stores rankings, games and goal events as typed parquet
+datasets partitioned by league and season, with csv export
+
+"""
+
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+data_files = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_files")
+parquet_root = os.path.join(data_files, "parquet")
+
+partition_schema = pa.schema([("Liga", pa.string()), ("Saison", pa.int16())])
+
+schemas = {
+    "ranking": pa.schema(
+        [
+            ("Gruppe", pa.string()),
+            ("Rang", pa.int16()),
+            ("Team", pa.string()),
+            ("Spiele", pa.int16()),
+            ("Siege", pa.int16()),
+            ("Unentschieden", pa.int16()),
+            ("Niederlagen", pa.int16()),
+            ("Strafpunkte", pa.int16()),
+            ("Tore", pa.int16()),
+            ("Gegentore", pa.int16()),
+            ("Tordifferenz", pa.int16()),
+            ("Punkte", pa.int16()),
+        ]
+    ),
+    "games": pa.schema(
+        [
+            ("Gruppe", pa.string()),
+            ("Link", pa.string()),
+            ("Spiel", pa.int64()),
+            ("Heimteam", pa.string()),
+            ("Gastteam", pa.string()),
+            ("Resultat", pa.string()),
+        ]
+    ),
+    "goals": pa.schema(
+        [
+            ("Gruppe", pa.string()),
+            ("Spiel", pa.int64()),
+            ("Seite", pa.dictionary(pa.int8(), pa.string())),
+            ("Spieler", pa.string()),
+            ("SpielerId", pa.int32()),
+            ("Minute", pa.int16()),
+            ("Penalty", pa.bool_()),
+            ("Eigentor", pa.bool_()),
+        ]
+    ),
+}
+
+
+def dataset_schema(kind):
+    """Schema of a dataset including the partition columns"""
+
+    schema = schemas[kind]
+    for field in partition_schema:
+        schema = schema.append(field)
+
+    return schema
+
+
+def to_table(kind, frame, season):
+    """Arrow table of a frame in the schema of a dataset"""
+
+    frame = frame.assign(Saison=int(season))
+    return pa.Table.from_pandas(
+        frame, schema=dataset_schema(kind), preserve_index=False
+    ).replace_schema_metadata(None)
+
+
+def write(kind, frame, season, root=parquet_root):
+    """
+    Writes the frame of a season, replacing its stored league partitions
+
+    Parameters
+    ----------
+    kind : str
+        "ranking", "games" or "goals"
+    frame : DataFrame
+        rows of all leagues of the season, with a Liga column
+    season : str or int
+        season of the rows
+    root : str
+        directory of the datasets
+
+    """
+
+    ds.write_dataset(
+        to_table(kind, frame, season),
+        os.path.join(root, kind),
+        format="parquet",
+        partitioning=ds.partitioning(partition_schema, flavor="hive"),
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="delete_matching",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+
+
+def append(kind, frame, season, batch, root=parquet_root):
+    """
+    Adds a batch of rows to the league partitions of a season
+
+    Parameters
+    ----------
+    kind : str
+        "ranking", "games" or "goals"
+    frame : DataFrame
+        rows of the batch, with a Liga column
+    season : str or int
+        season of the rows
+    batch : str
+        unique name of the batch, its files are named after it
+    root : str
+        directory of the datasets
+
+    """
+
+    ds.write_dataset(
+        to_table(kind, frame, season),
+        os.path.join(root, kind),
+        format="parquet",
+        partitioning=ds.partitioning(partition_schema, flavor="hive"),
+        basename_template=f"part-{batch}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+
+
+def delete(kind, league, season, root=parquet_root):
+    """Deletes the stored partition of a league and season"""
+
+    if not os.path.isdir(os.path.join(root, kind)):
+        return
+
+    expression = (ds.field("Liga") == league) & (ds.field("Saison") == int(season))
+    for fragment in dataset(kind, root).get_fragments(filter=expression):
+        os.remove(fragment.path)
+
+
+def dataset(kind, root=parquet_root):
+    """Opens a stored dataset"""
+
+    return ds.dataset(
+        os.path.join(root, kind),
+        format="parquet",
+        schema=dataset_schema(kind),
+        partitioning=ds.partitioning(partition_schema, flavor="hive"),
+    )
+
+
+def read(kind, columns=None, where=None, root=parquet_root):
+    """
+    Reads stored rows
+
+    Only the files of matching partitions and only the requested
+    columns are read, other conditions are pushed down to the row
+    group statistics.
+
+    Parameters
+    ----------
+    kind : str
+        "ranking", "games" or "goals"
+    columns : list
+        columns to read, defaults to all
+    where : dict
+        column values to filter on, e.g. {"Saison": 2021}
+
+    Returns
+    -------
+    frame : DataFrame
+        matching rows
+
+    """
+
+    expression = None
+    for column, value in (where or {}).items():
+        condition = ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+
+    table = dataset(kind, root).to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+
+def partitions(kind, root=parquet_root):
+    """Stored (league, season) pairs of a dataset, read from the partition paths only"""
+
+    if not os.path.isdir(os.path.join(root, kind)):
+        return set()
+
+    return {
+        (keys["Liga"], keys["Saison"])
+        for keys in (
+            ds.get_partition_keys(fragment.partition_expression)
+            for fragment in dataset(kind, root).get_fragments()
+        )
+    }
+
+
+def seasons(kind, root=parquet_root):
+    """Stored seasons of a dataset, read from the partition paths only"""
+
+    return sorted({season for _, season in partitions(kind, root)}, reverse=True)
+
+
+def export_csv(frames, directory=data_files):
+    """Exports frames keyed like "ranking_2021" to csv files"""
+
+    os.makedirs(directory, exist_ok=True)
+
+    for key, frame in frames.items():
+        frame.to_csv(os.path.join(directory, f"{key}.csv"))
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import aggregates
+import database
+from api import Connections, connections_key, create_app
+
+teams = [f"FC Team {team}" for team in range(20)]
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    path = str(tmp_path / "fvbj.sqlite")
+    ranking = pd.DataFrame(
+        {
+            "Liga": "5. Liga",
+            "Gruppe": "Gruppe 1",
+            "Rang": range(1, len(teams) + 1),
+            "Team": teams,
+            **{column: 0 for column in database.ranking_columns if column != "Rang"},
+        }
+    )
+
+    connection = database.connect(path)
+    database.upsert_rankings(connection, ranking, 2021, "2021-08-20T06:00:00")
+    connection.close()
+
+    return path
+
+
+def test_connections_are_not_shared_between_threads(database_path):
+    connections = Connections(database_path)
+    used = []
+
+    def use():
+        used.append(connections.get())
+        assert connections.get() is used[-1]
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(connection) for connection in used}) == 4
+    connections.close()
+
+
+def test_concurrent_uncached_trajectories(database_path):
+    app = create_app(aggregates.aggregates_root, database_path)
+
+    async def get_all():
+        async with TestClient(TestServer(app)) as client:
+
+            async def get(team):
+                response = await client.get(f"/trajectories/2021/{team}")
+                return response.status, await response.json()
+
+            results = await asyncio.gather(*(get(team) for team in teams))
+            opened = list(app[connections_key].opened)
+
+        return results, opened
+
+    results, opened = asyncio.run(get_all())
+
+    assert [status for status, _ in results] == [200] * len(teams)
+    assert [body[0]["Rang"] for _, body in results] == list(range(1, len(teams) + 1))
+    # one connection per executor thread, closed with the app
+    assert len({id(connection) for connection in opened}) == len(opened)
+    assert app[connections_key].opened == []
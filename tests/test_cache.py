@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+
+from cache import PageCache, season_ttl
+from crawl_spec import CrawlItem
+from extract import iter_games
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+fixtures = os.path.join(root, "benchmarks", "fixtures")
+
+base = "https://www.fvbj-afbj.ch/fussballverband-bern-jura/spielbetrieb-fvbj/"
+schedule_2019 = base + "meisterschaft-fvbj.aspx/v-0/a-msp/s-2019/ln-13040/"
+match_report_2019 = base + "meisterschaft-fvbj.aspx/ln-13040/v-0/sp-20190000/"
+
+
+def test_season_ttl_reads_the_season_of_the_url():
+    assert season_ttl(schedule_2019, season=2021) is None
+    assert season_ttl(schedule_2019.replace("2019", "2021"), season=2021) == 600
+
+
+def test_season_ttl_of_match_reports_needs_their_season():
+    assert season_ttl(match_report_2019, season=2021) == 600
+    assert season_ttl(match_report_2019, 2019, season=2021) is None
+    assert season_ttl(match_report_2019, 2021, season=2021) == 600
+
+
+def test_match_report_of_finished_season_is_cached_forever(tmp_path, monkeypatch):
+    def ttl(url, page_season):
+        return season_ttl(url, page_season, season=2021)
+
+    cache = PageCache(str(tmp_path), ttl=ttl)
+    cache.put(match_report_2019, "<html>report</html>")
+
+    # a day later the report would be stale with the ttl of the running season
+    later = time.time() + 86_400
+    monkeypatch.setattr(time, "time", lambda: later)
+
+    assert not cache.get(match_report_2019).fresh
+
+    cache.add_seasons({match_report_2019: 2019})
+    entry = cache.get(match_report_2019)
+
+    assert entry.fresh
+    assert entry.body == "<html>report</html>"
+
+    cache.close()
+
+
+class CachedFetcher:
+    """Fetcher serving one recorded match report, with a page cache"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        path = os.path.join(fixtures, "match_report_2019.html")
+        with open(path, encoding="utf-8") as file:
+            self.page = file.read()
+
+    def fetch_all(self, urls, failed=None):
+        return {url: self.page for url in urls}
+
+
+def test_iter_games_tells_the_cache_the_season_of_match_reports(tmp_path):
+    item = CrawlItem(
+        league="5. Liga",
+        league_id=13040,
+        group="Gruppe 1",
+        group_id=1,
+        season="2019",
+        ranking_link=base + "meisterschaft-fvbj.aspx/v-0/a-mrr/s-2019/ln-13040/",
+        schedule_link=schedule_2019,
+        game_link_pattern="meisterschaft-fvbj.aspx/ln-13040/v-0",
+    )
+    cache = PageCache(str(tmp_path))
+    fetcher = CachedFetcher(cache)
+
+    links = {"season_2019": {match_report_2019: item}}
+    games = list(iter_games(links, fetcher, workers=1))
+
+    assert len(games) == 1
+    assert cache.seasons == {match_report_2019: 2019}
+
+    cache.close()
+
+
+def test_eviction_keeps_the_cache_within_max_bytes(tmp_path):
+    cache = PageCache(str(tmp_path))
+    for page in range(50):
+        cache.put(f"http://stub/{page}", f"<html>{page * 'x'}</html>")
+    assert cache.bytes == cache.size()
+
+    cache.max_bytes = cache.bytes // 10
+    sums = []
+    cache.connection.set_trace_callback(
+        lambda sql: sums.append(sql) if "SUM(" in sql else None
+    )
+    cache.put("http://stub/new", "<html>new</html>")
+    cache.connection.set_trace_callback(None)
+
+    # many pages evicted with one resync of the total
+    assert len(sums) == 1
+    assert cache.bytes == cache.size() <= cache.max_bytes
+    assert cache.get("http://stub/new").body == "<html>new</html>"
+    assert cache.get("http://stub/0") is None
+
+    cache.close()
+
+
+def test_concurrent_puts_keep_every_indexed_body(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=2_000)
+
+    def put(worker):
+        for page in range(100):
+            # a few shared bodies are evicted and written again concurrently
+            cache.put(f"http://stub/{worker}/{page}", f"<html>{page % 7}</html>")
+
+    threads = [threading.Thread(target=put, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    urls = [url for (url,) in cache.connection.execute("SELECT url FROM pages")]
+    assert urls
+    assert all(cache.get(url) is not None for url in urls)
+    assert cache.bytes == cache.size()
+
+    cache.close()
@@ -0,0 +1,168 @@
+import asyncio
+import sqlite3
+
+import pandas as pd
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import aggregates
+import api
+import database
+
+
+@pytest.fixture
+def connection():
+    connection = database.connect(":memory:")
+    yield connection
+    connection.close()
+
+
+def ranking(rows):
+    """Ranking of group 1 of the 5. Liga, a row per team"""
+
+    return pd.DataFrame(
+        [
+            {
+                "Liga": "5. Liga",
+                "Gruppe": "Gruppe 1",
+                "Rang": rank,
+                "Team": team,
+                "Spiele": wins + draws + losses,
+                "Siege": wins,
+                "Unentschieden": draws,
+                "Niederlagen": losses,
+                "Strafpunkte": 0,
+                "Tore": goals,
+                "Gegentore": against,
+                "Tordifferenz": goals - against,
+                "Punkte": 3 * wins + draws,
+            }
+            for rank, team, wins, draws, losses, goals, against in rows
+        ]
+    )
+
+
+def changes(connection):
+    return connection.execute(
+        """
+        SELECT s.crawled_at, t.name, c.rank, c.games, c.points
+        FROM ranking_changes c
+        JOIN ranking_snapshots s ON s.id = c.snapshot
+        JOIN teams t ON t.id = c.team
+        ORDER BY s.id, c.rank
+        """
+    ).fetchall()
+
+
+def test_snapshots_store_the_changed_rows(connection):
+    first = ranking(
+        [
+            (1, "FC A", 1, 0, 0, 2, 0),
+            (2, "FC B", 0, 1, 0, 1, 1),
+            (3, "FC C", 0, 1, 0, 1, 1),
+            (4, "FC D", 0, 0, 1, 0, 2),
+        ]
+    )
+    # FC D beat FC A, FC B and FC C did not play
+    second = ranking(
+        [
+            (1, "FC A", 1, 0, 1, 3, 3),
+            (2, "FC B", 0, 1, 0, 1, 1),
+            (3, "FC C", 0, 1, 0, 1, 1),
+            (4, "FC D", 1, 0, 1, 3, 3),
+        ]
+    )
+
+    database.upsert_rankings(connection, first, 2021, "2021-08-20T06:00:00")
+    database.upsert_rankings(connection, second, 2021, "2021-08-27T06:00:00")
+    # no change, no snapshot
+    database.upsert_rankings(connection, second, 2021, "2021-08-28T06:00:00")
+
+    assert changes(connection) == [
+        ("2021-08-20T06:00:00", "FC A", 1, 1, 3),
+        ("2021-08-20T06:00:00", "FC B", 2, 1, 1),
+        ("2021-08-20T06:00:00", "FC C", 3, 1, 1),
+        ("2021-08-20T06:00:00", "FC D", 4, 1, 0),
+        ("2021-08-27T06:00:00", "FC A", 1, 2, 3),
+        ("2021-08-27T06:00:00", "FC D", 4, 2, 3),
+    ]
+
+    trajectory = database.ranking_trajectory("FC D", 2021, connection=connection)
+    columns = ["Zeitpunkt", "Rang", "Spiele", "Siege", "Punkte"]
+    assert trajectory[columns].values.tolist() == [
+        ["2021-08-20T06:00:00", 4, 1, 0, 0],
+        ["2021-08-27T06:00:00", 4, 2, 1, 3],
+    ]
+
+    trajectory = database.ranking_trajectory("FC B", 2021, connection=connection)
+    assert trajectory["Zeitpunkt"].tolist() == ["2021-08-20T06:00:00"]
+
+
+def test_rankings_stored_before_snapshots_are_seeded(tmp_path):
+    path = str(tmp_path / "fvbj.sqlite")
+    connection = database.connect(path)
+    with connection:
+        database.team_ids(connection, ["FC A"])
+        connection.execute(
+            "INSERT INTO rankings VALUES (2019, '5. Liga', 'Gruppe 1', "
+            "(SELECT id FROM teams WHERE name = 'FC A'), 1, 18, 12, 3, 3, 0, "
+            "40, 20, 20, 39)"
+        )
+    connection.close()
+
+    connection = database.connect(path)
+    trajectory = database.ranking_trajectory("FC A", 2019, connection=connection)
+    assert trajectory[["Rang", "Spiele", "Punkte"]].to_dict("records") == [
+        {"Rang": 1, "Spiele": 18, "Punkte": 39}
+    ]
+    connection.close()
+
+    # seeded once
+    connection = database.connect(path)
+    assert len(database.ranking_trajectory("FC A", 2019, connection=connection)) == 1
+    connection.close()
+
+
+def test_readonly_connections_do_not_migrate(tmp_path):
+    path = str(tmp_path / "fvbj.sqlite")
+    connection = database.connect(path)
+    with connection:
+        database.team_ids(connection, ["FC A"])
+        connection.execute(
+            "INSERT INTO rankings VALUES (2019, '5. Liga', 'Gruppe 1', "
+            "(SELECT id FROM teams WHERE name = 'FC A'), 1, 18, 12, 3, 3, 0, "
+            "40, 20, 20, 39)"
+        )
+    connection.close()
+
+    connection = database.connect(path, readonly=True)
+    assert database.ranking_trajectory("FC A", 2019, connection=connection).empty
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        connection.execute("DELETE FROM rankings")
+    connection.close()
+
+
+def test_trajectories_are_served(tmp_path):
+    path = str(tmp_path / "fvbj.sqlite")
+    connection = database.connect(path)
+    database.upsert_rankings(
+        connection, ranking([(1, "FC A", 1, 0, 0, 2, 0)]), 2021, "2021-08-20T06:00:00"
+    )
+    database.upsert_rankings(
+        connection, ranking([(1, "FC A", 2, 0, 0, 5, 1)]), 2021, "2021-08-27T06:00:00"
+    )
+    connection.close()
+
+    async def get():
+        app = api.create_app(aggregates.aggregates_root, path)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get("/trajectories/2021/FC A")
+            return response.status, await response.json()
+
+    status, body = asyncio.run(get())
+
+    assert status == 200
+    assert [(row["Zeitpunkt"], row["Spiele"], row["Punkte"]) for row in body] == [
+        ("2021-08-20T06:00:00", 1, 3),
+        ("2021-08-27T06:00:00", 2, 6),
+    ]
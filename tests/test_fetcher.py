@@ -0,0 +1,40 @@
+import threading
+
+from fetcher import iter_pages
+
+
+class CountingFetcher:
+    """Fetcher serving every url, remembers its threads and calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.threads = set()
+
+    def fetch_all(self, urls, failed=None):
+        self.calls += 1
+        self.threads.add(threading.current_thread())
+        return {url: f"<html>{url}</html>" for url in urls}
+
+
+def test_pages_are_yielded_in_order():
+    urls = [f"http://stub/{page}" for page in range(10)]
+    pages = list(iter_pages(CountingFetcher(), urls, batch_size=3))
+
+    assert [url for url, _ in pages] == urls
+
+
+def test_producer_ends_when_the_consumer_stops_early():
+    fetcher = CountingFetcher()
+    urls = [f"http://stub/{page}" for page in range(1_000)]
+
+    pages = iter_pages(fetcher, urls, batch_size=10, prefetch=2)
+    next(pages)
+    # e.g. a sink error while the crawl is running
+    pages.close()
+
+    (producer,) = fetcher.threads
+    producer.join(timeout=5)
+
+    assert not producer.is_alive()
+    # the producer stopped fetching instead of crawling all batches
+    assert fetcher.calls < 10
@@ -0,0 +1,28 @@
+from metrics import Metrics, format_labels
+
+
+def test_counters_keep_their_precision():
+    registry = Metrics()
+    registry.inc("fetch_bytes_total", 12345678, backend="http", cache="miss")
+    registry.inc("fetch_bytes_total", 0.5, backend="http", cache="hit")
+
+    text = registry.prometheus()
+
+    assert 'fvbj_fetch_bytes_total{backend="http",cache="miss"} 12345678\n' in text
+    assert 'fvbj_fetch_bytes_total{backend="http",cache="hit"} 0.5\n' in text
+
+
+def test_histogram_sum_keeps_its_precision():
+    registry = Metrics()
+    registry.observe("stage_seconds", 1234567.25, stage="games")
+
+    text = registry.prometheus()
+
+    assert 'fvbj_stage_seconds_sum{stage="games"} 1234567.25\n' in text
+    assert 'fvbj_stage_seconds_count{stage="games"} 1\n' in text
+
+
+def test_label_values_are_escaped():
+    labels = (("league", 'Liga "A"\\B\nC'),)
+
+    assert format_labels(labels) == '{league="Liga \\"A\\"\\\\B\\nC"}'
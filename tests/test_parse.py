@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from parse import ParseError, parse_match_report, parse_ranking
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+fixtures = os.path.join(root, "benchmarks", "fixtures")
+
+
+@pytest.mark.parametrize("page", ["", "   \n"])
+def test_empty_ranking_page_raises_parse_error(page):
+    with pytest.raises(ParseError, match="empty"):
+        parse_ranking(page)
+
+
+def test_truncated_ranking_page_raises_parse_error():
+    with open(os.path.join(fixtures, "ranking_2019.html"), encoding="utf-8") as file:
+        page = file.read()
+
+    assert parse_ranking(page)
+
+    truncated = page[: page.index('class="ranCsp"')]
+    with pytest.raises(ParseError):
+        parse_ranking(truncated)
+
+
+def test_empty_match_report_has_no_result():
+    game, goals = parse_match_report("", 1)
+
+    assert game.Resultat == "-"
+    assert goals == []
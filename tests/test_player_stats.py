@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+import pytest
+
+import storage
+from transform import aggregate_player_stats, goal_columns
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+fixtures = os.path.join(root, "benchmarks", "fixtures")
+
+
+def goal(player_id, player, side="Heim", penalty=False, own_goal=False):
+    return {
+        "Spiel": 1,
+        "Seite": side,
+        "Spieler": player,
+        "SpielerId": player_id,
+        "Penalty": penalty,
+        "Eigentor": own_goal,
+    }
+
+
+def test_hand_checked_player_stats():
+    goals = pd.DataFrame(
+        [
+            goal(1, "Anna Muster", "Heim"),
+            goal(1, "Anna Muster", "Gast", penalty=True),
+            goal(1, "Ana Muster", "Gast"),
+            goal(1, "Anna Muster", "Heim", own_goal=True),
+            goal(2, "Beat Beispiel", "Gast"),
+        ]
+    )
+
+    stats = aggregate_player_stats(goals)
+
+    assert stats.index.tolist() == [1, 2]
+    assert stats.loc[1].tolist() == ["Anna Muster", 3, 1, 2, 1, 1]
+    assert stats.loc[2].tolist() == ["Beat Beispiel", 1, 0, 1, 0, 0]
+
+
+@pytest.mark.parametrize("season", [2019, 2020, 2021])
+def test_stored_seasons_match_the_former_player_stats(season):
+    goals = storage.read("goals", columns=goal_columns, where={"Saison": season})
+    # the former stats are keyed by name, one id per spelling
+    goals = goals.assign(SpielerId=pd.factorize(goals["Spieler"])[0])
+
+    stats = aggregate_player_stats(goals).set_index("Spieler").sort_index()
+    expected = pd.read_csv(
+        os.path.join(fixtures, f"player_stats_{season}.csv"), index_col="Spieler"
+    )
+
+    pd.testing.assert_frame_equal(stats, expected, check_dtype=False)
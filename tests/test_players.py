@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+
+import database
+from players import name_key, one_typo, player_ids, same_player, scorer_teams
+
+
+@pytest.fixture
+def connection():
+    connection = database.connect(":memory:")
+    yield connection
+    connection.close()
+
+
+def test_name_key_ignores_accents_case_punctuation_and_order():
+    assert name_key("Cédric  Weigel") == "cedric weigel"
+    assert name_key("WEIGEL Cedric") == "cedric weigel"
+    assert name_key("Jean-Luc Müller") == "jean luc muller"
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("gerber", "gerbre"),  # swap of the last letters
+        ("gerber", "egrber"),  # swap of the first letters
+        ("gerber", "gerbber"),  # insert
+        ("gerber", "gerberr"),  # insert at the end
+        ("gerber", "xgerber"),  # insert at the start
+        ("gerber", "gerbe"),  # delete
+        ("gerber", "gerbex"),  # replace
+    ],
+)
+def test_one_typo(a, b):
+    assert one_typo(a, b)
+    assert one_typo(b, a)
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("gerber", "grebre"),  # two swaps
+        ("gerber", "gerberxx"),  # two inserts
+        ("gerber", "regber"),  # swap of letters apart
+    ],
+)
+def test_not_one_typo(a, b):
+    assert not one_typo(a, b)
+
+
+def test_short_name_parts_must_be_equal():
+    assert not same_player("marco meier", "mario meier")
+    assert same_player("marco meierhans", "marco meierhnas")
+
+
+def test_marco_and_mario_are_two_players(connection):
+    ids = player_ids(connection, ["Marco Meier", "Mario Meier"], ["FC A", "FC A"])
+
+    assert ids["Marco Meier"] != ids["Mario Meier"]
+
+
+def test_spellings_are_linked(connection):
+    ids = player_ids(
+        connection,
+        ["Cédric Weigel", "WEIGEL Cedric", "Cedric Wiegel"],
+        ["FC A", "FC A", "FC A"],
+    )
+
+    assert len(set(ids.values())) == 1
+
+
+def test_namesakes_of_other_teams_are_two_players(connection):
+    ids = player_ids(connection, ["Reto Schmid", "Reto Schmidt"], ["FC A", "FC B"])
+
+    assert ids["Reto Schmid"] != ids["Reto Schmidt"]
+
+    # a later crawl does not merge them either
+    ids = player_ids(connection, ["Reto Schmidt"], ["FC A"])
+    assert ids["Reto Schmidt"] != player_ids(connection, ["Reto Schmid"])["Reto Schmid"]
+
+
+def test_typo_close_to_several_players_is_a_new_player(connection):
+    ids = player_ids(connection, ["Reto Schmid", "Reto Schmitt"], ["FC A", "FC A"])
+    assert ids["Reto Schmid"] != ids["Reto Schmitt"]
+
+    ids.update(player_ids(connection, ["Reto Schmidt"], ["FC A"]))
+
+    assert len(set(ids.values())) == 3
+
+
+def test_typos_do_not_chain(connection):
+    first = player_ids(connection, ["Remo Gerber"], ["FC A"])
+    second = player_ids(connection, ["Remo Gerbber"], ["FC A"])
+    third = player_ids(connection, ["Remo Gerbbber"], ["FC A"])
+
+    assert first["Remo Gerber"] == second["Remo Gerbber"]
+    assert third["Remo Gerbbber"] != first["Remo Gerber"]
+
+
+def test_without_teams_only_equal_keys_are_linked(connection):
+    ids = player_ids(connection, ["Remo Gerber", "GERBER Remo", "Remo Gerbber"])
+
+    assert ids["Remo Gerber"] == ids["GERBER Remo"] != ids["Remo Gerbber"]
+
+
+def test_own_goal_scorers_play_for_the_opponent():
+    games = pd.DataFrame({"Spiel": [1], "Heimteam": ["FC A"], "Gastteam": ["FC B"]})
+    goals = pd.DataFrame(
+        {
+            "Spiel": [1, 1, 1, 1],
+            "Seite": ["Heim", "Gast", "Heim", "Gast"],
+            "Eigentor": [False, False, True, True],
+        }
+    )
+
+    assert scorer_teams(games, goals).tolist() == ["FC A", "FC B", "FC B", "FC A"]
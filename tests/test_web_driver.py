@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+import web_driver
+from web_driver import BrowserPool
+
+
+class FakeDriver:
+    """Driver whose quit fails once it is broken, like a crashed chrome"""
+
+    def __init__(self):
+        self.broken = False
+        self.quit_calls = 0
+
+    def get(self, url):
+        if url == "crash":
+            self.broken = True
+            raise WebDriverException("chrome not reachable")
+        return url
+
+    def quit(self):
+        self.quit_calls += 1
+        if self.broken:
+            raise WebDriverException("chrome not reachable")
+
+
+@pytest.fixture
+def drivers(monkeypatch):
+    drivers = []
+
+    def create_driver():
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    monkeypatch.setattr(web_driver, "create_driver", create_driver)
+    return drivers
+
+
+def map_with_timeout(pool, items, timeout=5):
+    """Runs pool.map in a thread, fails instead of hanging"""
+
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(
+            pool.map(lambda driver, url: driver.get(url), items, return_exceptions=True)
+        ),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pool.map hangs"
+
+    return results[0]
+
+
+def test_broken_driver_whose_quit_fails_is_replaced(drivers):
+    with BrowserPool(size=1) as pool:
+        first = map_with_timeout(pool, ["a", "crash"])
+        second = map_with_timeout(pool, ["b", "c"])
+
+    assert first[0] == "a"
+    assert isinstance(first[1], WebDriverException)
+    assert second == ["b", "c"]
+    assert len(drivers) == 2
+    assert drivers[0].quit_calls == 1
+
+
+def test_drivers_are_recycled_after_max_pages(drivers):
+    with BrowserPool(size=1, max_pages=2) as pool:
+        assert map_with_timeout(pool, ["a", "b", "c"]) == ["a", "b", "c"]
+
+    assert len(drivers) == 2
+    assert [driver.quit_calls for driver in drivers] == [1, 1]
@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+from crawl_spec import expand_spec, load_spec
+from parse import canonical_link
+from pipeline import crawl
+from work_queue import WorkQueue, max_attempts
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+fixtures = os.path.join(root, "benchmarks", "fixtures")
+
+base_url = "https://www.fvbj-afbj.ch/"
+# the 72 games of the recorded schedule
+n_games = 72
+batch_size = 10
+match_report_2019 = (
+    "fussballverband-bern-jura/spielbetrieb-fvbj/meisterschaft-fvbj.aspx/"
+    "ln-13040/v-0/sp-20190000/"
+)
+
+
+def read_fixture(name):
+    with open(os.path.join(fixtures, name), encoding="utf-8") as file:
+        return file.read()
+
+
+@pytest.fixture
+def items():
+    spec = load_spec(os.path.join(root, "crawl_spec.json"))
+    return expand_spec(spec, seasons=["2019"])
+
+
+class FixtureFetcher:
+    """Fetcher serving the recorded pages of 2019, failing urls are reported"""
+
+    def __init__(self, items, failing=()):
+        self.pages = {}
+        for item in items:
+            self.pages[item.ranking_link] = read_fixture("ranking_2019.html")
+            self.pages[item.schedule_link] = read_fixture("schedule_2019.html")
+        self.match_report = read_fixture("match_report_2019.html")
+        self.failing = set(failing)
+        self.fetched = []
+
+    def fetch_all(self, urls, failed=None):
+        self.fetched.extend(urls)
+        pages = {}
+        for url in urls:
+            if url in self.failing:
+                failed[url] = ConnectionError(url)
+            else:
+                pages[url] = self.pages.get(url, self.match_report)
+
+        return pages
+
+
+class RecordingSink:
+    """Sink keeping the links of the stored games, optionally crashing"""
+
+    def __init__(self, crash_after=None):
+        self.crash_after = crash_after
+        self.rankings = 0
+        self.links = []
+
+    def write_rankings(self, rankings):
+        self.rankings += 1
+
+    def write_games(self, season, games, goals):
+        # crash_after batches are stored before the crash
+        crashed = self.crash_after is not None
+        if crashed and len(self.links) >= batch_size * self.crash_after:
+            raise RuntimeError("crash")
+        self.links.extend(games["Link"])
+
+
+def run(queue, items, fetcher, sink):
+    """A crawl like pipeline.main, returns if the run was resumed"""
+
+    resumed = queue.start(items)
+    crawl(items, fetcher, sink, base_url, workers=1, batch_size=batch_size, queue=queue)
+    queue.finish()
+
+    return resumed
+
+
+def test_crashed_run_resumes_with_the_games_not_stored(tmp_path, items):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    crashed = RecordingSink(crash_after=3)
+
+    with pytest.raises(RuntimeError):
+        run(queue, items, FixtureFetcher(items), crashed)
+    assert len(crashed.links) == 3 * batch_size
+
+    fetcher = FixtureFetcher(items)
+    resumed = RecordingSink()
+    assert run(queue, items, fetcher, resumed)
+
+    # rankings and schedules are crawled again, games only if not stored
+    assert resumed.rankings == 1
+    assert items[0].schedule_link in fetcher.fetched
+    assert len(resumed.links) == n_games - 3 * batch_size
+    assert not set(crashed.links) & set(resumed.links)
+    assert queue.counts() == {"pending": 0, "done": n_games + 2, "failed": 0}
+
+    # the run is finished, the next crawl starts a new run
+    assert not run(queue, items, FixtureFetcher(items), RecordingSink())
+    queue.close()
+
+
+def test_permanently_failing_page_is_given_up(tmp_path, items):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    failing = canonical_link(base_url, match_report_2019)
+
+    for attempt in range(max_attempts):
+        fetcher = FixtureFetcher(items, failing=[failing])
+        sink = RecordingSink()
+
+        assert run(queue, items, fetcher, sink) == (attempt > 0)
+        # rankings and schedules are refreshed by every crawl
+        assert sink.rankings == 1
+        assert items[0].schedule_link in fetcher.fetched
+        assert len(sink.links) == (n_games - 1 if attempt == 0 else 0)
+
+    assert queue.counts() == {"pending": 0, "done": n_games + 1, "failed": 1}
+
+    # given up after max_attempts, the next crawl starts a new run
+    sink = RecordingSink()
+    assert not run(queue, items, FixtureFetcher(items), sink)
+    assert len(sink.links) == n_games
+    assert queue.counts() == {"pending": 0, "done": n_games + 2, "failed": 0}
+    queue.close()
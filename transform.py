@@ -9,29 +9,72 @@ in a streamlit app
 
 """
 
+import numpy as np
 import pandas as pd
+from analytics import pythagorean, win_rate
+
+# goal event columns needed for the player stats
+goal_columns = [
+    "Liga",
+    "Gruppe",
+    "Spiel",
+    "Seite",
+    "Spieler",
+    "SpielerId",
+    "Penalty",
+    "Eigentor",
+]
+
+
+def transform_ranking(ranking):
+    """
+    Transforms the ranking of a season to the displayed columns
 
-#Read data from excel files
-
-rankings = {
-    "ranking_2021": pd.DataFrame(),
-    "ranking_2020": pd.DataFrame(),
-    "ranking_2019": pd.DataFrame(),
-}
-
-games = {
-    "games_2021": pd.DataFrame(),
-    "games_2020": pd.DataFrame(),
-    "games_2019": pd.DataFrame(),
-}
-
-for ranking in rankings.keys():
+    Parameters
+    ----------
+    ranking : DataFrame
+        ranking as stored
 
-    rankings[ranking] = pd.read_csv(fr"data_files\{ranking}.csv", index_col=0)
+    Returns
+    -------
+    ranking : DataFrame
+        ranking indexed by Rang with short column names, win
+        rate S% and Pythagorean expectation SW
 
-for game in games.keys():
+    """
 
-    games[game] = pd.read_csv(fr"data_files\{game}.csv", index_col=0)
+    ranking = ranking.astype(
+        dtype={
+            "Spiele": int,
+            "Siege": int,
+            "Niederlagen": int,
+            "Unentschieden": int,
+            "Strafpunkte": int,
+            "Tore": int,
+            "Gegentore": int,
+            "Tordifferenz": int,
+            "Punkte": int,
+        }
+    )
+
+    ranking = ranking.set_index(["Rang"], drop=True)
+    ranking = ranking.rename(
+        columns={
+            "Spiele": "Sp",
+            "Siege": "S",
+            "Niederlagen": "N",
+            "Unentschieden": "U",
+            "Strafpunkte": "Straf-Pkt.",
+            "Tore": "T",
+            "Gegentore": "GT",
+            "Tordifferenz": "Diff.",
+            "Punkte": "Pkt.",
+        },
+    )
+    ranking["S%"] = win_rate(ranking["S"], ranking["Sp"]).round(3)
+    ranking["SW"] = pythagorean(ranking["T"], ranking["GT"]).round(3)
+
+    return ranking
 
 
 def transform_rankings(rankings):
@@ -53,174 +96,157 @@ def transform_rankings(rankings):
    
     for ranking in rankings.keys():
 
-        rankings[ranking].astype(
-            dtype={
-                "Spiele": int,
-                "Siege": int,
-                "Niederlagen": int,
-                "Unentschieden": int,
-                "Strafpunkte": int,
-                "Tore": int,
-                "Gegentore": int,
-                "Tordifferenz": int,
-                "Punkte": int,
-            }
-        )
-
-        rankings[ranking].set_index(["Rang"], drop=True, inplace=True)
-        rankings[ranking].rename(
-            columns={
-                "Spiele": "Sp",
-                "Siege": "S",
-                "Niederlagen": "N",
-                "Unentschieden": "U",
-                "Strafpunkte": "Straf-Pkt.",
-                "Tore": "T",
-                "Gegentore": "GT",
-                "Tordifferenz": "Diff.",
-                "Punkte": "Pkt.",
-            },
-            inplace=True,
-        )
-        # rankings[ranking]['S%'] = rankings[ranking]['S'].values / \
-        #     rankings[ranking]['Sp'].values
-        # rankings[ranking]['SW'] = rankings[ranking]['T'].values**2 / \
-        #     (rankings[ranking]['T'].values ** 2 +  rankings[ranking]['GT'].values **2)
+        rankings[ranking] = transform_ranking(rankings[ranking])
 
     return rankings
 
 
-def clean_alt_list(string_):
-    """Cleans lists from whitespaces and newlines"""
-    list_ = string_.split(",")
-
-    for i in range(len(list_)):
-        list_[i] = list_[i].strip()
-
-        if "Penalty" in list_[i]:
-            list_[i] = list_[i].replace("  ", "").replace("\n", "")
+player_columns = [
+    "SpielerId",
+    "Spieler",
+    "AnzahlTore",
+    "Heim",
+    "Auswärts",
+    "Penalty",
+    "Eigentor",
+]
 
-        if "Eigentor" in list_[i]:
-            list_[i] = list_[i].replace("  ", "").replace("\n", "")
 
-    return list_
-
-
-def transform_games(games):
+def compact_goals(goals):
     """
-    Transforms games 
+    Goal events in a compact representation
+
+    Leagues, groups, sides and player names are dictionary encoded as
+    categoricals, so every name is held once. Match and player ids are
+    integer coded in 32 bits, minutes in 16 bits and the flags are
+    boolean arrays. Columns which are not present are left out.
 
     Parameters
     ----------
-    games : dict
-        games for different seasons
+    goals : DataFrame
+        goal events as extracted or stored
 
     Returns
     -------
-    games : dict
-        transformed games
-    player_stats : dict
-        players stats
-
-    """    
-    
-    player_stats = {
-        "games_2021": pd.DataFrame(),
-        "games_2020": pd.DataFrame(),
-        "games_2019": pd.DataFrame(),
-    }
-
-    for season in games.keys():
-        games[season] = games[season].drop_duplicates()
-        games[season] = games[season].fillna("")
+    goals : DataFrame
+        goal events with compact dtypes
 
-        player_list = []
-
-        for col in games[season].columns:
-
-            if col == "TorschützenHeim":
-                games[season][col] = games[season][col].apply(clean_alt_list)
+    """
 
-                player_list = player_list + [
-                    x for sublist in games[season][col] for x in sublist if x != ""
-                ]
+    dtypes = {
+        "Liga": "category",
+        "Gruppe": "category",
+        "Seite": "category",
+        "Spieler": "category",
+        "Spiel": np.int32,
+        "SpielerId": np.int32,
+        "Minute": np.int16,
+        "Penalty": bool,
+        "Eigentor": bool,
+    }
 
-            if col == "TorschützenGast":
-                games[season][col] = games[season][col].apply(clean_alt_list)
+    compact = {}
+    for column, dtype in dtypes.items():
+        if column not in goals.columns:
+            continue
 
-                player_list = player_list + [
-                    x for sublist in games[season][col] for x in sublist if x != ""
-                ]
+        values = goals[column]
+        if dtype in (np.int32, np.int16):
+            # missing values and values beyond the range keep their dtype
+            limits = np.iinfo(dtype)
+            if values.isna().any() or (
+                len(values) and (values.min() < limits.min or values.max() > limits.max)
+            ):
+                continue
 
-        player_list = set(player_list)
+        compact[column] = dtype
 
-        for player in player_list:
-            player = player.replace(" (Penalty)", "")
-            player = player.replace("Eigentor (", "").replace(")", "")
+    return goals.astype(compact)
 
-            goal_home = (
-                games[season]["TorschützenHeim"].apply(lambda x: x.count(player)).sum()
-            )
 
-            goal_away = (
-                games[season]["TorschützenGast"].apply(lambda x: x.count(player)).sum()
-            )
+def aggregate_player_stats(goals):
+    """
+    Aggregates goal events per player
 
-            home_penalty = (
-                games[season]["TorschützenHeim"]
-                .apply(lambda x: x.count(f"{player} (Penalty)"))
-                .sum()
-            )
+    Player ids are coded once and every column is a single bincount
+    over the player codes. Own goals count for the Eigentor column only,
+    penalties count once as goal and once as Penalty. A player is
+    displayed with their most frequent spelling.
 
-            away_penalty = (
-                games[season]["TorschützenGast"]
-                .apply(lambda x: x.count(f"{player} (Penalty)"))
-                .sum()
-            )
+    Parameters
+    ----------
+    goals : DataFrame
+        goal events of a season, with player ids
 
-            home_owngoal = (
-                games[season]["TorschützenHeim"]
-                .apply(lambda x: x.count(f"Eigentor ({player})"))
-                .sum()
-            )
+    Returns
+    -------
+    player_stats : DataFrame
+        goals per player id, sorted by goals and name
 
-            away_owngoal = (
-                games[season]["TorschützenGast"]
-                .apply(lambda x: x.count(f"Eigentor ({player})"))
-                .sum()
-            )
+    """
 
-            penalty = home_penalty + away_penalty
-            owngoal = away_owngoal + home_owngoal
+    codes, players = pd.factorize(goals["SpielerId"], sort=True)
+    own_goal = goals["Eigentor"].to_numpy(dtype=bool)
+    scored = ~own_goal
+    home = (goals["Seite"] == "Heim").to_numpy()
+    penalty = goals["Penalty"].to_numpy(dtype=bool)
+
+    def count(mask):
+        return np.bincount(codes[mask], minlength=len(players))
+
+    goal_home = count(scored & home)
+    goal_away = count(scored & ~home)
+
+    # spellings in name order, the stable sort keeps it among equal counts
+    spellings = goals.groupby(["SpielerId", "Spieler"], observed=True).size()
+    spellings = spellings.sort_values(ascending=False, kind="stable").reset_index()
+    names = spellings.drop_duplicates("SpielerId").set_index("SpielerId")["Spieler"]
+
+    player_stats = pd.DataFrame(
+        {
+            "Spieler": names.reindex(players).to_numpy(),
+            "AnzahlTore": goal_home + goal_away,
+            "Heim": goal_home,
+            "Auswärts": goal_away,
+            "Penalty": count(scored & penalty),
+            "Eigentor": count(own_goal),
+        },
+        index=pd.Index(players, name="SpielerId"),
+        columns=player_columns[1:],
+    )
+
+    return player_stats.sort_values(
+        by=["AnzahlTore", "Spieler"], ascending=[False, True], kind="stable"
+    )
+
+
+def transform_games(games, goals):
+    """
+    Transforms games 
 
-            goal_home = goal_home + home_penalty
-            goal_away = goal_away + away_penalty
+    Parameters
+    ----------
+    games : dict
+        games for different seasons
+    goals : dict
+        goal events for different seasons
 
-            goals = goal_home + goal_away
+    Returns
+    -------
+    games : dict
+        transformed games
+    player_stats : dict
+        players stats
 
-            df = pd.DataFrame(
-                [
-                    {
-                        "Spieler": player,
-                        "AnzahlTore": goals,
-                        "Heim": goal_home,
-                        "Auswärts": goal_away,
-                        "Penalty": penalty,
-                        "Eigentor": owngoal,
-                    }
-                ]
-            )
+    """    
+    
+    player_stats = {}
 
-            player_stats[season] = pd.concat([player_stats[season], df])
+    for season in games.keys():
+        games[season] = games[season].drop_duplicates()
+        season_goals = goals[season.replace("games", "goals")]
 
-        player_stats[season] = player_stats[season].drop_duplicates()
-        player_stats[season].set_index(["Spieler"], drop=True, inplace=True)
-        player_stats[season] = player_stats[season].sort_values(
-            by=["AnzahlTore"], ascending=False
-        )
+        player_stats[season] = aggregate_player_stats(season_goals)
 
     return games, player_stats
 
-
-rankings_transformed = transform_rankings(rankings)
-games_transformed, player_stats = transform_games(games)
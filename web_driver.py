@@ -4,18 +4,149 @@ Webscraping Project for Swiss Amateur Soccer
 
 web_driver.py
 ----------
-Initialize chrome webdriver for selenium
+Initialize chrome webdrivers for selenium, pooled for
+pages that need javascript
 
 """
 
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+chromedriver_path = r"C:\Python39\chromedriver_win32\chromedriver.exe"
+
+
+def create_driver():
+    """Starts a headless chrome webdriver"""
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--incognito")
+    options.add_argument("--headless")
+
+    return webdriver.Chrome(chromedriver_path, options=options)
+
+
+class BrowserPool:
+    """
+    Pool of headless chrome webdrivers
+
+    Drivers are started lazily on first use and restarted after
+    `max_pages` pages to cap the memory growth of long running chrome
+    instances. Every driver is used by one thread at a time.
+
+    Parameters
+    ----------
+    size : int
+        maximum number of chrome instances
+    max_pages : int
+        number of pages after which a driver is recycled
+
+    """
+
+    def __init__(self, size=4, max_pages=100):
+        self.size = size
+        self.max_pages = max_pages
+        self.closed = False
+        self.page_counts = {}
+
+        # None marks a free slot without a started driver
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(None)
+
+    @contextmanager
+    def driver(self):
+        """Hands out a driver, blocks until one is free"""
+
+        if self.closed:
+            raise RuntimeError("BrowserPool is shut down")
+
+        driver = self.idle.get()
+        if driver is None:
+            try:
+                driver = create_driver()
+            except Exception:
+                self.idle.put(None)
+                raise
+            self.page_counts[driver] = 0
+
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self._release(driver, broken)
+
+    def _release(self, driver, broken):
+        self.page_counts[driver] += 1
+
+        if broken or self.closed or self.page_counts[driver] >= self.max_pages:
+            del self.page_counts[driver]
+            # quitting a crashed chrome may fail, its slot is freed anyway
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            self.idle.put(None)
+        else:
+            self.idle.put(driver)
+
+    def map(self, func, items, return_exceptions=False):
+        """
+        Runs work items on the pool
+
+        Parameters
+        ----------
+        func : callable
+            called as func(driver, item)
+        items : iterable
+            work items
+        return_exceptions : bool
+            return the exception of a failed item as its result
+            instead of raising it
+
+        Returns
+        -------
+        results : list
+            results in order of the items
+
+        """
+
+        def work(item):
+            try:
+                with self.driver() as driver:
+                    return func(driver, item)
+            except Exception as error:
+                if return_exceptions:
+                    return error
+                raise
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(work, items))
+
+    def shutdown(self):
+        """Quits all idle drivers, drivers in use are quit on release"""
+
+        self.closed = True
+
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
 
-options = webdriver.ChromeOptions()
-options.add_argument("--ignore-certificate-errors")
-options.add_argument("--incognito")
-options.add_argument("--headless")
+            if driver is not None:
+                del self.page_counts[driver]
+                driver.quit()
 
-driver = webdriver.Chrome(
-    r"C:\Python39\chromedriver_win32\chromedriver.exe", options=options
-)
+    def __enter__(self):
+        return self
 
+    def __exit__(self, *exc_info):
+        self.shutdown()
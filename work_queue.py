@@ -0,0 +1,250 @@
+"""
+Webscraping Project for Swiss Amateur Soccer
+============================================
+
+work_queue.py
+----------
+Persistent work queue of the pages of a crawl run, a run
+interrupted by a crash or by failed pages resumes where it
+stopped instead of starting over
+
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# a page is pending until it is stored, failed pages are retried on resume
+states = ("pending", "done", "failed")
+
+# failed pages are given up after this many attempts, the run finishes without them
+max_attempts = 3
+
+# pages of a run which are left to crawl
+open_pages = f"(state = 'pending' OR (state = 'failed' AND attempts < {max_attempts}))"
+
+
+def run_key(crawl_items):
+    """Key of the crawl items of a run, a resumed run has to crawl the same items"""
+
+    links = sorted(item.ranking_link for item in crawl_items)
+    return hashlib.sha1(json.dumps(links).encode("utf-8")).hexdigest()
+
+
+class WorkQueue:
+    """
+    Pages of a crawl run and their states in a sqlite file
+
+    Rankings and schedules are queued whenever a run starts or
+    resumes, so every crawl refreshes them, the game links once the
+    schedule of their crawl item is parsed. A page is done once its
+    records are stored, so a crashed run continues with the games
+    which were not stored. A failed page is retried on resume until
+    it failed max_attempts times. Several crawl shards can share the
+    queue.
+
+    Parameters
+    ----------
+    path : str
+        sqlite file of the queue
+
+    """
+
+    def __init__(self, path="data_files/crawl_queue.sqlite"):
+        self.path = path
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # crawl shards update the queue from several processes
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS run (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                key TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                item TEXT NOT NULL,
+                season TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_item ON pages (item, kind, state);
+            """
+        )
+
+    def start(self, crawl_items, restart=False):
+        """
+        Starts a run of crawl items or resumes the unfinished run of the same items
+
+        A run is resumed if pages are left to crawl, rankings and
+        schedules are queued again in both cases.
+
+        Parameters
+        ----------
+        crawl_items : list
+            CrawlItem per league, season and group
+        restart : bool
+            start over even if an unfinished run can be resumed
+
+        Returns
+        -------
+        resumed : bool
+            True if the unfinished run is resumed
+
+        """
+
+        key = run_key(crawl_items)
+        run = self.connection.execute("SELECT key, finished_at FROM run").fetchone()
+        (games_left,) = self.connection.execute(
+            f"SELECT COUNT(*) FROM pages WHERE kind = 'game' AND {open_pages}"
+        ).fetchone()
+
+        resumed = not restart and run == (key, None) and games_left > 0
+        now = time.time()
+
+        with self.connection:
+            if resumed:
+                self.connection.execute(
+                    "DELETE FROM pages WHERE kind IN ('ranking', 'schedule')"
+                )
+            else:
+                self.connection.execute("DELETE FROM pages")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO run (id, key, started_at) VALUES (1, ?, ?)",
+                    (key, now),
+                )
+
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO pages (url, kind, item, season, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (url, kind, item.ranking_link, f"season_{item.season}", now)
+                    for item in crawl_items
+                    for kind, url in [
+                        ("ranking", item.ranking_link),
+                        ("schedule", item.schedule_link),
+                    ]
+                ],
+            )
+
+        return resumed
+
+    def pending(self, kind, crawl_items):
+        """Crawl items whose page of a kind, "ranking" or "schedule", is not done"""
+
+        left = {
+            item
+            for (item,) in self.connection.execute(
+                f"SELECT item FROM pages WHERE kind = ? AND {open_pages}", (kind,)
+            )
+        }
+
+        return [item for item in crawl_items if item.ranking_link in left]
+
+    def add_games(self, games_links_cleaned):
+        """Queues game links of parsed schedules, see get_games_links"""
+
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO pages (url, kind, item, season, updated_at) "
+                "VALUES (?, 'game', ?, ?, ?)",
+                [
+                    (link, item.ranking_link, season, now)
+                    for season, links in games_links_cleaned.items()
+                    for link, item in links.items()
+                ],
+            )
+
+    def games(self, crawl_items):
+        """
+        Game links of crawl items which are left to crawl
+
+        Returns
+        -------
+        games_links_cleaned : dict
+            CrawlItem per games link for different seasons, in
+            order of the seasons and links of the crawl items
+
+        """
+
+        items = {item.ranking_link: item for item in crawl_items}
+        games_links_cleaned = {f"season_{item.season}": {} for item in crawl_items}
+
+        for url, item, season in self.connection.execute(
+            "SELECT url, item, season FROM pages "
+            f"WHERE kind = 'game' AND {open_pages} ORDER BY rowid"
+        ):
+            if item in items:
+                games_links_cleaned[season][url] = items[item]
+
+        return games_links_cleaned
+
+    def done(self, urls):
+        """Marks pages as done, to be called once their records are stored"""
+
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE pages SET state = 'done', error = NULL, updated_at = ? "
+                "WHERE url = ?",
+                [(now, url) for url in urls],
+            )
+
+    def fail(self, errors):
+        """Marks pages as failed with their error, they are retried on resume"""
+
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE pages SET state = 'failed', attempts = attempts + 1, "
+                "error = ?, updated_at = ? WHERE url = ?",
+                [(repr(error), now, url) for url, error in errors.items()],
+            )
+
+    def counts(self):
+        """Number of pages per state"""
+
+        counts = dict.fromkeys(states, 0)
+        counts.update(
+            self.connection.execute("SELECT state, COUNT(*) FROM pages GROUP BY state")
+        )
+
+        return counts
+
+    def finish(self):
+        """
+        Ends the run if no page is left to crawl
+
+        Pages which failed max_attempts times do not keep the run
+        open, the next start begins a new run.
+
+        Returns
+        -------
+        counts : dict
+            number of pages per state, the run stays unfinished
+            and is resumed by the next start if pages are left
+
+        """
+
+        counts = self.counts()
+        (left,) = self.connection.execute(
+            f"SELECT COUNT(*) FROM pages WHERE {open_pages}"
+        ).fetchone()
+
+        if left == 0:
+            with self.connection:
+                self.connection.execute("UPDATE run SET finished_at = ?", (time.time(),))
+
+        return counts
+
+    def close(self):
+        self.connection.close()